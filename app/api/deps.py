@@ -1,7 +1,49 @@
+from collections.abc import AsyncIterator, Callable
+from typing import Generic, TypeVar
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
+from app.core.security import decode_token, optional_oauth2_scheme
+from app.services.access import Principal
+
+S = TypeVar("S")
+T = TypeVar("T")
 
 
 def get_session() -> Session:  # pragma: no cover - thin wrapper for FastAPI Depends
     yield from get_db()
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:  # pragma: no cover - thin wrapper for FastAPI Depends
+    async for db in get_async_db():
+        yield db
+
+
+def get_principal(token: str | None = Depends(optional_oauth2_scheme)) -> Principal:
+    """The caller's roles, read from the access token; callers without a token are anonymous."""
+
+    if not token:
+        return Principal(subject=None)
+    payload = decode_token(token)
+    return Principal(subject=payload.get("sub"), roles=frozenset(payload.get("roles") or ()))
+
+
+class AsyncService(Generic[S]):
+    """Run a session-based service on the async engine without a worker thread.
+
+    ``run`` hands the service a sync ``Session`` facade via
+    ``AsyncSession.run_sync``: the ORM code is shared with the sync routes,
+    but every round trip is awaited on the event loop through the async
+    driver. Results must be fully loaded before they leave ``run``, so the
+    services eager-load whatever the response schemas read.
+    """
+
+    def __init__(self, db: AsyncSession, factory: Callable[[Session], S]):
+        self.db = db
+        self.factory = factory
+
+    async def run(self, call: Callable[[S], T]) -> T:
+        return await self.db.run_sync(lambda session: call(self.factory(session)))
@@ -1 +1 @@
-from . import metrics, datasets, tasks, auth, dashboard, calibers, dimensions  # noqa: F401
+from . import metrics, datasets, tasks, auth, dashboard, calibers, dimensions, uploads, metric_values  # noqa: F401
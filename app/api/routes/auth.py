@@ -19,5 +19,5 @@ def login(
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect credentials")
 
-    token = create_access_token(subject=user.username)
+    token = create_access_token(subject=user.username, roles=user.roles)
     return TokenResponse(access_token=token)
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_session
+from app.api.deps import AsyncService, get_async_session, get_session
 from app.schemas.caliber import CaliberCreate, CaliberRead, CaliberUpdate
 from app.services.calibers import CaliberService
+from app.utils.pagination import page_limit, set_next_cursor
 
 router = APIRouter()
 
@@ -12,9 +14,25 @@ def get_service(db: Session = Depends(get_session)) -> CaliberService:
     return CaliberService(db)
 
 
+def get_async_service(db: AsyncSession = Depends(get_async_session)) -> AsyncService[CaliberService]:
+    return AsyncService(db, CaliberService)
+
+
 @router.get("", response_model=list[CaliberRead])
-def list_calibers(service: CaliberService = Depends(get_service)) -> list[CaliberRead]:
-    return service.list_calibers()
+async def list_calibers(
+    response: Response,
+    limit: int | None = Query(None, ge=1),
+    cursor: str | None = Query(None),
+    service: AsyncService[CaliberService] = Depends(get_async_service),
+) -> list[CaliberRead]:
+    try:
+        calibers, next_cursor = await service.run(
+            lambda calibers: calibers.list_calibers(limit=page_limit(limit), cursor=cursor)
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    set_next_cursor(response, next_cursor)
+    return calibers
 
 
 @router.post("", response_model=CaliberRead, status_code=status.HTTP_201_CREATED)
@@ -1,25 +1,18 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_session
+from app.services.dashboard import DashboardService
 
 router = APIRouter()
 
 
+def get_service(db: Session = Depends(get_session)) -> DashboardService:
+    return DashboardService(db)
+
+
 @router.get("/overview")
-def get_dashboard_overview() -> dict:
+def get_dashboard_overview(service: DashboardService = Depends(get_service)) -> dict:
     """Return dashboard metrics and latest upload batches."""
 
-    return {
-        "stats": {
-            "registeredMetrics": {"total": 128, "sensitive": 34},
-            "activeVersions": {"total": 52, "releasedThisWeek": 3},
-            "yesterdayJobs": {"total": 86, "failed": 2},
-            "recentUploads": {"total": 5, "processing": 1},
-        },
-        "taskSummary": {
-            "title": "近7天任务执行概览",
-            "description": "这里可用于折线/柱状图展示每日成功/失败任务数、平均耗时等。",
-        },
-        "uploads": [
-            {"batchId": "B20250101", "source": "手工上传", "filename": "gmv_2024Q4.csv", "status": "已完成"},
-            {"batchId": "B20250102", "source": "API", "filename": "user_growth.json", "status": "排队中"},
-        ],
-    }
+    return service.overview()
@@ -1,35 +1,109 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from typing import Literal
 
-from app.api.deps import get_session
-from app.schemas.dimension import ChannelRead, ComboRead, CompanyRead, ProductRead
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import AsyncService, get_async_session
+from app.schemas.dimension import ChannelRead, ComboRead, CompanyRead, DimensionSuggestion, ProductRead
+from app.services.autocomplete import autocomplete
 from app.services.dimensions import DimensionService
+from app.utils.pagination import page_limit, set_next_cursor
 
 router = APIRouter()
 
 
-def get_service(db: Session = Depends(get_session)) -> DimensionService:
-    return DimensionService(db)
+def get_service(db: AsyncSession = Depends(get_async_session)) -> AsyncService[DimensionService]:
+    return AsyncService(db, DimensionService)
+
+
+@router.get("/autocomplete", response_model=list[DimensionSuggestion])
+async def autocomplete_dimensions(
+    kind: Literal["company", "product", "channel"] = Query(..., description="维度类型"),
+    prefix: str = Query("", alias="q", description="编码或名称前缀"),
+    limit: int = Query(10, ge=1, le=100),
+    service: AsyncService[DimensionService] = Depends(get_service),
+):
+    return await service.run(lambda dimensions: autocomplete.search(dimensions.db, kind, prefix, limit))
 
 
 @router.get("/companies", response_model=list[CompanyRead])
-def list_companies(keyword: str | None = Query(None), service: DimensionService = Depends(get_service)):
-    return service.list_companies(keyword)
+async def list_companies(
+    response: Response,
+    keyword: str | None = Query(None),
+    limit: int | None = Query(None, ge=1),
+    cursor: str | None = Query(None),
+    service: AsyncService[DimensionService] = Depends(get_service),
+):
+    try:
+        companies, next_cursor = await service.run(
+            lambda dimensions: dimensions.list_companies(keyword, limit=page_limit(limit), cursor=cursor)
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    set_next_cursor(response, next_cursor)
+    return companies
+
+
+@router.get("/companies/{company_id}/descendants", response_model=list[int])
+async def list_company_descendants(
+    company_id: int,
+    include_self: bool = Query(True),
+    service: AsyncService[DimensionService] = Depends(get_service),
+):
+    return await service.run(lambda dimensions: dimensions.company_subtree_ids(company_id, include_self=include_self))
 
 
 @router.get("/products", response_model=list[ProductRead])
-def list_products(keyword: str | None = Query(None), service: DimensionService = Depends(get_service)):
-    return service.list_products(keyword)
+async def list_products(
+    response: Response,
+    keyword: str | None = Query(None),
+    limit: int | None = Query(None, ge=1),
+    cursor: str | None = Query(None),
+    service: AsyncService[DimensionService] = Depends(get_service),
+):
+    try:
+        products, next_cursor = await service.run(
+            lambda dimensions: dimensions.list_products(keyword, limit=page_limit(limit), cursor=cursor)
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    set_next_cursor(response, next_cursor)
+    return products
 
 
 @router.get("/channels", response_model=list[ChannelRead])
-def list_channels(keyword: str | None = Query(None), service: DimensionService = Depends(get_service)):
-    return service.list_channels(keyword)
+async def list_channels(
+    response: Response,
+    keyword: str | None = Query(None),
+    limit: int | None = Query(None, ge=1),
+    cursor: str | None = Query(None),
+    service: AsyncService[DimensionService] = Depends(get_service),
+):
+    try:
+        channels, next_cursor = await service.run(
+            lambda dimensions: dimensions.list_channels(keyword, limit=page_limit(limit), cursor=cursor)
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    set_next_cursor(response, next_cursor)
+    return channels
 
 
 @router.get("/combos", response_model=list[ComboRead])
-def list_combos(keyword: str | None = Query(None), service: DimensionService = Depends(get_service)):
-    combos = service.list_combos(keyword)
+async def list_combos(
+    response: Response,
+    keyword: str | None = Query(None),
+    limit: int | None = Query(None, ge=1),
+    cursor: str | None = Query(None),
+    service: AsyncService[DimensionService] = Depends(get_service),
+):
+    try:
+        combos, next_cursor = await service.run(
+            lambda dimensions: dimensions.list_combos(keyword, limit=page_limit(limit), cursor=cursor)
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    set_next_cursor(response, next_cursor)
     results: list[ComboRead] = []
     for combo in combos:
         results.append(
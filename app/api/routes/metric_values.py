@@ -0,0 +1,101 @@
+from collections.abc import Iterator
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_principal, get_session
+from app.core.database import SessionLocal
+from app.schemas.metric_value import MetricValuePage, MetricValueQuery
+from app.services.access import Principal, policy_engine
+from app.services.company_tree import company_tree
+from app.services.exports import FORMATS, MetricValueExport, MetricValueExporter
+from app.services.metric_values import MetricValueService
+from app.services.value_cache import value_cache
+
+router = APIRouter()
+
+
+def get_service(db: Session = Depends(get_session)) -> MetricValueService:
+    return MetricValueService(db)
+
+
+@router.get("/value", response_model=MetricValuePage)
+def query_metric_values(
+    *,
+    code: str | None = Query(None, description="指标编码"),
+    version: str | None = Query(None, description="版本号，默认取生效版本"),
+    period_date: date | None = Query(None, alias="date", description="统计周期"),
+    date_from: date | None = Query(None),
+    date_to: date | None = Query(None),
+    company_code: str | None = Query(None),
+    combo_id: int | None = Query(None, description="维度组合"),
+    rollup: bool = Query(False, description="按公司层级汇总（含下级公司）"),
+    level: int | None = Query(None, description="汇总到的公司层级，隐含 rollup"),
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: str | None = Query(None),
+    service: MetricValueService = Depends(get_service),
+    principal: Principal = Depends(get_principal),
+) -> MetricValuePage:
+    query = MetricValueQuery(
+        code=code,
+        version=version,
+        period_date=period_date,
+        date_from=date_from,
+        date_to=date_to,
+        company_code=company_code,
+        combo_id=combo_id,
+        rollup=rollup,
+        level=level,
+    )
+    try:
+        return service.query_values(query, limit=limit, cursor=cursor, principal=principal)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+@router.get("/value/export")
+def export_metric_values(
+    *,
+    code: str = Query(..., description="指标编码"),
+    version: str | None = Query(None, description="版本号，默认取生效版本"),
+    date_from: date | None = Query(None),
+    date_to: date | None = Query(None),
+    company_code: str | None = Query(None, description="只导出该公司及其下级公司"),
+    format: str = Query("arrow", pattern="^(arrow|parquet)$", description="arrow（IPC 流）或 parquet"),
+    service: MetricValueService = Depends(get_service),
+    principal: Principal = Depends(get_principal),
+) -> StreamingResponse:
+    """Stream a metric's values as Arrow IPC record batches or Parquet row groups.
+
+    The body is produced from a server-side cursor on a session of its own,
+    since the request's session is released before streaming starts.
+    """
+
+    permissions = policy_engine.permissions(service.db, principal)
+    binding_ids = service.resolve_binding_ids(code, version, permissions)
+    if not binding_ids:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metric not found")
+    scopes = [roots for roots in ([company_code] if company_code else None, permissions.companies) if roots is not None]
+    companies = None
+    if scopes:
+        tree = company_tree.get(service.db)
+        companies = tuple(sorted(set.intersection(*(tree.descendants(roots) for roots in scopes))))
+    export = MetricValueExport(tuple(binding_ids), date_from=date_from, date_to=date_to, companies=companies)
+
+    def body() -> Iterator[bytes]:
+        with SessionLocal() as db:
+            yield from MetricValueExporter(db).stream(export, format)
+
+    media_type, extension = FORMATS[format]
+    headers = {"Content-Disposition": f'attachment; filename="{code}.{extension}"'}
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
+
+
+@router.get("/value/cache")
+def metric_value_cache_stats() -> dict:
+    """Hit ratio of this API worker's metric value cache lookups."""
+
+    stats = value_cache.stats()
+    return {**vars(stats), "hit_ratio": round(stats.hit_ratio, 4)}
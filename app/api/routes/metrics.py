@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_session
-from app.schemas.caliber import VersionCaliberCreate, VersionCaliberRead, VersionCaliberUpdate
+from app.api.deps import AsyncService, get_async_session, get_principal, get_session
+from app.schemas.caliber import VersionCaliberCreate, VersionCaliberRead, VersionCaliberReplace, VersionCaliberUpdate
 from app.schemas.metric import (
+    CatalogImportResult,
     MetricCreate,
+    MetricListItem,
     MetricRead,
     MetricSummary,
     MetricUpdate,
@@ -12,8 +19,12 @@ from app.schemas.metric import (
     MetricVersionUpdate,
     MetricVersionRead,
 )
+from app.services.access import Principal
+from app.services.catalog_import import CATALOG_FORMATS, CatalogImportService
+from app.services.dependencies import DependencyCycleError
 from app.services.metrics import MetricService
-from app.services.version_calibers import VersionCaliberService
+from app.services.version_calibers import InvalidBindingsError, VersionCaliberService
+from app.utils.pagination import page_limit, set_next_cursor
 
 router = APIRouter()
 
@@ -26,25 +37,100 @@ def get_binding_service(db: Session = Depends(get_session)) -> VersionCaliberSer
     return VersionCaliberService(db)
 
 
-@router.get("", response_model=list[MetricRead])
-def list_metrics(
+def get_catalog_service(db: Session = Depends(get_session)) -> CatalogImportService:
+    return CatalogImportService(db)
+
+
+def get_async_service(db: AsyncSession = Depends(get_async_session)) -> AsyncService[MetricService]:
+    return AsyncService(db, MetricService)
+
+
+def get_async_binding_service(db: AsyncSession = Depends(get_async_session)) -> AsyncService[VersionCaliberService]:
+    return AsyncService(db, VersionCaliberService)
+
+
+@router.get("", response_model=list[MetricRead] | list[MetricListItem])
+async def list_metrics(
     *,
+    response: Response,
     keyword: str | None = Query(None, alias="keyword"),
     subject_area: str | None = Query(None),
     sensitivity: str | None = Query(None),
-    service: MetricService = Depends(get_service),
-) -> list[MetricRead]:
-    return service.list_metrics(keyword=keyword, subject_area=subject_area, sensitivity=sensitivity)
+    fields: Literal["full", "summary"] = Query("full", description="summary 不返回版本及口径明细"),
+    limit: int | None = Query(None, ge=1, description="每页条数，超过服务端上限时按上限返回"),
+    cursor: str | None = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    service: AsyncService[MetricService] = Depends(get_async_service),
+    principal: Principal = Depends(get_principal),
+) -> list[MetricRead] | list[MetricListItem]:
+    try:
+        metrics, next_cursor = await service.run(
+            lambda metrics: metrics.list_metrics(
+                keyword=keyword,
+                subject_area=subject_area,
+                sensitivity=sensitivity,
+                limit=page_limit(limit),
+                cursor=cursor,
+                with_versions=fields == "full",
+                principal=principal,
+            )
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    set_next_cursor(response, next_cursor)
+    schema = MetricListItem if fields == "summary" else MetricRead
+    return [schema.model_validate(metric) for metric in metrics]
 
 
 @router.get("/summary", response_model=MetricSummary)
-def get_metric_summary(service: MetricService = Depends(get_service)) -> MetricSummary:
-    return service.summary()
+async def get_metric_summary(service: AsyncService[MetricService] = Depends(get_async_service)) -> MetricSummary:
+    return await service.run(lambda metrics: metrics.summary())
 
 
 @router.post("", response_model=MetricRead, status_code=status.HTTP_201_CREATED)
 def create_metric(payload: MetricCreate, service: MetricService = Depends(get_service)):
-    return service.create_metric(payload)
+    try:
+        return service.create_metric(payload)
+    except DependencyCycleError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+@router.post(
+    "/import",
+    response_model=CatalogImportResult,
+    responses={status.HTTP_422_UNPROCESSABLE_ENTITY: {"model": CatalogImportResult}},
+)
+async def import_metric_catalog(
+    request: Request,
+    format: Literal["jsonl", "xlsx"] | None = Query(None, description="默认按 Content-Type 判断"),
+    dry_run: bool = Query(False, description="只校验不写入"),
+    service: CatalogImportService = Depends(get_catalog_service),
+):
+    """Register a JSON-lines or Excel catalog of metrics with their initial versions and caliber bindings.
+
+    The batch is all or nothing: if any row is invalid nothing is written
+    and the per-row errors come back with status 422.
+    """
+
+    fmt = format or _catalog_format(request.headers.get("content-type", ""))
+    data = await request.body()
+    try:
+        result = await run_in_threadpool(service.import_catalog, data, fmt, dry_run)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    if result.errors:
+        return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, content=result.model_dump(mode="json"))
+    return result
+
+
+def _catalog_format(content_type: str) -> str:
+    if "spreadsheet" in content_type or "excel" in content_type:
+        return "xlsx"
+    if "json" in content_type:
+        return "jsonl"
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail=f"Send the catalog as one of {', '.join(CATALOG_FORMATS)} or pass ?format=",
+    )
 
 
 @router.post("/{metric_id}/publish", response_model=MetricRead)
@@ -56,8 +142,12 @@ def request_publish(metric_id: int, service: MetricService = Depends(get_service
 
 
 @router.get("/{metric_id}/versions", response_model=list[MetricVersionRead])
-def list_metric_versions(metric_id: int, service: MetricService = Depends(get_service)):
-    return service.list_versions(metric_id)
+async def list_metric_versions(
+    metric_id: int,
+    service: AsyncService[MetricService] = Depends(get_async_service),
+    principal: Principal = Depends(get_principal),
+):
+    return await service.run(lambda metrics: metrics.list_versions(metric_id, principal=principal))
 
 
 @router.post("/{metric_id}/versions", response_model=MetricVersionRead, status_code=status.HTTP_201_CREATED)
@@ -68,6 +158,8 @@ def create_metric_version(
 ):
     try:
         return service.create_version(metric_id, payload)
+    except DependencyCycleError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
@@ -81,6 +173,8 @@ def update_metric_version(
 ):
     try:
         return service.update_version(metric_id, version_id, payload)
+    except DependencyCycleError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
@@ -102,13 +196,18 @@ def delete_metric_version(
     "/{metric_id}/versions/{version_id}/calibers",
     response_model=list[VersionCaliberRead],
 )
-def list_version_calibers(
+async def list_version_calibers(
     metric_id: int,
     version_id: int,
-    binding_service: VersionCaliberService = Depends(get_binding_service),
+    binding_service: AsyncService[VersionCaliberService] = Depends(get_async_binding_service),
+    principal: Principal = Depends(get_principal),
 ):
-    _ = metric_id  # not used currently but kept for clarity/context
-    return binding_service.list_bindings(version_id)
+    try:
+        return await binding_service.run(
+            lambda bindings: bindings.list_readable_bindings(metric_id, version_id, principal=principal)
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
 
 @router.post(
@@ -125,6 +224,28 @@ def create_version_caliber(
     _ = metric_id
     try:
         return binding_service.create_binding(version_id, payload)
+    except DependencyCycleError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+
+@router.put(
+    "/{metric_id}/versions/{version_id}/calibers",
+    response_model=list[VersionCaliberRead],
+)
+def replace_version_calibers(
+    metric_id: int,
+    version_id: int,
+    payload: list[VersionCaliberReplace],
+    binding_service: VersionCaliberService = Depends(get_binding_service),
+):
+    """Replace the version's bindings with ``payload`` in one transaction; list order becomes ``order_index``."""
+
+    try:
+        return binding_service.replace_bindings(metric_id, version_id, payload)
+    except (DependencyCycleError, InvalidBindingsError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
@@ -143,6 +264,8 @@ def update_version_caliber(
     _ = (metric_id, version_id)
     try:
         return binding_service.update_binding(binding_id, payload)
+    except DependencyCycleError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
@@ -166,8 +289,13 @@ def delete_version_caliber(
 
 
 @router.get("/{metric_id}", response_model=MetricRead)
-def get_metric_detail(metric_id: int, service: MetricService = Depends(get_service)) -> MetricRead:
-    metric = service.get_metric(metric_id)
+async def get_metric_detail(
+    metric_id: int,
+    service: AsyncService[MetricService] = Depends(get_async_service),
+    principal: Principal = Depends(get_principal),
+) -> MetricRead:
+    # Metrics the caller may not read are reported as missing rather than forbidden.
+    metric = await service.run(lambda metrics: metrics.get_metric(metric_id, principal=principal))
     if not metric:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metric not found")
     return metric
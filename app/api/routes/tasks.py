@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_session
 from app.schemas.task import TaskRunCreate, TaskRunRead
 from app.services.tasks import TaskService
+from app.utils.pagination import page_limit, set_next_cursor
 from app.workers.tasks import trigger_task_run
 
 router = APIRouter()
@@ -14,8 +15,18 @@ def get_service(db: Session = Depends(get_session)) -> TaskService:
 
 
 @router.get("/", response_model=list[TaskRunRead])
-def list_task_runs(service: TaskService = Depends(get_service)):
-    return service.list()
+def list_task_runs(
+    response: Response,
+    limit: int | None = Query(None, ge=1),
+    cursor: str | None = Query(None),
+    service: TaskService = Depends(get_service),
+):
+    try:
+        task_runs, next_cursor = service.list(limit=page_limit(limit), cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    set_next_cursor(response, next_cursor)
+    return task_runs
 
 
 @router.post("/", response_model=TaskRunRead, status_code=status.HTTP_202_ACCEPTED)
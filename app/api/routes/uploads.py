@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_session
+from app.schemas.dataset import FileArtifactRead
+from app.services.uploads import UploadService
+from app.utils.multipart import MultipartFileReader
+from app.workers.tasks import parse_upload
+
+router = APIRouter()
+
+
+def get_service(db: Session = Depends(get_session)) -> UploadService:
+    return UploadService(db)
+
+
+@router.post("", response_model=FileArtifactRead, status_code=status.HTTP_201_CREATED)
+async def upload_file(
+    request: Request,
+    source: str = Query("manual"),
+    data_source: str | None = Query(None, description="数据来源，用于增量计算"),
+    service: UploadService = Depends(get_service),
+):
+    """Stream a multipart ``file`` field into object storage without buffering it.
+
+    The body is read directly from the socket instead of through
+    ``UploadFile``, so the API worker never holds more than one upload part.
+    """
+
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("multipart/form-data"):
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Expected multipart/form-data")
+    try:
+        reader = MultipartFileReader(request.stream(), content_type)
+        artifact = await run_in_threadpool(service.store_stream, reader, source, data_source)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    parse_upload.delay(artifact.id)
+    return artifact
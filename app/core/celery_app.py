@@ -1,6 +1,9 @@
 from celery import Celery
+from celery.schedules import crontab
 
 from app.core.config import settings
+from app.core.database import engine
+from app.core.instrumentation import instrument_celery, instrument_engine
 
 celery_app = Celery(
     "metricone",
@@ -12,6 +15,31 @@ celery_app.conf.update(
     task_default_queue="default",
     task_routes={
         "app.workers.tasks.trigger_task_run": {"queue": "metrics"},
+        "app.workers.tasks.compute_partition": {"queue": "metrics"},
+        "app.workers.tasks.finalize_task_run": {"queue": "metrics"},
+        "app.workers.tasks.run_dependency_levels": {"queue": "metrics"},
+        "app.workers.tasks.finalize_level": {"queue": "metrics"},
+        "app.workers.tasks.schedule_incremental_runs": {"queue": "metrics"},
+        "app.workers.tasks.maintain_metric_value_partitions": {"queue": "metrics"},
+        "app.workers.tasks.refresh_company_rollups": {"queue": "metrics"},
         "app.workers.tasks.compile_dsl": {"queue": "compiler"},
+        "app.workers.tasks.compile_metric_version": {"queue": "compiler"},
+    },
+    beat_schedule={
+        "nightly-incremental-compute": {
+            "task": "app.workers.tasks.schedule_incremental_runs",
+            "schedule": crontab(hour=settings.nightly_compute_hour, minute=0),
+        },
+        "nightly-metric-value-partitions": {
+            "task": "app.workers.tasks.maintain_metric_value_partitions",
+            "schedule": crontab(hour=(settings.nightly_compute_hour - 1) % 24, minute=30),
+        },
+        "nightly-company-rollups": {
+            "task": "app.workers.tasks.refresh_company_rollups",
+            "schedule": crontab(hour=(settings.nightly_compute_hour + 3) % 24, minute=0),
+        },
     },
 )
+
+instrument_celery()
+instrument_engine(engine, "worker")
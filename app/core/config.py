@@ -9,20 +9,49 @@ class Settings(BaseSettings):
     env: str = Field("local", validation_alias="METRICON_ENV")
 
     database_url: PostgresDsn | str = Field(..., validation_alias="DATABASE_URL")
+    db_pool_size: int = Field(10, validation_alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(20, validation_alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(30, validation_alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(1800, validation_alias="DB_POOL_RECYCLE")
     redis_url: str = Field("redis://localhost:6379/0", validation_alias="REDIS_URL")
     minio_endpoint: str = Field("localhost:9000", validation_alias="MINIO_ENDPOINT")
     minio_access_key: str = Field("minio", validation_alias="MINIO_ACCESS_KEY")
     minio_secret_key: str = Field("minio123", validation_alias="MINIO_SECRET_KEY")
     minio_secure: bool = Field(False, validation_alias="MINIO_SECURE")
+    minio_upload_bucket: str = Field("metricone-uploads", validation_alias="MINIO_UPLOAD_BUCKET")
+    upload_part_size: int = Field(16 * 1024 * 1024, validation_alias="UPLOAD_PART_SIZE")
+    upload_csv_block_size: int = Field(1024 * 1024, validation_alias="UPLOAD_CSV_BLOCK_SIZE")
 
     jwt_secret_key: str = Field("super-secret", validation_alias="JWT_SECRET")
     jwt_algorithm: str = Field("HS256")
     jwt_expire_minutes: int = Field(60 * 4)
+    access_control: bool = Field(True, validation_alias="ACCESS_CONTROL")
+    access_policy_cache_ttl_seconds: float = Field(60, validation_alias="ACCESS_POLICY_CACHE_TTL_SECONDS")
 
     airflow_api: str = Field("http://localhost:8080/api/v1", validation_alias="AIRFLOW_API")
     airflow_token: str = Field("", validation_alias="AIRFLOW_TOKEN")
 
+    dsl_plan_cache_size: int = Field(2048, validation_alias="DSL_PLAN_CACHE_SIZE")
+    dsl_plan_cache_redis: bool = Field(False, validation_alias="DSL_PLAN_CACHE_REDIS")
+    dsl_plan_cache_ttl_seconds: int = Field(7 * 24 * 3600, validation_alias="DSL_PLAN_CACHE_TTL_SECONDS")
+
+    list_page_size: int = Field(200, validation_alias="LIST_PAGE_SIZE")
+    list_max_page_size: int = Field(1000, validation_alias="LIST_MAX_PAGE_SIZE")
+
+    compute_partition_companies: int = Field(500, validation_alias="COMPUTE_PARTITION_COMPANIES")
+    nightly_compute_hour: int = Field(2, validation_alias="NIGHTLY_COMPUTE_HOUR")
+    metric_value_partitions_ahead: int = Field(3, validation_alias="METRIC_VALUE_PARTITIONS_AHEAD")
+    metric_value_retention_months: int = Field(0, validation_alias="METRIC_VALUE_RETENTION_MONTHS")
+    metric_value_archive_schema: str = Field("metric_value_archive", validation_alias="METRIC_VALUE_ARCHIVE_SCHEMA")
+    metric_value_cache: bool = Field(True, validation_alias="METRIC_VALUE_CACHE")
+    metric_value_cache_ttl_seconds: int = Field(300, validation_alias="METRIC_VALUE_CACHE_TTL_SECONDS")
+    metric_value_cache_lock_seconds: float = Field(10, validation_alias="METRIC_VALUE_CACHE_LOCK_SECONDS")
+    metric_value_cache_wait_seconds: float = Field(2, validation_alias="METRIC_VALUE_CACHE_WAIT_SECONDS")
+    export_chunk_rows: int = Field(50_000, validation_alias="EXPORT_CHUNK_ROWS")
+    stats_cache_ttl_seconds: float = Field(30, validation_alias="STATS_CACHE_TTL_SECONDS")
+
     prometheus_namespace: str = Field("metricone", validation_alias="PROM_NAMESPACE")
+    celery_metrics_port: int = Field(9808, validation_alias="CELERY_METRICS_PORT")
     cors_allow_origins: list[str] = Field(default_factory=lambda: ["http://localhost:5173"], validation_alias="CORS_ALLOW_ORIGINS")
 
     class Config:
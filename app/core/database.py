@@ -1,13 +1,43 @@
-from collections.abc import Iterator
+from collections.abc import AsyncIterator, Iterator
+from typing import Any
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+# Async drivers for the URLs we accept: psycopg 3 serves both paths under the
+# same dialect name, SQLite needs aiosqlite.
+ASYNC_DRIVERS = {"postgresql": "psycopg", "sqlite": "aiosqlite"}
+
+
+def pool_options(url: URL) -> dict[str, Any]:
+    if url.get_backend_name() == "sqlite":
+        # SQLite pools are per-file/per-thread; sizing options do not apply.
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+
+
+def async_url(url: str | URL) -> URL:
+    url = make_url(str(url))
+    return url.set(drivername=f"{url.get_backend_name()}+{ASYNC_DRIVERS[url.get_backend_name()]}")
+
+
+database_url = make_url(str(settings.database_url))
+engine = create_engine(database_url, pool_pre_ping=True, **pool_options(database_url))
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+async_engine = create_async_engine(async_url(database_url), pool_pre_ping=True, **pool_options(database_url))
+# Objects outlive the commit so routes can serialise them after the session is done.
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db() -> Iterator[Session]:
     db = SessionLocal()
@@ -15,3 +45,8 @@ def get_db() -> Iterator[Session]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,225 @@
+"""Prometheus metrics for the API, the database engines and the Celery workers.
+
+The API serves them at ``/metrics``. Celery workers serve theirs on
+``CELERY_METRICS_PORT``. With ``PROMETHEUS_MULTIPROC_DIR`` set, each
+prefork child writes its samples there and the exporter aggregates them.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from celery import signals
+from fastapi import FastAPI, Request, Response
+from loguru import logger
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+NAMESPACE = settings.prometheus_namespace
+# Published tasks carry their enqueue time so workers can report queue lag.
+PUBLISHED_AT_HEADER = "published_at"
+_SQL_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_TASK_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "API request latency by route template.",
+    ["method", "route", "status"],
+    namespace=NAMESPACE,
+)
+REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "SQL statements issued per API request.",
+    ["method", "route"],
+    namespace=NAMESPACE,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent in SQL per API request.",
+    ["method", "route"],
+    namespace=NAMESPACE,
+    buckets=_SQL_BUCKETS,
+)
+DB_STATEMENT_SECONDS = Histogram(
+    "db_statement_duration_seconds",
+    "SQL statement execution time.",
+    ["engine"],
+    namespace=NAMESPACE,
+    buckets=_SQL_BUCKETS,
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Connection pool usage by state: checked_out, idle, overflow and the configured size.",
+    ["engine", "state"],
+    namespace=NAMESPACE,
+    multiprocess_mode="livesum",
+)
+CELERY_TASK_SECONDS = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time.",
+    ["task", "queue", "state"],
+    namespace=NAMESPACE,
+    buckets=_TASK_BUCKETS,
+)
+CELERY_QUEUE_LAG_SECONDS = Histogram(
+    "celery_task_queue_lag_seconds",
+    "Time a Celery task waited in its queue before starting.",
+    ["task", "queue"],
+    namespace=NAMESPACE,
+    buckets=_TASK_BUCKETS,
+)
+COMPUTE_RUN_ROWS = Histogram(
+    "compute_run_rows_written",
+    "metric_value rows written per compute run.",
+    ["status"],
+    namespace=NAMESPACE,
+    buckets=(0, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000),
+)
+COMPUTE_ROWS_TOTAL = Counter(
+    "compute_rows_written",
+    "metric_value rows written by compute runs.",
+    namespace=NAMESPACE,
+)
+
+
+@dataclass
+class _RequestSQL:
+    statements: int = 0
+    seconds: float = 0.0
+
+
+# Set per request by the API middleware; engine events add to whichever is current.
+_request_sql: ContextVar[_RequestSQL | None] = ContextVar("request_sql", default=None)
+_instrumented: set[int] = set()
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Time every statement on ``engine`` and report its pool usage."""
+
+    if id(engine) in _instrumented:
+        return
+    _instrumented.add(id(engine))
+    statement_seconds = DB_STATEMENT_SECONDS.labels(name)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        statement_seconds.observe(elapsed)
+        current = _request_sql.get()
+        if current is not None:
+            current.statements += 1
+            current.seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context) -> None:
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    pool = engine.pool
+    # SQLite's pools are not sized, so there is nothing to saturate.
+    if hasattr(pool, "checkedout"):
+        DB_POOL_CONNECTIONS.labels(name, "checked_out").set_function(pool.checkedout)
+        DB_POOL_CONNECTIONS.labels(name, "idle").set_function(pool.checkedin)
+        DB_POOL_CONNECTIONS.labels(name, "overflow").set_function(lambda: max(pool.overflow(), 0))
+        DB_POOL_CONNECTIONS.labels(name, "size").set_function(pool.size)
+
+
+def instrument_app(app: FastAPI) -> None:
+    """Time every request by route template and count the SQL it issued; serve ``/metrics``."""
+
+    @app.middleware("http")
+    async def _observe(request: Request, call_next):
+        sql = _RequestSQL()
+        token = _request_sql.set(sql)
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            _request_sql.reset(token)
+            route = request.scope.get("route")
+            # Templates, not raw paths, keep label cardinality bounded.
+            template = getattr(route, "path", "unmatched")
+            if template != "/metrics":
+                HTTP_REQUEST_SECONDS.labels(request.method, template, str(status)).observe(
+                    time.perf_counter() - started
+                )
+                REQUEST_DB_STATEMENTS.labels(request.method, template).observe(sql.statements)
+                REQUEST_DB_SECONDS.labels(request.method, template).observe(sql.seconds)
+
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics() -> Response:
+        return Response(generate_latest(_registry()), media_type=CONTENT_TYPE_LATEST)
+
+
+def instrument_celery() -> None:
+    """Record task durations and queue lag; each worker serves them on ``CELERY_METRICS_PORT``."""
+
+    started: dict[str, float] = {}
+
+    @signals.before_task_publish.connect(weak=False)
+    def _stamp(headers=None, **_) -> None:
+        if headers is not None:
+            headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+    @signals.task_prerun.connect(weak=False)
+    def _prerun(task_id=None, task=None, **_) -> None:
+        started[task_id] = time.perf_counter()
+        published_at = getattr(task.request, PUBLISHED_AT_HEADER, None)
+        if published_at is not None:
+            CELERY_QUEUE_LAG_SECONDS.labels(task.name, _queue(task)).observe(max(time.time() - published_at, 0.0))
+
+    @signals.task_postrun.connect(weak=False)
+    def _postrun(task_id=None, task=None, state=None, **_) -> None:
+        begun = started.pop(task_id, None)
+        if begun is not None:
+            elapsed = time.perf_counter() - begun
+            CELERY_TASK_SECONDS.labels(task.name, _queue(task), state or "UNKNOWN").observe(elapsed)
+
+    @signals.worker_ready.connect(weak=False)
+    def _serve(**_) -> None:
+        if settings.celery_metrics_port:
+            start_http_server(settings.celery_metrics_port, registry=_registry())
+            logger.info("Serving Celery metrics on :{}", settings.celery_metrics_port)
+
+
+def observe_compute_run(status: str, rows_written: int) -> None:
+    COMPUTE_RUN_ROWS.labels(status).observe(rows_written)
+    COMPUTE_ROWS_TOTAL.inc(rows_written)
+
+
+def _queue(task) -> str:
+    delivery = task.request.delivery_info or {}
+    return delivery.get("routing_key") or delivery.get("exchange") or "default"
+
+
+def _registry() -> CollectorRegistry:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
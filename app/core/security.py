@@ -9,12 +9,14 @@ from app.core.config import settings
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
+# For endpoints that also serve anonymous callers, with fewer rights.
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token", auto_error=False)
 
 
-def create_access_token(subject: str, expires_minutes: int | None = None) -> str:
+def create_access_token(subject: str, roles: list[str] | None = None, expires_minutes: int | None = None) -> str:
     expires_delta = timedelta(minutes=expires_minutes or settings.jwt_expire_minutes)
     expire = datetime.now(tz=timezone.utc) + expires_delta
-    to_encode = {"sub": subject, "exp": expire}
+    to_encode = {"sub": subject, "roles": sorted(roles or []), "exp": expire}
     return jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
 
 
@@ -0,0 +1,199 @@
+"""Compile metric DSL into evaluator plans behind a content-addressed cache.
+
+Plans are keyed by a hash of the normalised DSL text plus ``GRAMMAR_VERSION``,
+so identical formulas across metric versions and caliber overrides share one
+entry and a grammar change invalidates everything. A bounded in-process LRU
+sits in front of an optional Redis tier shared by all compiler workers.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from loguru import logger
+
+from app.core.config import settings
+from app.dsl.evaluator import CompiledExpression, compile_expression
+from app.dsl.parser import GRAMMAR_VERSION, parse_metric
+from app.utils.redis import get_redis_client
+
+REDIS_KEY_PREFIX = "metricone:dsl:plan:"
+# Keys a JSON ``formula_dsl`` / ``override_expr_dsl`` may carry the DSL text under.
+DSL_TEXT_KEYS = ("dsl", "text", "expression")
+_OPERATOR_SPACING = re.compile(r"\s*([=+*()])\s*")
+
+
+@dataclass(frozen=True)
+class CompiledDSL:
+    key: str
+    ast: dict
+    plan: CompiledExpression
+
+    @property
+    def identifiers(self) -> tuple[str, ...]:
+        return self.plan.identifiers
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "key": self.key,
+                "ast": self.ast,
+                "metric": self.plan.metric,
+                "instructions": [list(instruction) for instruction in self.plan.instructions],
+                "identifiers": list(self.plan.identifiers),
+            },
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> CompiledDSL:
+        data = json.loads(raw)
+        plan = CompiledExpression(
+            metric=data["metric"],
+            instructions=tuple(tuple(instruction) for instruction in data["instructions"]),
+            identifiers=tuple(data["identifiers"]),
+        )
+        return cls(key=data["key"], ast=data["ast"], plan=plan)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+    size: int = 0
+    maxsize: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.redis_hits + self.misses
+        return (self.hits + self.redis_hits) / lookups if lookups else 0.0
+
+
+def normalize_dsl(text: str) -> str:
+    """Drop insignificant whitespace so formatting-only edits share a cache entry."""
+
+    return _OPERATOR_SPACING.sub(r"\1", " ".join(text.split()))
+
+
+def dsl_source(value: str | dict | None) -> str | dict | None:
+    """Extract the DSL from a ``formula_dsl``-style column value.
+
+    Returns the DSL text, an already parsed AST dict, or ``None`` when the
+    value holds no expression.
+    """
+
+    if value is None or isinstance(value, str):
+        return value or None
+    if "type" in value or isinstance(value.get("expression"), dict):
+        return value
+    for key in DSL_TEXT_KEYS:
+        text = value.get(key)
+        if isinstance(text, str) and text.strip():
+            return text
+    return None
+
+
+def cache_key(source: str | dict) -> str:
+    if isinstance(source, str):
+        material = "text:" + normalize_dsl(source)
+    else:
+        material = "ast:" + json.dumps(source, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{GRAMMAR_VERSION}\0{material}".encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    def __init__(self, maxsize: int, redis_client: Any | None = None, redis_ttl: int | None = None):
+        self.maxsize = maxsize
+        self.redis_client = redis_client
+        self.redis_ttl = redis_ttl
+        self._entries: OrderedDict[str, CompiledDSL] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats(maxsize=maxsize)
+
+    def get_or_compile(self, source: str | dict) -> CompiledDSL:
+        key = cache_key(source)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return compiled
+
+        compiled = self._redis_get(key)
+        shared_hit = compiled is not None
+        if compiled is None:
+            compiled = _compile(key, source)
+            self._redis_set(compiled)
+        self._store(compiled, shared_hit)
+        return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = CacheStats(maxsize=self.maxsize)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            self._stats.size = len(self._entries)
+            return CacheStats(**vars(self._stats))
+
+    def _store(self, compiled: CompiledDSL, shared_hit: bool) -> None:
+        with self._lock:
+            if shared_hit:
+                self._stats.redis_hits += 1
+            else:
+                self._stats.misses += 1
+            self._entries[compiled.key] = compiled
+            self._entries.move_to_end(compiled.key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _redis_get(self, key: str) -> CompiledDSL | None:
+        if self.redis_client is None:
+            return None
+        try:
+            raw = self.redis_client.get(REDIS_KEY_PREFIX + key)
+        except Exception as exc:  # noqa: BLE001 - the shared tier is best effort
+            logger.warning("DSL plan cache: redis read failed: {}", exc)
+            return None
+        return CompiledDSL.from_json(raw) if raw else None
+
+    def _redis_set(self, compiled: CompiledDSL) -> None:
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.set(REDIS_KEY_PREFIX + compiled.key, compiled.to_json(), ex=self.redis_ttl)
+        except Exception as exc:  # noqa: BLE001 - the shared tier is best effort
+            logger.warning("DSL plan cache: redis write failed: {}", exc)
+
+
+def _compile(key: str, source: str | dict) -> CompiledDSL:
+    ast = parse_metric(normalize_dsl(source)) if isinstance(source, str) else source
+    return CompiledDSL(key=key, ast=ast, plan=compile_expression(ast))
+
+
+def _build_cache() -> PlanCache:
+    return PlanCache(
+        settings.dsl_plan_cache_size,
+        redis_client=get_redis_client() if settings.dsl_plan_cache_redis else None,
+        redis_ttl=settings.dsl_plan_cache_ttl_seconds,
+    )
+
+
+plan_cache = _build_cache()
+
+
+def compile_dsl(value: str | dict | None) -> CompiledDSL | None:
+    """Compile a DSL text or ``formula_dsl`` JSON value through the shared cache."""
+
+    source = dsl_source(value)
+    if source is None:
+        return None
+    return plan_cache.get_or_compile(source)
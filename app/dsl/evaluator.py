@@ -0,0 +1,175 @@
+"""Columnar evaluation of parsed metric expressions.
+
+``compile_expression`` turns the dict AST produced by ``parse_metric`` into a
+flat postfix program once; ``evaluate_columns`` then runs that program over
+whole NumPy / pyarrow columns so the per-row cost is paid inside NumPy rather
+than in the interpreter. ``evaluate_row`` walks the AST directly and is kept as
+the reference implementation for equality checks.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pyarrow as pa
+
+_OPERATORS = {"add": np.add, "mul": np.multiply}
+
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    """A metric expression lowered to a postfix instruction list.
+
+    Instructions are ``("load", name)``, ``("const", value)`` or
+    ``(op, arity)`` where ``op`` is ``"add"`` or ``"mul"``.
+    """
+
+    metric: str | None
+    instructions: tuple[tuple[str, Any], ...]
+    identifiers: tuple[str, ...]
+
+    def evaluate(self, columns: Mapping[str, Any], length: int | None = None) -> np.ndarray:
+        return evaluate_columns(self, columns, length)
+
+
+def compile_expression(parsed: dict) -> CompiledExpression:
+    """Compile the output of ``parse_metric`` (or a bare expression node)."""
+
+    node = parsed.get("expression", parsed)
+    instructions: list[tuple[str, Any]] = []
+    identifiers: list[str] = []
+    _emit(_fold(node), instructions, identifiers)
+    return CompiledExpression(
+        metric=parsed.get("metric"),
+        instructions=tuple(instructions),
+        identifiers=tuple(dict.fromkeys(identifiers)),
+    )
+
+
+def evaluate_columns(
+    plan: CompiledExpression,
+    columns: Mapping[str, Any],
+    length: int | None = None,
+) -> np.ndarray:
+    """Evaluate ``plan`` over equally sized columns and return a float64 array.
+
+    ``columns`` may hold NumPy arrays, pyarrow arrays/chunked arrays or plain
+    sequences; a ``pyarrow.RecordBatch`` or ``pyarrow.Table`` is accepted as
+    well. Nulls become NaN and propagate through the arithmetic.
+    """
+
+    if isinstance(columns, (pa.RecordBatch, pa.Table)):
+        columns = {name: columns.column(name) for name in columns.schema.names}
+
+    inputs = {name: _as_float_array(columns, name) for name in plan.identifiers}
+    if length is None:
+        length = len(next(iter(inputs.values()))) if inputs else 1
+    for name, array in inputs.items():
+        if len(array) != length:
+            raise ValueError(f"Column {name} has {len(array)} rows, expected {length}")
+
+    # Each stack slot records whether the array is a scratch buffer we own and
+    # may therefore overwrite in place instead of allocating another temporary.
+    stack: list[tuple[np.ndarray | float, bool]] = []
+    for op, arg in plan.instructions:
+        if op == "load":
+            stack.append((inputs[arg], False))
+        elif op == "const":
+            stack.append((arg, False))
+        else:
+            operands = stack[-arg:]
+            del stack[-arg:]
+            stack.append(_apply(_OPERATORS[op], operands, length))
+
+    result, owned = stack.pop()
+    if isinstance(result, float):
+        return np.full(length, result, dtype=np.float64)
+    return result if owned else result.copy()
+
+
+def evaluate_row(parsed: dict, row: Mapping[str, Any]) -> float:
+    """Row-at-a-time reference evaluation of a parsed expression."""
+
+    node = parsed.get("expression", parsed)
+    node_type = node["type"]
+    if node_type == "number":
+        return float(node["value"])
+    if node_type == "identifier":
+        value = row[node["value"]]
+        return math.nan if value is None else float(value)
+    values = [evaluate_row(operand, row) for operand in node["operands"]]
+    if node_type == "add":
+        return sum(values)
+    if node_type == "mul":
+        return math.prod(values)
+    raise ValueError(f"Unsupported expression node: {node_type}")
+
+
+def _fold(node: dict) -> dict:
+    """Fold constant operands of add/mul nodes into a single number."""
+
+    node_type = node["type"]
+    if node_type in ("number", "identifier"):
+        return node
+    if node_type not in _OPERATORS:
+        raise ValueError(f"Unsupported expression node: {node_type}")
+    operands = [_fold(operand) for operand in node["operands"]]
+    constants = [operand["value"] for operand in operands if operand["type"] == "number"]
+    others = [operand for operand in operands if operand["type"] != "number"]
+    if len(constants) > 1 or (constants and not others):
+        folded = sum(constants) if node_type == "add" else math.prod(constants)
+        constants = [folded]
+    operands = others + [{"type": "number", "value": value} for value in constants]
+    if len(operands) == 1:
+        return operands[0]
+    return {"type": node_type, "operands": operands}
+
+
+def _emit(node: dict, instructions: list[tuple[str, Any]], identifiers: list[str]) -> None:
+    node_type = node["type"]
+    if node_type == "number":
+        instructions.append(("const", float(node["value"])))
+    elif node_type == "identifier":
+        identifiers.append(node["value"])
+        instructions.append(("load", node["value"]))
+    else:
+        for operand in node["operands"]:
+            _emit(operand, instructions, identifiers)
+        instructions.append((node_type, len(node["operands"])))
+
+
+def _apply(
+    ufunc: np.ufunc,
+    operands: list[tuple[np.ndarray | float, bool]],
+    length: int,
+) -> tuple[np.ndarray, bool]:
+    # Accumulate into an operand we already own when possible; otherwise
+    # allocate exactly one output buffer for the whole n-ary operation.
+    index = next((i for i, (_, owned) in enumerate(operands) if owned), None)
+    if index is None:
+        out = np.empty(length, dtype=np.float64)
+        first, second, *rest = [value for value, _ in operands]
+        ufunc(first, second, out=out)
+    else:
+        out = operands[index][0]
+        rest = [value for i, (value, _) in enumerate(operands) if i != index]
+    for value in rest:
+        ufunc(out, value, out=out)
+    return out, True
+
+
+def _as_float_array(columns: Mapping[str, Any], name: str) -> np.ndarray:
+    try:
+        column = columns[name]
+    except KeyError as exc:
+        raise ValueError(f"Missing input column: {name}") from exc
+    if isinstance(column, (pa.Array, pa.ChunkedArray)):
+        column = column.cast(pa.float64()).to_numpy(zero_copy_only=False)
+    array = np.asarray(column, dtype=np.float64)
+    if array.ndim != 1:
+        raise ValueError(f"Column {name} must be one-dimensional")
+    return array
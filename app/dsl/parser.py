@@ -1,16 +1,24 @@
 from __future__ import annotations
 
+import hashlib
 from pathlib import Path
 
 from lark import Lark, Transformer
 
 GRAMMAR_PATH = Path(__file__).with_name("grammar.lark")
+GRAMMAR_VERSION = hashlib.sha256(GRAMMAR_PATH.read_bytes()).hexdigest()[:12]
 
 
 class MetricTransformer(Transformer):
     def metric(self, items):  # noqa: D401 - lark entry point
         return {"metric": str(items[0]), "expression": items[1]}
 
+    def expr(self, items):
+        return {"type": "add", "operands": list(items)}
+
+    def term(self, items):
+        return {"type": "mul", "operands": list(items)}
+
     def identifier(self, token):
         return {"type": "identifier", "value": str(token[0])}
 
@@ -1,9 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.routes import metrics, datasets, tasks, auth, dashboard, calibers, dimensions
+from app.api.routes import metrics, datasets, tasks, auth, dashboard, calibers, dimensions, uploads, metric_values
 from app.core.config import settings
+from app.core.database import async_engine, engine
+from app.core.instrumentation import instrument_app, instrument_engine
 from app.core.logging import setup_logging
+from app.utils.pagination import NEXT_CURSOR_HEADER
 
 setup_logging()
 
@@ -20,15 +23,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+instrument_app(app)
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
 
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
+app.include_router(metric_values.router, prefix="/api/metric", tags=["metric-values"])
 app.include_router(datasets.router, prefix="/api/datasets", tags=["datasets"])
 app.include_router(tasks.router, prefix="/api/tasks", tags=["tasks"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
 app.include_router(calibers.router, prefix="/api/calibers", tags=["calibers"])
 app.include_router(dimensions.router, prefix="/api/dimensions", tags=["dimensions"])
+app.include_router(uploads.router, prefix="/api/upload", tags=["uploads"])
 
 
 @app.get("/healthz", tags=["meta"])
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Optional
 
-from sqlalchemy import ForeignKey, JSON
+from sqlalchemy import ForeignKey, JSON, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -25,15 +25,26 @@ class User(Base, TimestampMixin):
     email: Mapped[Optional[str]]
     hashed_password: Mapped[str]
     is_active: Mapped[bool] = mapped_column(default=True)
+    # Role names, matched against ``AccessPolicy.role``; carried in the access token.
+    roles: Mapped[list[str]] = mapped_column(JSON, default=list)
 
 
 class AccessPolicy(Base, TimestampMixin):
+    """Grant ``actions`` to ``role``.
+
+    With a ``metric_id`` the grant covers that metric whatever its
+    sensitivity; without one it covers every metric of ``sensitivity`` or a
+    lower level. ``company_code`` limits the data the grant reads to that
+    company and the companies below it.
+    """
+
     __tablename__ = "access_policies"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    metric_id: Mapped[int] = mapped_column(ForeignKey("metric.id", ondelete="CASCADE"))
-    role: Mapped[str]
+    metric_id: Mapped[Optional[int]] = mapped_column(ForeignKey("metric.id", ondelete="CASCADE"))
+    role: Mapped[str] = mapped_column(index=True)
     sensitivity: Mapped[str] = mapped_column(default="normal")
     actions: Mapped[list[str]] = mapped_column(JSON)
+    company_code: Mapped[Optional[str]] = mapped_column(String(128))
 
-    metric: Mapped["Metric"] = relationship("Metric")
+    metric: Mapped[Optional["Metric"]] = relationship("Metric")
@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from sqlalchemy import MetaData
+from sqlalchemy import JSON, MetaData
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 metadata = MetaData(
@@ -13,6 +14,9 @@ metadata = MetaData(
     }
 )
 
+# JSONB on PostgreSQL, plain JSON elsewhere so the schema also builds on SQLite.
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
 
 class Base(DeclarativeBase):
     metadata = metadata
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import ForeignKey, JSON
+from sqlalchemy import Date, ForeignKey, Index, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -42,3 +43,21 @@ class FileArtifact(Base, TimestampMixin):
     content_type: Mapped[str]
     size: Mapped[int]
     tags: Mapped[Optional[dict]] = mapped_column(JSON)
+
+
+class DataSourceChange(Base):
+    """Append-only log of the (month, company) slices a data source has written.
+
+    ``id`` is the change watermark: a source's watermark is the largest id
+    logged for it, and a compute run records the watermarks it consumed so
+    the next incremental run only revisits slices logged after them.
+    """
+
+    __tablename__ = "data_source_changes"
+    __table_args__ = (Index("ix_data_source_changes_source_id", "source", "id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    source: Mapped[str]
+    period_date: Mapped[date] = mapped_column(Date())
+    company_code: Mapped[str]
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
@@ -3,15 +3,34 @@ from __future__ import annotations
 from datetime import datetime, date
 from typing import Optional
 
-from sqlalchemy import Date, ForeignKey, JSON, Numeric, String, Text
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import DDL, Date, ForeignKey, Index, JSON, Numeric, PrimaryKeyConstraint, String, Text, event, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.models.base import Base
+from app.models.base import Base, JSONDocument
+
+# Keyword search (app.services.search) is served by trigram indexes on PostgreSQL.
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+def _trigram_index(table: str, column: str) -> Index:
+    """GIN trigram index answering ``ILIKE '%keyword%'`` on ``column``; skipped on other dialects."""
+
+    return Index(
+        f"ix_{table}_{column}_trgm", column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"}
+    ).ddl_if(dialect="postgresql")
 
 
 class Metric(Base):
     __tablename__ = "metric"
+    __table_args__ = (
+        _trigram_index("metric", "code"),
+        _trigram_index("metric", "name"),
+        _trigram_index("metric", "owner"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     code: Mapped[str] = mapped_column(String(64), unique=True, index=True)
@@ -40,10 +59,10 @@ class MetricVersion(Base):
     subject_area: Mapped[Optional[str]] = mapped_column(String(64))
     effective_from: Mapped[date]
     effective_to: Mapped[Optional[date]]
-    grain: Mapped[list[str]] = mapped_column(JSONB)
+    grain: Mapped[list[str]] = mapped_column(JSONDocument)
     formula_sql: Mapped[Optional[str]] = mapped_column(Text())
-    formula_dsl: Mapped[Optional[dict]] = mapped_column(JSONB)
-    data_sources: Mapped[Optional[list[str]]] = mapped_column(JSONB)
+    formula_dsl: Mapped[Optional[dict]] = mapped_column(JSONDocument)
+    data_sources: Mapped[Optional[list[str]]] = mapped_column(JSONDocument)
     notes: Mapped[Optional[str]] = mapped_column(Text())
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
 
@@ -77,9 +96,9 @@ class MetricVersionCaliber(Base):
     caliber_id: Mapped[Optional[int]] = mapped_column(ForeignKey("metric_caliber.id", ondelete="SET NULL"))
     status: Mapped[str] = mapped_column(String(16), default="active")
     order_index: Mapped[int] = mapped_column(default=0)
-    override_expr_dsl: Mapped[Optional[dict]] = mapped_column(JSONB)
+    override_expr_dsl: Mapped[Optional[dict]] = mapped_column(JSONDocument)
     override_expr_sql: Mapped[Optional[str]] = mapped_column(Text())
-    override_data_sources: Mapped[Optional[list[str]]] = mapped_column(JSONB)
+    override_data_sources: Mapped[Optional[list[str]]] = mapped_column(JSONDocument)
     notes: Mapped[Optional[str]] = mapped_column(Text())
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
 
@@ -90,6 +109,37 @@ class MetricVersionCaliber(Base):
 
 class MetricValue(Base):
     __tablename__ = "metric_value"
+    # Every index carries the full key so keyset pagination can walk it in
+    # order, and INCLUDEs the value columns so lookups stay index-only.
+    # On PostgreSQL the table is range-partitioned by month on period_date
+    # (see app.services.partitions); every index is then per partition.
+    __table_args__ = (
+        PrimaryKeyConstraint(
+            "metric_version_caliber_id",
+            "period_date",
+            "company_code",
+            "dimensions_key",
+            postgresql_include=["value", "value_status", "combo_id"],
+        ),
+        Index(
+            "ix_metric_value_company_period",
+            "company_code",
+            "period_date",
+            "metric_version_caliber_id",
+            "dimensions_key",
+            postgresql_include=["value", "value_status", "combo_id"],
+        ),
+        Index(
+            "ix_metric_value_combo_period",
+            "combo_id",
+            "period_date",
+            "metric_version_caliber_id",
+            "company_code",
+            "dimensions_key",
+            postgresql_include=["value", "value_status"],
+        ),
+        {"postgresql_partition_by": "RANGE (period_date)"},
+    )
 
     metric_version_caliber_id: Mapped[int] = mapped_column(
         ForeignKey("metric_version_caliber.id", ondelete="CASCADE"), primary_key=True
@@ -108,8 +158,77 @@ class MetricValue(Base):
     combo: Mapped[Optional["DimCombo"]] = relationship(back_populates="metric_values")
 
 
+class MetricValueRollup(Base):
+    """Sum of a binding's values over a company and all its descendants, across dimension combos.
+
+    Maintained by ``app.services.rollups`` from ``metric_value``; ``level`` is
+    the level of ``company_code`` in the company hierarchy.
+    """
+
+    __tablename__ = "metric_value_rollup"
+    __table_args__ = (
+        PrimaryKeyConstraint(
+            "metric_version_caliber_id",
+            "period_date",
+            "company_code",
+            postgresql_include=["level", "value", "leaf_rows"],
+        ),
+        Index(
+            "ix_metric_value_rollup_company_period",
+            "company_code",
+            "period_date",
+            "metric_version_caliber_id",
+            postgresql_include=["level", "value", "leaf_rows"],
+        ),
+    )
+
+    metric_version_caliber_id: Mapped[int] = mapped_column(
+        ForeignKey("metric_version_caliber.id", ondelete="CASCADE"), primary_key=True
+    )
+    period_date: Mapped[date] = mapped_column(Date(), primary_key=True)
+    company_code: Mapped[str] = mapped_column(String(64), primary_key=True)
+    level: Mapped[int]
+    value: Mapped[Optional[float]] = mapped_column(Numeric(18, 4))
+    # metric_value rows summed into ``value``.
+    leaf_rows: Mapped[int] = mapped_column(default=0)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class RollupWatermark(Base):
+    """Change-log watermark per data source that the company rollups are up to date with."""
+
+    __tablename__ = "metric_value_rollup_watermark"
+
+    source: Mapped[str] = mapped_column(String(128), primary_key=True)
+    watermark: Mapped[int] = mapped_column(default=0)
+
+
 class DimCombo(Base):
     __tablename__ = "dim_combo"
+    __table_args__ = (
+        Index(
+            "ux_dim_combo_members",
+            "company_id",
+            "core_company_id",
+            "product_id",
+            "channel_id",
+            unique=True,
+            postgresql_nulls_not_distinct=True,
+        ).ddl_if(dialect="postgresql"),
+        # SQLite has no NULLS NOT DISTINCT; with NULL mapped to -1 (never an id)
+        # ON CONFLICT still dedupes combos that lack a member.
+        Index(
+            "ux_dim_combo_members_sqlite",
+            *(
+                text(f"coalesce({column}, -1)")
+                for column in ("company_id", "core_company_id", "product_id", "channel_id")
+            ),
+            unique=True,
+        ).ddl_if(dialect="sqlite"),
+        # Keyword search finds combos through whichever member matched.
+        Index("ix_dim_combo_product", "product_id"),
+        Index("ix_dim_combo_channel", "channel_id"),
+    )
 
     combo_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     company_id: Mapped[Optional[int]] = mapped_column(ForeignKey("dim_company.company_id"))
@@ -130,6 +249,10 @@ class DimCombo(Base):
 
 class DimCompany(Base):
     __tablename__ = "dim_company"
+    __table_args__ = (
+        _trigram_index("dim_company", "company_code"),
+        _trigram_index("dim_company", "company_name"),
+    )
 
     company_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     company_code: Mapped[Optional[str]] = mapped_column(String(128))
@@ -140,8 +263,31 @@ class DimCompany(Base):
     is_active: Mapped[Optional[bool]]
 
 
+class DimCompanyClosure(Base):
+    """Every (ancestor, descendant) pair of the company tree, including each company with itself at depth 0.
+
+    Kept in step with ``dim_company`` by ``app.services.dimensions``, so a
+    subtree is one range scan of the primary key.
+    """
+
+    __tablename__ = "dim_company_closure"
+    __table_args__ = (Index("ix_dim_company_closure_descendant", "descendant_id", "ancestor_id", "depth"),)
+
+    ancestor_id: Mapped[int] = mapped_column(
+        ForeignKey("dim_company.company_id", ondelete="CASCADE"), primary_key=True
+    )
+    descendant_id: Mapped[int] = mapped_column(
+        ForeignKey("dim_company.company_id", ondelete="CASCADE"), primary_key=True
+    )
+    depth: Mapped[int]
+
+
 class DimProduct(Base):
     __tablename__ = "dim_product"
+    __table_args__ = (
+        _trigram_index("dim_product", "product_code"),
+        _trigram_index("dim_product", "product_name"),
+    )
 
     product_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     product_code: Mapped[Optional[str]] = mapped_column(String(128))
@@ -151,8 +297,22 @@ class DimProduct(Base):
 
 class DimChannel(Base):
     __tablename__ = "dim_channel"
+    __table_args__ = (
+        _trigram_index("dim_channel", "channel_code"),
+        _trigram_index("dim_channel", "channel_name"),
+    )
 
     channel_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     channel_code: Mapped[Optional[str]] = mapped_column(String(128))
     channel_name: Mapped[Optional[str]] = mapped_column(String(255))
     channel_type: Mapped[Optional[str]] = mapped_column(Text())
+
+
+class DimensionRevision(Base):
+    """Change counter per dimension table, bumped on every write to it."""
+
+    __tablename__ = "dim_revision"
+
+    table_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    revision: Mapped[int] = mapped_column(default=0)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -44,6 +44,17 @@ class VersionCaliberCreate(VersionCaliberBase):
     pass
 
 
+class VersionCaliberReplace(VersionCaliberBase):
+    """One entry of a version's complete binding list; ``order_index`` is taken from its position.
+
+    ``id`` keeps an existing binding (and the values stored under it); entries
+    without one reuse the version's binding of the same caliber if there is
+    one, otherwise a new binding is created.
+    """
+
+    id: int | None = None
+
+
 class VersionCaliberUpdate(BaseModel):
     status: str | None = None
     order_index: int | None = None
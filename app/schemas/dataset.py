@@ -21,3 +21,15 @@ class DatasetRead(DatasetBase):
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class FileArtifactRead(BaseModel):
+    id: int
+    path: str
+    bucket: str
+    content_type: str
+    size: int
+    tags: dict[str, Any] | None = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
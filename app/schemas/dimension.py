@@ -40,3 +40,10 @@ class ComboRead(BaseModel):
     product_name: str | None = None
     channel_name: str | None = None
     model_config = ConfigDict(from_attributes=True)
+
+
+class DimensionSuggestion(BaseModel):
+    id: int
+    code: str | None = None
+    name: str | None = None
+    model_config = ConfigDict(from_attributes=True)
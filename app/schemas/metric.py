@@ -61,6 +61,16 @@ class MetricCreate(MetricBase):
     initial_version: MetricVersionCreate
 
 
+class MetricListItem(MetricBase):
+    """Metric row without nested versions, returned by ``fields=summary`` listings."""
+
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class MetricRead(MetricBase):
     id: int
     created_at: datetime
@@ -86,3 +96,40 @@ class MetricUpdate(BaseModel):
     owner: str | None = None
     sensitivity: str | None = None
     updated_by: str | None = None
+
+
+class CatalogBinding(BaseModel):
+    """Caliber binding in a catalog import, naming the caliber by code."""
+
+    caliber_code: str
+    status: str = "active"
+    order_index: int | None = None
+    override_expr_sql: str | None = None
+    override_expr_dsl: dict | None = None
+    override_data_sources: list[str] | None = None
+    notes: str | None = None
+
+
+class CatalogVersion(MetricVersionCreate):
+    calibers: list[CatalogBinding] = []
+
+
+class CatalogMetric(MetricBase):
+    """One catalog import row: a metric, its initial version and that version's caliber bindings."""
+
+    initial_version: CatalogVersion
+
+
+class CatalogRowError(BaseModel):
+    row: int
+    code: str | None = None
+    errors: list[str]
+
+
+class CatalogImportResult(BaseModel):
+    rows: int
+    metrics: int = 0
+    versions: int = 0
+    bindings: int = 0
+    dry_run: bool = False
+    errors: list[CatalogRowError] = []
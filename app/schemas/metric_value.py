@@ -0,0 +1,39 @@
+from datetime import date
+
+from pydantic import BaseModel, ConfigDict
+
+
+class MetricValueQuery(BaseModel):
+    code: str | None = None
+    version: str | None = None
+    period_date: date | None = None
+    date_from: date | None = None
+    date_to: date | None = None
+    company_code: str | None = None
+    combo_id: int | None = None
+    # Company totals including descendants, from the pre-aggregated rollups.
+    rollup: bool = False
+    level: int | None = None
+
+    model_config = ConfigDict(frozen=True)
+
+    @property
+    def wants_rollup(self) -> bool:
+        return self.rollup or self.level is not None
+
+
+class MetricValueRead(BaseModel):
+    metric_version_caliber_id: int
+    period_date: date
+    company_code: str
+    dimensions_key: str
+    combo_id: int | None = None
+    value: float | None = None
+    value_status: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MetricValuePage(BaseModel):
+    items: list[MetricValueRead]
+    next_cursor: str | None = None
@@ -0,0 +1,184 @@
+"""Access-policy evaluation, compiled once per role set and applied inside the queries.
+
+A caller's roles are compiled into ``Permissions``: the metric sensitivities
+they may read on every metric, the metrics granted to them individually and
+the companies their data is limited to. Services turn those into ``WHERE``
+clauses, so unreadable rows never leave the database and the cost of a check
+does not grow with the catalogue. Compiled permissions are cached per role
+set and dropped when a policy is written through this process; the TTL
+bounds staleness for writes made elsewhere.
+
+Everyone may read ``normal`` metrics. Sensitivities outside
+``SENSITIVITY_LEVELS`` rank with the highest level. A caller with any read
+grant limited to a company sees data of that company's subtree only, for
+every metric, unless another of its read grants is unlimited.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.config import settings
+from app.models.access import AccessPolicy
+from app.models.metric import DimCompany, DimCompanyClosure, Metric, MetricVersion, MetricVersionCaliber
+from app.services.stats_cache import TTLCache
+from app.utils.invalidation import CommitHook, flushed
+
+# Metric sensitivity levels, lowest first.
+SENSITIVITY_LEVELS = ("normal", "confidential", "secret")
+READ = "read"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The caller: the token subject, ``None`` when anonymous, and its roles."""
+
+    subject: str | None
+    roles: frozenset[str] = frozenset()
+
+
+@dataclass(frozen=True)
+class Permissions:
+    """What a role set may read.
+
+    ``None`` means unlimited: ``sensitivities`` for every metric,
+    ``companies`` for every company. Otherwise ``companies`` are the roots
+    of the readable subtrees.
+    """
+
+    sensitivities: frozenset[str] | None = None
+    metric_ids: frozenset[int] = frozenset()
+    companies: frozenset[str] | None = None
+
+    @property
+    def restricted(self) -> bool:
+        return self.sensitivities is not None or self.companies is not None
+
+    @property
+    def scope_key(self) -> str | None:
+        """Fingerprint of the scope for results shared between callers; ``None`` when unrestricted."""
+
+        if not self.restricted:
+            return None
+        material = json.dumps(
+            [
+                None if self.sensitivities is None else sorted(self.sensitivities),
+                sorted(self.metric_ids),
+                None if self.companies is None else sorted(self.companies),
+            ]
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()[:32]
+
+    def metric_filter(self) -> ColumnElement[bool] | None:
+        """Clause on ``Metric`` matching the readable metrics, or ``None`` if every metric is."""
+
+        if self.sensitivities is None:
+            return None
+        clause = Metric.sensitivity.in_(sorted(self.sensitivities))
+        if self.metric_ids:
+            clause = or_(clause, Metric.id.in_(sorted(self.metric_ids)))
+        return clause
+
+    def binding_filter(self, column) -> ColumnElement[bool] | None:
+        """Clause matching ``column`` (a binding id) to bindings of readable metrics."""
+
+        clause = self.metric_filter()
+        if clause is None:
+            return None
+        readable = (
+            select(MetricVersionCaliber.id)
+            .join(MetricVersion, MetricVersionCaliber.metric_version_id == MetricVersion.id)
+            .join(Metric, MetricVersion.metric_id == Metric.id)
+            .where(clause)
+        )
+        return column.in_(readable)
+
+    def company_filter(self, column) -> ColumnElement[bool] | None:
+        """Clause matching ``column`` (a company code) to the data scope, through the closure table."""
+
+        if self.companies is None:
+            return None
+        root = aliased(DimCompany)
+        scope = (
+            select(DimCompany.company_code)
+            .join(DimCompanyClosure, DimCompanyClosure.descendant_id == DimCompany.company_id)
+            .join(root, root.company_id == DimCompanyClosure.ancestor_id)
+            .where(root.company_code.in_(sorted(self.companies)))
+        )
+        return column.in_(scope)
+
+
+UNRESTRICTED = Permissions()
+
+
+def compile_permissions(db: Session, roles: frozenset[str]) -> Permissions:
+    """Fold the read grants of ``roles`` into one ``Permissions``."""
+
+    rows = []
+    if roles:
+        rows = db.execute(
+            select(AccessPolicy.metric_id, AccessPolicy.sensitivity, AccessPolicy.actions, AccessPolicy.company_code)
+            .where(AccessPolicy.role.in_(sorted(roles)))
+        ).all()
+    sensitivities = {SENSITIVITY_LEVELS[0]}
+    metric_ids: set[int] = set()
+    companies: set[str] = set()
+    unlimited = False
+    for metric_id, sensitivity, actions, company_code in rows:
+        if READ not in (actions or ()):
+            continue
+        if metric_id is not None:
+            metric_ids.add(metric_id)
+        else:
+            sensitivities.update(_covered(sensitivity))
+        if company_code:
+            companies.add(company_code)
+        else:
+            unlimited = True
+    return Permissions(
+        sensitivities=None if SENSITIVITY_LEVELS[-1] in sensitivities else frozenset(sensitivities),
+        metric_ids=frozenset(metric_ids),
+        companies=None if unlimited or not companies else frozenset(companies),
+    )
+
+
+def _covered(sensitivity: str | None) -> tuple[str, ...]:
+    """Levels a role-wide grant of ``sensitivity`` covers: it and every lower known level."""
+
+    if sensitivity in SENSITIVITY_LEVELS:
+        return SENSITIVITY_LEVELS[: SENSITIVITY_LEVELS.index(sensitivity) + 1]
+    return (sensitivity,) if sensitivity else ()
+
+
+class PolicyEngine:
+    """Process-wide compiled permissions, keyed by role set."""
+
+    def __init__(self, ttl: float):
+        self._cache = TTLCache(ttl)
+
+    def permissions(self, db: Session, principal: Principal | None) -> Permissions:
+        """``principal``'s permissions; internal callers (``None``) and disabled access control get everything."""
+
+        if principal is None or not settings.access_control:
+            return UNRESTRICTED
+        key = json.dumps(sorted(principal.roles))
+        return self._cache.get(key, lambda: compile_permissions(db, principal.roles))
+
+    def invalidate(self) -> None:
+        self._cache.invalidate()
+
+
+policy_engine = PolicyEngine(settings.access_policy_cache_ttl_seconds)
+
+
+_commits = CommitHook(
+    "access_policy_pending",
+    lambda _: policy_engine.invalidate(),
+    lambda session: [True] if flushed(session, AccessPolicy) else [],
+)
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from bisect import bisect_left
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.services.dimensions import get_dimension_revisions
+from app.services.search import CHANNEL_SEARCH, COMPANY_SEARCH, PRODUCT_SEARCH, SearchFields, normalize_keyword
+from app.utils.invalidation import CommitHook, RevisionPoll, flushed
+
+# Dimension pickers served by autocomplete, by the ``kind`` they ask for.
+AUTOCOMPLETE_KINDS: dict[str, SearchFields] = {
+    "company": COMPANY_SEARCH,
+    "product": PRODUCT_SEARCH,
+    "channel": CHANNEL_SEARCH,
+}
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    id: int
+    code: str | None
+    name: str | None
+
+
+@dataclass(frozen=True)
+class PrefixIndex:
+    """Sorted array of normalised codes and names for one dimension table.
+
+    A prefix lookup is a binary search to the first key at or after the
+    prefix followed by a walk while keys still start with it, so its cost
+    depends on the number of suggestions returned, not the table size.
+    """
+
+    revision: int
+    keys: tuple[str, ...]
+    # Row id each key came from.
+    owners: tuple[int, ...]
+    items: Mapping[int, Suggestion]
+
+    @classmethod
+    def load(cls, db: Session, fields: SearchFields, revision: int) -> PrefixIndex:
+        rows = db.execute(select(fields.key, fields.code, fields.texts[0])).all()
+        return cls.build(revision, (Suggestion(id=row_id, code=code, name=label) for row_id, code, label in rows))
+
+    @classmethod
+    def build(cls, revision: int, items: Iterable[Suggestion]) -> PrefixIndex:
+        by_id = {item.id: item for item in items}
+        entries = sorted(entry for item in by_id.values() for entry in _entries(item))
+        return cls(
+            revision=revision,
+            keys=tuple(key for key, _ in entries),
+            owners=tuple(owner for _, owner in entries),
+            items=by_id,
+        )
+
+    def apply(self, changes: Mapping[int, Suggestion | None], revision: int) -> PrefixIndex:
+        """A copy with ``changes`` (row id to its new row, ``None`` when deleted) merged in.
+
+        Linear in the index size and without a database round trip: the
+        untouched entries are already sorted, so they are merged with the
+        sorted entries of the changed rows rather than sorted again.
+        """
+
+        items = dict(self.items)
+        for row_id, item in changes.items():
+            if item is None:
+                items.pop(row_id, None)
+            else:
+                items[row_id] = item
+        kept = ((key, owner) for key, owner in zip(self.keys, self.owners) if owner not in changes)
+        added = sorted(entry for row_id in changes if row_id in items for entry in _entries(items[row_id]))
+        entries = list(heapq.merge(kept, added))
+        return PrefixIndex(
+            revision=revision,
+            keys=tuple(key for key, _ in entries),
+            owners=tuple(owner for _, owner in entries),
+            items=items,
+        )
+
+    def search(self, prefix: str, limit: int) -> list[Suggestion]:
+        """Up to ``limit`` rows whose code or name starts with ``prefix``, in key order (exact matches first)."""
+
+        prefix = normalize_keyword(prefix)
+        found: list[int] = []
+        seen: set[int] = set()
+        index = bisect_left(self.keys, prefix)
+        while index < len(self.keys) and len(found) < limit and self.keys[index].startswith(prefix):
+            owner = self.owners[index]
+            if owner not in seen:
+                seen.add(owner)
+                found.append(owner)
+            index += 1
+        return [self.items[owner] for owner in found]
+
+
+def _entries(item: Suggestion) -> set[tuple[str, int]]:
+    return {(key, item.id) for key in (normalize_keyword(item.code), normalize_keyword(item.name)) if key}
+
+
+class AutocompleteCache:
+    """Process-wide prefix indexes for the dimension pickers.
+
+    Dimension revisions are checked at most every ``check_interval``
+    seconds. Commits through this process's sessions patch the indexes with
+    the rows they wrote and advance each index's revision by the bumps
+    their flushes made, so the next check finds it current. Only changes
+    made elsewhere (other processes, Core bulk loads) leave an index behind
+    its table's revision and cause a full reload, which runs outside the
+    lock while lookups keep using the old index.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self._poll = RevisionPoll(get_dimension_revisions, check_interval)
+        self._indexes: dict[str, PrefixIndex] = {}
+        self._lock = threading.Lock()
+
+    def search(self, db: Session, kind: str, prefix: str, limit: int) -> list[Suggestion]:
+        if kind not in AUTOCOMPLETE_KINDS:
+            raise ValueError(f"Unsupported dimension: {kind}")
+        return self.get(db, kind).search(prefix, limit)
+
+    def get(self, db: Session, kind: str, force: bool = False) -> PrefixIndex:
+        index = self._indexes.get(kind)
+        revisions = self._poll.check(db, force=force or index is None)
+        if revisions is None:
+            return index
+        with self._lock:
+            # Drop every stale index now; each one is reloaded the next time it is asked for.
+            for name, loaded in list(self._indexes.items()):
+                if loaded.revision != revisions[_table(name)]:
+                    del self._indexes[name]
+            index = self._indexes.get(kind)
+        if index is not None:
+            return index
+        loaded = PrefixIndex.load(db, AUTOCOMPLETE_KINDS[kind], revisions[_table(kind)])
+        with self._lock:
+            current = self._indexes.get(kind)
+            if current is None or current.revision < loaded.revision:
+                self._indexes[kind] = loaded
+            return self._indexes[kind]
+
+    def apply(self, flushes: list[dict[str, dict[int, Suggestion | None]]]) -> None:
+        """Merge committed flushes (kind to changed rows) into the loaded indexes."""
+
+        with self._lock:
+            for kind, index in list(self._indexes.items()):
+                batches = [flush[kind] for flush in flushes if kind in flush]
+                if not batches:
+                    continue
+                changes: dict[int, Suggestion | None] = {}
+                for batch in batches:
+                    changes.update(batch)
+                # Every flush that wrote the table bumped its revision once.
+                self._indexes[kind] = index.apply(changes, index.revision + len(batches))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+
+def _table(kind: str) -> str:
+    return AUTOCOMPLETE_KINDS[kind].key.class_.__tablename__
+
+
+_KINDS = {fields.key.class_: kind for kind, fields in AUTOCOMPLETE_KINDS.items()}
+
+
+def _collect_dimension_rows(session: Session) -> list[dict[str, dict[int, Suggestion | None]]]:
+    deleted = set(map(id, session.deleted))
+    flush: dict[str, dict[int, Suggestion | None]] = {}
+    for obj in flushed(session, *_KINDS):
+        kind = next(kind for model, kind in _KINDS.items() if isinstance(obj, model))
+        fields = AUTOCOMPLETE_KINDS[kind]
+        row_id = getattr(obj, fields.key.key)
+        flush.setdefault(kind, {})[row_id] = (
+            None
+            if id(obj) in deleted
+            else Suggestion(id=row_id, code=getattr(obj, fields.code.key), name=getattr(obj, fields.texts[0].key))
+        )
+    return [flush] if flush else []
+
+
+autocomplete = AutocompleteCache()
+_commits = CommitHook("autocomplete_pending", autocomplete.apply, _collect_dimension_rows)
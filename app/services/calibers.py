@@ -4,14 +4,15 @@ from sqlalchemy.orm import Session
 
 from app.models.metric import MetricCaliber
 from app.schemas.caliber import CaliberCreate, CaliberRead, CaliberUpdate
+from app.utils.pagination import keyset_page
 
 
 class CaliberService:
     def __init__(self, db: Session):
         self.db = db
 
-    def list_calibers(self) -> list[MetricCaliber]:
-        return self.db.query(MetricCaliber).order_by(MetricCaliber.code).all()
+    def list_calibers(self, limit: int = 200, cursor: str | None = None) -> tuple[list[MetricCaliber], str | None]:
+        return keyset_page(self.db.query(MetricCaliber), (MetricCaliber.code,), limit, cursor)
 
     def create_caliber(self, payload: CaliberCreate) -> MetricCaliber:
         caliber = MetricCaliber(**payload.model_dump())
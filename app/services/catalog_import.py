@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import io
+import json
+from collections.abc import Iterable
+from datetime import date, datetime
+from typing import Any
+
+import pandas as pd
+from lark.exceptions import LarkError
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.dsl.compiler import compile_dsl
+from app.models.metric import Metric, MetricCaliber, MetricVersion, MetricVersionCaliber
+from app.schemas.metric import CatalogImportResult, CatalogMetric, CatalogRowError
+from app.services.dependencies import DependencyGraph, expression_inputs
+from app.services.stats_cache import DASHBOARD_ACTIVITY, METRIC_SUMMARY, stats_cache
+
+CATALOG_FORMATS = ("jsonl", "xlsx")
+# Workbook columns that belong to the initial version; the rest describe the metric.
+# ``subject_area`` is shared, ``calibers`` lists caliber codes in binding order.
+EXCEL_VERSION_COLUMNS = (
+    "version",
+    "status",
+    "effective_from",
+    "effective_to",
+    "grain",
+    "formula_sql",
+    "formula_dsl",
+    "data_sources",
+    "notes",
+    "calibers",
+)
+EXCEL_LIST_COLUMNS = ("grain", "data_sources", "calibers")
+_LOOKUP_CHUNK = 1_000
+
+
+class CatalogImportService:
+    """Register a catalog of metrics, initial versions and caliber bindings in one transaction.
+
+    The whole batch is validated before anything is written: row schemas,
+    duplicate and already registered codes, unknown calibers, formulas that
+    do not parse and dependency cycles, including cycles through other rows
+    of the same batch. Any error rejects the batch and is reported against
+    its row. Valid batches are written with one multi-row ``INSERT`` per
+    table (metrics, versions, bindings), so the cost is a handful of round
+    trips rather than a commit per metric.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def import_catalog(self, data: bytes, fmt: str, dry_run: bool = False) -> CatalogImportResult:
+        if fmt == "jsonl":
+            raw = parse_jsonl(data)
+        elif fmt == "xlsx":
+            raw = parse_excel(data)
+        else:
+            raise ValueError(f"Unsupported catalog format: {fmt}")
+
+        errors: dict[int, list[str]] = {}
+        items: dict[int, CatalogMetric] = {}
+        for row, value in raw:
+            if isinstance(value, str):
+                errors.setdefault(row, []).append(value)
+                continue
+            try:
+                items[row] = CatalogMetric.model_validate(value)
+            except ValidationError as exc:
+                errors.setdefault(row, []).extend(_describe(exc))
+        self._validate(items, errors)
+
+        result = CatalogImportResult(rows=len(raw), dry_run=dry_run)
+        if errors:
+            codes = {row: item.code for row, item in items.items()}
+            result.errors = [
+                CatalogRowError(row=row, code=codes.get(row), errors=messages) for row, messages in sorted(errors.items())
+            ]
+            return result
+        if not dry_run:
+            result.metrics, result.versions, result.bindings = self._write(list(items.values()))
+        else:
+            result.metrics = result.versions = len(items)
+            result.bindings = sum(len(item.initial_version.calibers) for item in items.values())
+        return result
+
+    def _validate(self, items: dict[int, CatalogMetric], errors: dict[int, list[str]]) -> None:
+        seen: dict[str, int] = {}
+        for row, item in items.items():
+            if item.code in seen:
+                errors.setdefault(row, []).append(f"Duplicate code {item.code} (also on row {seen[item.code]})")
+            else:
+                seen[item.code] = row
+
+        existing = self._existing(Metric.code, seen)
+        calibers = self._caliber_ids(items.values())
+        for row, item in items.items():
+            messages = errors.setdefault(row, [])
+            if item.code in existing:
+                messages.append(f"Metric {item.code} already exists")
+            version = item.initial_version
+            codes = [binding.caliber_code for binding in version.calibers]
+            for code in sorted(set(codes) - calibers.keys()):
+                messages.append(f"Unknown caliber {code}")
+            if len(set(codes)) != len(codes):
+                messages.append("Caliber bound more than once")
+            formulas = [("formula_dsl", version.formula_dsl)] + [
+                (f"calibers.{binding.caliber_code}.override_expr_dsl", binding.override_expr_dsl)
+                for binding in version.calibers
+            ]
+            for label, value in formulas:
+                try:
+                    compile_dsl(value)
+                except LarkError as exc:
+                    messages.append(f"{label}: {str(exc).splitlines()[0]}")
+            if not messages:
+                del errors[row]
+        if errors:
+            return
+
+        graph = DependencyGraph.load(self.db)
+        rows = {item.code: row for row, item in items.items()}
+        for item in items.values():
+            version = item.initial_version
+            graph.inputs[item.code] = expression_inputs(
+                (version.formula_dsl, *(binding.override_expr_dsl for binding in version.calibers)),
+                (binding.caliber_code for binding in version.calibers),
+            )
+        # Report every cycle, not just the first: drop each one found and look again.
+        while cycle := graph.find_cycle():
+            for code in set(cycle):
+                if code in rows:
+                    errors.setdefault(rows[code], []).append(f"Formula dependency cycle: {' -> '.join(cycle)}")
+                graph.inputs.pop(code, None)
+
+    def _write(self, items: list[CatalogMetric]) -> tuple[int, int, int]:
+        calibers = self._caliber_ids(items)
+        now = datetime.utcnow()
+        try:
+            metric_ids = self._insert(
+                Metric,
+                [
+                    {
+                        **item.model_dump(exclude={"initial_version"}),
+                        "updated_by": item.updated_by or item.created_by,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for item in items
+                ],
+            )
+            version_ids = self._insert(
+                MetricVersion,
+                [
+                    {
+                        **item.initial_version.model_dump(exclude={"calibers"}),
+                        "metric_id": metric_id,
+                        "version": item.initial_version.version or "v1",
+                        "status": item.initial_version.status or "draft",
+                        "created_at": now,
+                    }
+                    for item, metric_id in zip(items, metric_ids)
+                ],
+            )
+            bindings = [
+                {
+                    **binding.model_dump(exclude={"caliber_code", "order_index"}),
+                    "metric_version_id": version_id,
+                    "caliber_id": calibers[binding.caliber_code],
+                    "order_index": position if binding.order_index is None else binding.order_index,
+                    "created_at": now,
+                }
+                for item, version_id in zip(items, version_ids)
+                for position, binding in enumerate(item.initial_version.calibers)
+            ]
+            if bindings:
+                self.db.execute(insert(MetricVersionCaliber), bindings)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        # Core inserts bypass the flush events that normally expire these.
+        stats_cache.invalidate(METRIC_SUMMARY, DASHBOARD_ACTIVITY)
+        return len(metric_ids), len(version_ids), len(bindings)
+
+    def _insert(self, model: type, rows: list[dict[str, Any]]) -> list[int]:
+        stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+        return list(self.db.scalars(stmt, rows))
+
+    def _caliber_ids(self, items: Iterable[CatalogMetric]) -> dict[str, int]:
+        codes = {binding.caliber_code for item in items for binding in item.initial_version.calibers}
+        return dict(self._lookup(MetricCaliber.code, MetricCaliber.id, codes))
+
+    def _existing(self, column, values: Iterable[str]) -> set[str]:
+        return {value for value, _ in self._lookup(column, column, values)}
+
+    def _lookup(self, column, target, values: Iterable[str]) -> list[tuple[Any, Any]]:
+        values = sorted(set(values))
+        found: list[tuple[Any, Any]] = []
+        for start in range(0, len(values), _LOOKUP_CHUNK):
+            chunk = values[start : start + _LOOKUP_CHUNK]
+            found.extend(self.db.execute(select(column, target).where(column.in_(chunk))).tuples())
+        return found
+
+
+def parse_jsonl(data: bytes) -> list[tuple[int, dict | str]]:
+    """(line number, object or error message) for every non-blank line."""
+
+    rows: list[tuple[int, dict | str]] = []
+    for number, line in enumerate(data.decode("utf-8-sig").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as exc:
+            rows.append((number, f"Invalid JSON: {exc.msg}"))
+            continue
+        rows.append((number, value if isinstance(value, dict) else "Expected a JSON object"))
+    return rows
+
+
+def parse_excel(data: bytes) -> list[tuple[int, dict | str]]:
+    """(spreadsheet row, nested catalog object) for every row of the first sheet.
+
+    Metric columns use the metric field names; version columns are listed in
+    ``EXCEL_VERSION_COLUMNS``. List columns are comma separated and
+    ``formula_dsl`` holds the DSL text.
+    """
+
+    try:
+        frame = pd.read_excel(io.BytesIO(data), dtype=object)
+    except ImportError as exc:
+        raise ValueError("Reading Excel catalogs requires openpyxl") from exc
+    except Exception as exc:  # noqa: BLE001 - pandas raises whatever the engine raises
+        raise ValueError(f"Unreadable workbook: {exc}") from exc
+    frame.columns = [str(column).strip() for column in frame.columns]
+    rows: list[tuple[int, dict | str]] = []
+    # Row 1 is the header, so data starts on spreadsheet row 2.
+    for number, record in enumerate(frame.to_dict("records"), start=2):
+        values = {key: _cell(value) for key, value in record.items()}
+        if all(value is None for value in values.values()):
+            continue
+        for column in EXCEL_LIST_COLUMNS:
+            if isinstance(values.get(column), str):
+                values[column] = [part.strip() for part in values[column].replace("，", ",").split(",") if part.strip()]
+        if isinstance(values.get("formula_dsl"), str):
+            values["formula_dsl"] = {"dsl": values["formula_dsl"]}
+        version = {column: values.pop(column) for column in EXCEL_VERSION_COLUMNS if column in values}
+        version["subject_area"] = values.get("subject_area")
+        version["calibers"] = [{"caliber_code": code} for code in version.get("calibers") or []]
+        version = {key: value for key, value in version.items() if value is not None}
+        rows.append((number, {**{k: v for k, v in values.items() if v is not None}, "initial_version": version}))
+    return rows
+
+
+def _cell(value: Any) -> Any:
+    if value is None or value is pd.NaT or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        return value.strip() or None
+    # Every catalog field is text, a date or a list; numeric-looking codes come back as numbers.
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _describe(exc: ValidationError) -> list[str]:
+    return [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()]
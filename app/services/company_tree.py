@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.metric import DimCompany
+from app.services.dimensions import get_dimension_revisions
+from app.utils.invalidation import RevisionPoll
+
+
+@dataclass(frozen=True)
+class CompanyTree:
+    """Immutable snapshot of the ``dim_company`` hierarchy.
+
+    Companies are laid out in depth-first order and each one records the
+    span of that order its subtree occupies, so a subtree is a slice rather
+    than a walk. Companies whose parent is unknown, or whose parent links
+    loop, are treated as roots.
+    """
+
+    revision: int
+    parents: dict[int, int | None]
+    codes: dict[int, str]
+    ids: dict[str, int]
+    levels: dict[int, int]
+    order: tuple[int, ...]
+    spans: dict[int, tuple[int, int]]
+
+    @classmethod
+    def load(cls, db: Session, revision: int | None = None) -> CompanyTree:
+        if revision is None:
+            revision = get_dimension_revisions(db)[DimCompany.__tablename__]
+        rows = db.execute(
+            select(DimCompany.company_id, DimCompany.company_code, DimCompany.parent_company_id, DimCompany.level)
+        ).all()
+        parents = {company_id: parent_id for company_id, _, parent_id, _ in rows}
+        children: dict[int, list[int]] = {}
+        for company_id, parent_id in parents.items():
+            if parent_id in parents:
+                children.setdefault(parent_id, []).append(company_id)
+        roots = [company_id for company_id, parent_id in parents.items() if parent_id not in parents]
+
+        order: list[int] = []
+        spans: dict[int, tuple[int, int]] = {}
+        depths: dict[int, int] = {}
+        # Roots first, then anything a parent-link loop kept out of reach of a root.
+        for root in [*sorted(roots), *sorted(parents)]:
+            if root in spans:
+                continue
+            depths[root] = 1
+            stack = [(root, False)]
+            while stack:
+                company_id, done = stack.pop()
+                if done:
+                    spans[company_id] = (spans[company_id][0], len(order))
+                    continue
+                spans[company_id] = (len(order), len(order))
+                order.append(company_id)
+                stack.append((company_id, True))
+                for child in sorted(children.get(company_id, ()), reverse=True):
+                    if child not in spans:
+                        depths[child] = depths[company_id] + 1
+                        stack.append((child, False))
+
+        levels = {company_id: level if level is not None else depths[company_id] for company_id, _, _, level in rows}
+        codes = {company_id: code for company_id, code, _, _ in rows if code}
+        return cls(
+            revision=revision,
+            parents=parents,
+            codes=codes,
+            ids={code: company_id for company_id, code in codes.items()},
+            levels=levels,
+            order=tuple(order),
+            spans=spans,
+        )
+
+    def subtree_ids(self, company_id: int) -> tuple[int, ...]:
+        """``company_id`` and every company below it; empty if unknown."""
+
+        if company_id not in self.spans:
+            return ()
+        start, end = self.spans[company_id]
+        return self.order[start:end]
+
+    def ancestor_ids(self, company_id: int) -> tuple[int, ...]:
+        """``company_id`` followed by its parent, grandparent, ... up to its root; empty if unknown."""
+
+        if company_id not in self.parents:
+            return ()
+        chain = [company_id]
+        parent = self.parents[company_id]
+        while parent in self.parents and parent not in chain:
+            chain.append(parent)
+            parent = self.parents[parent]
+        return tuple(chain)
+
+    def ancestors(self, code: str) -> tuple[str, ...]:
+        """Codes of ``code``'s company and its ancestors, nearest first; empty if unknown."""
+
+        company_id = self.ids.get(code)
+        if company_id is None:
+            return ()
+        return tuple(self.codes[ident] for ident in self.ancestor_ids(company_id) if ident in self.codes)
+
+    def descendants(self, codes: Iterable[str]) -> set[str]:
+        """``codes`` plus the codes of every company below them."""
+
+        found = set(codes)
+        for code in list(found):
+            if code in self.ids:
+                found.update(self.codes[ident] for ident in self.subtree_ids(self.ids[code]) if ident in self.codes)
+        return found
+
+    def level(self, code: str) -> int | None:
+        company_id = self.ids.get(code)
+        return None if company_id is None else self.levels[company_id]
+
+
+class CompanyTreeCache:
+    """Process-wide ``CompanyTree`` reloaded when the ``dim_company`` revision moves.
+
+    The revision is checked at most every ``check_interval`` seconds; callers
+    that must see their own writes pass ``force=True``.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self._poll = RevisionPoll(get_dimension_revisions, check_interval)
+        self._tree: CompanyTree | None = None
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, force: bool = False) -> CompanyTree:
+        tree = self._tree
+        revisions = self._poll.check(db, force=force or tree is None)
+        if revisions is None:
+            return tree
+        revision = revisions[DimCompany.__tablename__]
+        if tree is not None and tree.revision == revision:
+            return tree
+        # Read the revision before the rows: a concurrent change is then reloaded once more.
+        tree = CompanyTree.load(db, revision)
+        with self._lock:
+            if self._tree is None or self._tree.revision != revision:
+                self._tree = tree
+            return self._tree
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tree = None
+
+
+company_tree = CompanyTreeCache()
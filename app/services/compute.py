@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.config import settings
+from app.dsl.compiler import compile_dsl
+from app.dsl.evaluator import CompiledExpression
+from app.models.metric import MetricValue, MetricVersion, MetricVersionCaliber
+from app.services.dimension_resolver import dimension_resolver
+from app.services.metric_values import MetricValueService
+from app.services.watermarks import WatermarkService
+
+PERIODS = ("day", "month", "quarter", "year")
+# Dimensions a grain may keep besides company, which every metric_value row carries.
+GRAIN_DIMENSIONS = {"core_company": "core_company_id", "product": "product_id", "channel": "channel_id"}
+KEY = ["period_date", "company_code", "combo_id"]
+
+
+@dataclass(frozen=True)
+class Grain:
+    period: str | None = None
+    dimensions: frozenset[str] = frozenset()
+
+    @classmethod
+    def parse(cls, grain: Any) -> Grain:
+        """Accept the list form (``["company", "product", "month"]``) or the spec's dict form."""
+
+        if isinstance(grain, Mapping):
+            period = grain.get("period")
+            names = [name for name, enabled in grain.items() if name != "period" and enabled]
+        else:
+            names = list(grain or [])
+            periods = [name for name in names if name in PERIODS]
+            period = periods[0] if periods else None
+        if period is not None and period not in PERIODS:
+            raise ValueError(f"Unsupported grain period: {period}")
+        return cls(period=period, dimensions=frozenset(name for name in names if name in GRAIN_DIMENSIONS))
+
+    @property
+    def partition_period(self) -> str:
+        # Partitions must hold whole output periods; finer grains still split by month.
+        return self.period if self.period in ("quarter", "year") else "month"
+
+
+@dataclass(frozen=True)
+class Partition:
+    period_from: date
+    period_to: date
+    companies: tuple[str, ...]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "period_from": self.period_from.isoformat(),
+            "period_to": self.period_to.isoformat(),
+            "companies": list(self.companies),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> Partition:
+        return cls(
+            period_from=date.fromisoformat(data["period_from"]),
+            period_to=date.fromisoformat(data["period_to"]),
+            companies=tuple(data["companies"]),
+        )
+
+
+@dataclass(frozen=True)
+class Step:
+    """One binding of a version: its expression and the name later steps can refer to it by."""
+
+    binding_id: int
+    name: str | None
+    # Content hash of the expression; bindings sharing the version formula share a key.
+    key: str
+    plan: CompiledExpression
+
+
+@dataclass
+class ComputePlan:
+    version_id: int
+    metric_code: str
+    grain: Grain
+    steps: list[Step]
+    # Metric code -> binding whose values feed the expression.
+    inputs: dict[str, int]
+    # Change-log sources whose watermarks decide what an incremental run revisits.
+    sources: list[str]
+
+
+class ComputeService:
+    """Evaluate a metric version's bindings into ``metric_value``.
+
+    A run is planned once (steps, inputs, partitions) and each partition — a
+    range of whole output periods for a slice of companies — is computed
+    independently, so partitions can be spread across Celery workers. Inputs
+    are the stored values of the metric codes the expressions reference;
+    earlier bindings of the same version can be referenced by caliber code.
+    Inputs are summed to the version's grain first, then the expression is
+    evaluated column-wise over the aligned inputs. Bindings that share an
+    expression (every binding without an override runs the version formula)
+    are evaluated once per partition and the result is reused.
+
+    Every write is logged in the data source change log under the metric's
+    code, so derived metrics reading it pick the change up incrementally.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.values = MetricValueService(db)
+        self.watermarks = WatermarkService(db)
+
+    def plan(self, version_id: int) -> ComputePlan:
+        """Resolve the version's ordered steps and the input bindings they read."""
+
+        version = (
+            self.db.query(MetricVersion)
+            .options(selectinload(MetricVersion.calibers).selectinload(MetricVersionCaliber.caliber))
+            .filter(MetricVersion.id == version_id)
+            .first()
+        )
+        if version is None:
+            raise ValueError("Metric version not found")
+        grain = Grain.parse(version.grain)
+        steps = self._steps(version)
+        inputs = self._inputs(version, steps)
+        # Input metric codes are always watched: their values are what the run reads.
+        sources = {*(version.data_sources or []), *inputs}
+        for binding in version.calibers:
+            sources.update(binding.override_data_sources or [])
+        return ComputePlan(
+            version_id=version.id,
+            metric_code=version.metric.code,
+            grain=grain,
+            steps=steps,
+            inputs=inputs,
+            sources=sorted(sources),
+        )
+
+    def run_partition(self, plan: ComputePlan, partition: Partition) -> dict[str, Any]:
+        started = time.perf_counter()
+        dimension_resolver.ensure_fresh(self.db)
+        frames = {
+            code: self._load_input(binding_id, partition, plan.grain)
+            for code, binding_id in plan.inputs.items()
+        }
+        input_rows = sum(len(frame) for frame in frames.values())
+        written: dict[str, int] = {}
+        evaluated: dict[str, pd.DataFrame] = {}
+        for step in plan.steps:
+            result = evaluated.get(step.key)
+            if result is None:
+                result = evaluated[step.key] = _evaluate(step.plan, frames)
+            if step.name:
+                if step.name in frames:
+                    # The name now points at different values; earlier results may have read the old ones.
+                    evaluated.clear()
+                frames[step.name] = result
+            self.watermarks.record(result[["period_date", "company_code"]].assign(source=plan.metric_code))
+            written[str(step.binding_id)] = self.values.bulk_upsert(_value_rows(step.binding_id, result))
+        return {
+            "partition": partition.to_dict(),
+            "input_rows": input_rows,
+            "rows_written": sum(written.values()),
+            "bindings": written,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    def _steps(self, version: MetricVersion) -> list[Step]:
+        steps = []
+        for binding in sorted(version.calibers, key=lambda item: (item.order_index, item.id)):
+            if binding.status != "active":
+                continue
+            compiled = compile_dsl(binding.override_expr_dsl or version.formula_dsl)
+            if compiled is None:
+                continue
+            name = binding.caliber.code if binding.caliber else None
+            steps.append(Step(binding_id=binding.id, name=name, key=compiled.key, plan=compiled.plan))
+        return steps
+
+    def _inputs(self, version: MetricVersion, steps: list[Step]) -> dict[str, int]:
+        inputs: dict[str, int] = {}
+        available: set[str] = set()
+        for step in steps:
+            for identifier in step.plan.identifiers:
+                if identifier in available or identifier in inputs:
+                    continue
+                if identifier == version.metric.code:
+                    raise ValueError(f"Metric {identifier} references itself")
+                binding_ids = self.values.resolve_binding_ids(identifier)
+                if not binding_ids:
+                    raise ValueError(f"Unknown identifier in formula: {identifier}")
+                inputs[identifier] = binding_ids[0]
+            if step.name:
+                available.add(step.name)
+        return inputs
+
+    def partitions(self, plan: ComputePlan, payload: Mapping[str, Any] | None = None) -> list[Partition]:
+        """Split the run into (whole output periods x company chunk) partitions that have input data.
+
+        ``payload`` may narrow the run with ``period_from``/``period_to``/``companies``
+        and override the chunk size with ``partition_companies``.
+        """
+
+        if not plan.steps or not plan.inputs:
+            return []
+        payload = payload or {}
+        binding_ids = list(plan.inputs.values())
+        period_from = _as_date(payload.get("period_from"))
+        period_to = _as_date(payload.get("period_to"))
+        stmt = select(MetricValue.period_date).where(MetricValue.metric_version_caliber_id.in_(binding_ids))
+        if period_from:
+            stmt = stmt.where(MetricValue.period_date >= _period_start(period_from, plan.grain.partition_period))
+        if period_to:
+            stmt = stmt.where(MetricValue.period_date <= _period_end(period_to, plan.grain.partition_period))
+        periods = sorted({_period_start(value, plan.grain.partition_period) for value in self.db.scalars(stmt.distinct())})
+
+        companies = payload.get("companies")
+        if not companies:
+            stmt = select(MetricValue.company_code).where(MetricValue.metric_version_caliber_id.in_(binding_ids))
+            companies = sorted(set(self.db.scalars(stmt.distinct())))
+        size = _partition_size(payload)
+        chunks = [tuple(companies[index : index + size]) for index in range(0, len(companies), size)]
+        return [
+            Partition(start, _period_end(start, plan.grain.partition_period), chunk)
+            for start in periods
+            for chunk in chunks
+        ]
+
+    def changed_partitions(
+        self,
+        plan: ComputePlan,
+        since: Mapping[str, int],
+        upto: Mapping[str, int],
+        payload: Mapping[str, Any] | None = None,
+    ) -> list[Partition]:
+        """Partitions covering only the (period, company) slices whose sources moved past ``since``."""
+
+        if not plan.steps or not plan.inputs:
+            return []
+        period = plan.grain.partition_period
+        companies: dict[date, set[str]] = {}
+        for month, company_code in self.watermarks.changed_since(since, upto):
+            companies.setdefault(_period_start(month, period), set()).add(company_code)
+        size = _partition_size(payload or {})
+        partitions = []
+        for start, codes in sorted(companies.items()):
+            codes = sorted(codes)
+            partitions.extend(
+                Partition(start, _period_end(start, period), tuple(codes[index : index + size]))
+                for index in range(0, len(codes), size)
+            )
+        return partitions
+
+    def _load_input(self, binding_id: int, partition: Partition, grain: Grain) -> pd.DataFrame:
+        rows = self.db.execute(
+            select(MetricValue.period_date, MetricValue.company_code, MetricValue.combo_id, MetricValue.value).where(
+                MetricValue.metric_version_caliber_id == binding_id,
+                MetricValue.period_date >= partition.period_from,
+                MetricValue.period_date <= partition.period_to,
+                MetricValue.company_code.in_(partition.companies),
+            )
+        ).all()
+        frame = pd.DataFrame(rows, columns=[*KEY, "value"])
+        frame["combo_id"] = frame["combo_id"].astype("Int64")
+        frame["value"] = pd.to_numeric(frame["value"], errors="coerce").astype("float64")
+        return self._to_grain(frame, grain)
+
+    def _to_grain(self, frame: pd.DataFrame, grain: Grain) -> pd.DataFrame:
+        if frame.empty:
+            return frame
+        if grain.period:
+            starts = {value: _period_start(value, grain.period) for value in frame["period_date"].unique()}
+            frame["period_date"] = frame["period_date"].map(starts)
+        dropped = [column for name, column in GRAIN_DIMENSIONS.items() if name not in grain.dimensions]
+        if dropped:
+            members = dimension_resolver.combo_members(frame["combo_id"])
+            known = frame["combo_id"].notna().to_numpy()
+            for column in dropped:
+                members.loc[known, column] = pd.NA
+            combos = dimension_resolver.resolve_combos(
+                self.db,
+                members["company_id"][known],
+                members["product_id"][known],
+                members["channel_id"][known],
+                members["core_company_id"][known],
+            )
+            regrouped = frame["combo_id"].to_numpy(dtype=object, na_value=None)
+            regrouped[known] = combos.to_numpy(dtype=object, na_value=None)
+            frame["combo_id"] = pd.array(regrouped, dtype="Int64")
+        return frame.groupby(KEY, dropna=False, sort=False, as_index=False)["value"].sum(min_count=1)
+
+
+def merge_partition_results(results: Iterable[Mapping[str, Any]]) -> dict[str, Any]:
+    """Fold per-partition stats into the summary stored on ``TaskRun.result``."""
+
+    merged: dict[str, Any] = {"partitions": 0, "input_rows": 0, "rows_written": 0, "bindings": {}, "errors": []}
+    seconds = []
+    for result in results:
+        merged["partitions"] += 1
+        if result.get("error"):
+            merged["errors"].append({"partition": result.get("partition"), "error": result["error"]})
+            continue
+        merged["input_rows"] += result["input_rows"]
+        merged["rows_written"] += result["rows_written"]
+        for binding_id, count in result["bindings"].items():
+            merged["bindings"][binding_id] = merged["bindings"].get(binding_id, 0) + count
+        seconds.append(result["seconds"])
+    merged["partition_seconds"] = {"total": round(sum(seconds), 3), "max": max(seconds, default=0.0)}
+    return merged
+
+
+def plan_summary(plan: ComputePlan, partitions: list[Partition]) -> dict[str, Any]:
+    return {
+        "grain": {"period": plan.grain.period, "dimensions": sorted(plan.grain.dimensions)},
+        "steps": [{"binding_id": step.binding_id, "name": step.name} for step in plan.steps],
+        "inputs": plan.inputs,
+        "sources": plan.sources,
+        "partitions": len(partitions),
+    }
+
+
+def _partition_size(payload: Mapping[str, Any]) -> int:
+    return max(1, int(payload.get("partition_companies") or settings.compute_partition_companies))
+
+
+def _evaluate(plan: CompiledExpression, frames: Mapping[str, pd.DataFrame]) -> pd.DataFrame:
+    aligned: pd.DataFrame | None = None
+    for name in plan.identifiers:
+        frame = frames[name].rename(columns={"value": name})
+        aligned = frame if aligned is None else aligned.merge(frame, how="outer", on=KEY)
+    if aligned is None or aligned.empty:
+        return pd.DataFrame(columns=[*KEY, "value"])
+    result = aligned[KEY].copy()
+    result["value"] = plan.evaluate({name: aligned[name].to_numpy(dtype="float64") for name in plan.identifiers})
+    # A key missing from any input has no defined value; it is not written.
+    return result[np.isfinite(result["value"].to_numpy())].reset_index(drop=True)
+
+
+def _value_rows(binding_id: int, frame: pd.DataFrame) -> Iterable[dict[str, Any]]:
+    for period_date, company_code, combo_id, value in frame[[*KEY, "value"]].itertuples(index=False, name=None):
+        combo = None if pd.isna(combo_id) else int(combo_id)
+        yield {
+            "metric_version_caliber_id": binding_id,
+            "period_date": period_date,
+            "company_code": company_code,
+            "dimensions_key": "" if combo is None else str(combo),
+            "combo_id": combo,
+            "value": float(value),
+        }
+
+
+def _period_start(value: date, period: str) -> date:
+    if period == "day":
+        return value
+    if period == "month":
+        return value.replace(day=1)
+    if period == "quarter":
+        return date(value.year, (value.month - 1) // 3 * 3 + 1, 1)
+    return date(value.year, 1, 1)
+
+
+def _period_end(value: date, period: str) -> date:
+    if period == "day":
+        return value
+    start = _period_start(value, period)
+    months = {"month": 1, "quarter": 3, "year": 12}[period]
+    month = start.month - 1 + months
+    following = date(start.year + month // 12, month % 12 + 1, 1)
+    return date.fromordinal(following.toordinal() - 1)
+
+
+def _as_date(value: Any) -> date | None:
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
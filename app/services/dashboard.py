@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from datetime import datetime, time, timedelta
+from typing import Any
+
+from sqlalchemy import func, select, true
+from sqlalchemy.orm import Session
+
+from app.models.dataset import FileArtifact
+from app.models.metric import MetricVersion
+from app.models.task import TaskRun
+from app.services.metrics import MetricService
+from app.services.stats_cache import DASHBOARD_ACTIVITY, stats_cache
+
+RECENT_UPLOAD_DAYS = 7
+RECENT_UPLOAD_ROWS = 5
+UPLOAD_SOURCES = {"manual": "手工上传", "api": "API"}
+UPLOAD_STATUSES = {
+    "pending": "排队中",
+    "processing": "处理中",
+    "done": "已完成",
+    "failed": "失败",
+    "skipped": "未解析",
+}
+
+
+class DashboardService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def overview(self) -> dict[str, Any]:
+        summary = MetricService(self.db).summary()
+        activity = stats_cache.get(DASHBOARD_ACTIVITY, self._load_activity)
+        return {
+            "stats": {
+                "registeredMetrics": {"total": summary.total_metrics, "sensitive": summary.sensitive_metrics},
+                "activeVersions": {
+                    "total": summary.active_versions,
+                    "releasedThisWeek": activity["released_this_week"],
+                },
+                "yesterdayJobs": {"total": activity["jobs_yesterday"], "failed": activity["failed_yesterday"]},
+                "recentUploads": {"total": activity["uploads_recent"], "processing": activity["uploads_processing"]},
+            },
+            "taskSummary": {
+                "title": "近7天任务执行概览",
+                "description": (
+                    f"近7天共执行 {activity['jobs_week']} 个任务，"
+                    f"成功 {activity['succeeded_week']} 个，失败 {activity['failed_week']} 个。"
+                ),
+            },
+            "uploads": activity["uploads"],
+        }
+
+    def _load_activity(self) -> dict[str, Any]:
+        """All dashboard counters in one aggregate statement, plus the latest uploads."""
+
+        now = datetime.utcnow()
+        today = datetime.combine(now.date(), time.min)
+        yesterday = today - timedelta(days=1)
+        week_start = today - timedelta(days=today.weekday())
+        week_ago = now - timedelta(days=7)
+        upload_since = now - timedelta(days=RECENT_UPLOAD_DAYS)
+        parse_status = FileArtifact.tags["parse_status"].as_string()
+
+        # Versions carry no publish timestamp; an active version whose
+        # effective date falls in the current week counts as released this week.
+        versions = select(
+            func.count(MetricVersion.id)
+            .filter(
+                MetricVersion.status == "active",
+                MetricVersion.effective_from >= week_start.date(),
+                MetricVersion.effective_from <= now.date(),
+            )
+            .label("released_this_week"),
+        ).subquery()
+        jobs = select(
+            func.count(TaskRun.id).filter(TaskRun.created_at >= yesterday, TaskRun.created_at < today).label("jobs_yesterday"),
+            func.count(TaskRun.id)
+            .filter(TaskRun.created_at >= yesterday, TaskRun.created_at < today, TaskRun.status == "failed")
+            .label("failed_yesterday"),
+            func.count(TaskRun.id).label("jobs_week"),
+            func.count(TaskRun.id).filter(TaskRun.status == "success").label("succeeded_week"),
+            func.count(TaskRun.id).filter(TaskRun.status == "failed").label("failed_week"),
+        ).where(TaskRun.created_at >= week_ago).subquery()
+        uploads = select(
+            func.count(FileArtifact.id).label("uploads_recent"),
+            func.count(FileArtifact.id).filter(parse_status.in_(("pending", "processing"))).label("uploads_processing"),
+        ).where(FileArtifact.created_at >= upload_since).subquery()
+        counters = versions.join(jobs, true()).join(uploads, true())
+        activity = dict(self.db.execute(select(versions, jobs, uploads).select_from(counters)).one()._mapping)
+
+        latest = self.db.execute(
+            select(FileArtifact.id, FileArtifact.created_at, FileArtifact.path, FileArtifact.tags)
+            .order_by(FileArtifact.id.desc())
+            .limit(RECENT_UPLOAD_ROWS)
+        ).all()
+        activity["uploads"] = [
+            {
+                "batchId": f"B{created_at:%Y%m%d}-{artifact_id}",
+                "source": UPLOAD_SOURCES.get((tags or {}).get("source"), (tags or {}).get("source") or "-"),
+                "filename": (tags or {}).get("filename") or path.rsplit("/", 1)[-1],
+                "status": UPLOAD_STATUSES.get((tags or {}).get("parse_status"), "排队中"),
+            }
+            for artifact_id, created_at, path, tags in latest
+        ]
+        return activity
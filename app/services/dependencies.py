@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from lark.exceptions import LarkError
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app.dsl.compiler import compile_dsl
+from app.models.metric import Metric, MetricVersion, MetricVersionCaliber
+
+
+class DependencyCycleError(ValueError):
+    def __init__(self, cycle: list[str]):
+        self.cycle = cycle
+        super().__init__(f"Formula dependency cycle: {' -> '.join(cycle)}")
+
+
+def formula_inputs(version: MetricVersion, bindings: Iterable[MetricVersionCaliber] | None = None) -> set[str]:
+    """Metric codes a version's formula and caliber overrides read.
+
+    Identifiers naming one of the version's own calibers refer to an earlier
+    binding's result, not another metric, and are left out. Formulas that do
+    not parse contribute nothing; they fail when the version is computed.
+    ``bindings`` stands in for ``version.calibers`` when checking an edit.
+    """
+
+    bindings = list(version.calibers if bindings is None else bindings)
+    own = {binding.caliber.code for binding in bindings if binding.caliber}
+    return expression_inputs((version.formula_dsl, *(binding.override_expr_dsl for binding in bindings)), own)
+
+
+def expression_inputs(values: Iterable[str | dict | None], own: Iterable[str] = ()) -> set[str]:
+    """Identifiers read by DSL ``values`` other than the caliber codes in ``own``; unparsable values are skipped."""
+
+    inputs: set[str] = set()
+    for value in values:
+        try:
+            compiled = compile_dsl(value)
+        except LarkError:
+            continue
+        if compiled is not None:
+            inputs.update(compiled.identifiers)
+    return inputs - set(own)
+
+
+@dataclass
+class DependencyGraph:
+    """Metric codes and the codes their active version reads (edges point at inputs)."""
+
+    inputs: dict[str, set[str]] = field(default_factory=dict)
+    # Metric code -> active version computing it.
+    versions: dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, db: Session, reachable_from: Iterable[str] | None = None) -> DependencyGraph:
+        """The active catalogue, or with ``reachable_from`` only the metrics those codes read, transitively.
+
+        The reachable part is loaded one formula depth at a time, so an edit
+        reads the metrics its formula can reach rather than every active version.
+        """
+
+        stmt = (
+            select(MetricVersion, Metric.code)
+            .join(Metric, MetricVersion.metric_id == Metric.id)
+            .where(MetricVersion.status == "active")
+            .options(selectinload(MetricVersion.calibers).selectinload(MetricVersionCaliber.caliber))
+            .order_by(MetricVersion.effective_from, MetricVersion.id)
+        )
+        graph = cls()
+        if reachable_from is None:
+            graph._add(db.execute(stmt))
+            return graph
+        seen: set[str] = set()
+        pending = set(reachable_from)
+        while pending:
+            graph._add(db.execute(stmt.where(Metric.code.in_(sorted(pending)))))
+            seen |= pending
+            pending = {name for code in pending for name in graph.inputs.get(code, ())} - seen
+        return graph
+
+    def _add(self, rows: Iterable[tuple[MetricVersion, str]]) -> None:
+        # A metric with several active versions is represented by the latest effective one.
+        for version, code in rows:
+            self.inputs[code] = formula_inputs(version)
+            self.versions[code] = version.id
+
+    def with_inputs(self, code: str, inputs: Iterable[str]) -> DependencyGraph:
+        """Copy of the graph with ``code`` reading ``inputs``, for checking an edit before it is saved."""
+
+        return DependencyGraph(inputs={**self.inputs, code: set(inputs)}, versions=dict(self.versions))
+
+    def find_cycle(self) -> list[str] | None:
+        """One dependency cycle as a closed path of codes, or None when the graph is acyclic."""
+
+        state: dict[str, int] = {}  # 1 = on the current path, 2 = done
+        for root in sorted(self.inputs):
+            if state.get(root):
+                continue
+            path = [root]
+            stack = [iter(sorted(self.inputs.get(root, ())))]
+            state[root] = 1
+            while stack:
+                code = next(stack[-1], None)
+                if code is None:
+                    state[path.pop()] = 2
+                    stack.pop()
+                elif state.get(code) == 1:
+                    return [*path[path.index(code) :], code]
+                elif not state.get(code):
+                    state[code] = 1
+                    path.append(code)
+                    stack.append(iter(sorted(self.inputs.get(code, ()))))
+        return None
+
+    def check_acyclic(self) -> None:
+        cycle = self.find_cycle()
+        if cycle:
+            raise DependencyCycleError(cycle)
+
+    def levels(self, codes: Iterable[str] | None = None) -> list[list[str]]:
+        """Computed metrics grouped so each level only reads earlier levels or stored inputs.
+
+        Metrics within a level are independent of each other and can run in
+        parallel. ``codes`` restricts the result to a subset, keeping order.
+        """
+
+        self.check_acyclic()
+        wanted = set(self.inputs) if codes is None else set(codes) & set(self.inputs)
+        depth: dict[str, int] = {}
+
+        def level_of(code: str) -> int:
+            if code not in depth:
+                # Acyclic, so the recursion ends; depth is bounded by the longest formula chain.
+                upstream = [level_of(name) + 1 for name in self.inputs[code] if name in self.inputs]
+                depth[code] = max(upstream, default=0)
+            return depth[code]
+
+        levels: dict[int, list[str]] = {}
+        for code in sorted(wanted):
+            levels.setdefault(level_of(code), []).append(code)
+        return [levels[index] for index in sorted(levels)]
+
+    def downstream(self, codes: Iterable[str]) -> set[str]:
+        """``codes`` plus every computed metric that reads them, directly or transitively."""
+
+        readers: dict[str, set[str]] = {}
+        for code, inputs in self.inputs.items():
+            for name in inputs:
+                readers.setdefault(name, set()).add(code)
+        seen = set(codes)
+        pending = list(seen)
+        while pending:
+            for reader in readers.get(pending.pop(), ()):
+                if reader not in seen:
+                    seen.add(reader)
+                    pending.append(reader)
+        return seen
+
+
+def check_formula(
+    db: Session, code: str, version: MetricVersion, bindings: Iterable[MetricVersionCaliber] | None = None
+) -> None:
+    """Raise ``DependencyCycleError`` if saving ``version`` as ``code``'s formula would close a cycle.
+
+    Any such cycle runs through metrics the new formula reads, so only
+    that part of the graph is loaded. ``bindings`` is as for ``formula_inputs``.
+    """
+
+    inputs = formula_inputs(version, bindings)
+    DependencyGraph.load(db, reachable_from=inputs).with_inputs(code, inputs).check_acyclic()
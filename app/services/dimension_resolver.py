@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import sys
+import threading
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.metric import DimChannel, DimCombo, DimCompany, DimProduct
+from app.services.dimensions import DIMENSION_TABLES, bump_dimension_revision, get_dimension_revisions
+from app.utils.invalidation import CommitHook, RevisionPoll
+from app.utils.sql import dialect_insert
+
+COMBO_COLUMNS = ("company_id", "core_company_id", "product_id", "channel_id")
+_CODE_COLUMNS = {
+    "company": (DimCompany, DimCompany.company_code, DimCompany.company_id),
+    "product": (DimProduct, DimProduct.product_code, DimProduct.product_id),
+    "channel": (DimChannel, DimChannel.channel_code, DimChannel.channel_id),
+}
+ComboKey = tuple[int | None, int | None, int | None, int | None]
+
+
+class DimensionResolver:
+    """In-memory code→ID maps for the dimension tables.
+
+    Each table is loaded once into a dict keyed by interned codes and reloaded
+    only when its ``dim_revision`` counter moves, which is checked at most
+    every ``check_interval`` seconds. Lookups work on whole columns: codes are
+    mapped with one vectorised ``Series.map`` and missing ``dim_combo`` rows
+    are created with one multi-row INSERT per batch. Created combos are kept
+    with the session until its transaction commits, so a rollback never
+    leaves ids in the shared maps that do not exist.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self._poll = RevisionPoll(get_dimension_revisions, check_interval)
+        self.codes: dict[str, dict[str, int]] = {kind: {} for kind in _CODE_COLUMNS}
+        self.combos: dict[ComboKey, int] = {}
+        self.members: dict[int, ComboKey] = {}
+        self.revisions: dict[str, int] | None = None
+        self._lock = threading.RLock()
+
+    def ensure_fresh(self, db: Session, force: bool = False) -> bool:
+        """Reload tables whose revision changed; returns whether anything was reloaded."""
+
+        # Read the stamp before the data: a concurrent change is then at
+        # worst loaded early and reloaded once more on the next check.
+        revisions = self._poll.check(db, force=force or self.revisions is None)
+        if revisions is None:
+            return False
+        with self._lock:
+            stale = [
+                table
+                for table in DIMENSION_TABLES
+                if force or self.revisions is None or revisions[table] != self.revisions.get(table)
+            ]
+            for kind, (model, code_column, id_column) in _CODE_COLUMNS.items():
+                if model.__tablename__ in stale:
+                    rows = db.execute(select(code_column, id_column).where(code_column.is_not(None))).all()
+                    self.codes[kind] = {sys.intern(code): ident for code, ident in rows}
+            if DimCombo.__tablename__ in stale:
+                rows = db.execute(select(DimCombo.combo_id, *(getattr(DimCombo, c) for c in COMBO_COLUMNS))).all()
+                self.combos = {tuple(row[1:]): row[0] for row in rows}
+                self.members = {combo_id: key for key, combo_id in self.combos.items()}
+            self.revisions = revisions
+            return bool(stale)
+
+    def resolve_codes(self, kind: str, codes: Iterable[Any]) -> pd.Series:
+        """Map a column of ``company``/``product``/``channel`` codes to IDs (``<NA>`` if unknown)."""
+
+        return _as_series(codes).map(self.codes[kind]).astype("Int64")
+
+    def resolve_combos(
+        self,
+        db: Session,
+        company_ids: Iterable[Any],
+        product_ids: Iterable[Any],
+        channel_ids: Iterable[Any],
+        core_company_ids: Iterable[Any] | None = None,
+    ) -> pd.Series:
+        """Map columns of member IDs to ``combo_id``, creating missing combos in bulk."""
+
+        company = _as_series(company_ids).astype("Int64")
+        frame = pd.DataFrame(
+            {
+                "company_id": company.to_numpy(),
+                "core_company_id": (
+                    _as_series(core_company_ids).astype("Int64").to_numpy()
+                    if core_company_ids is not None
+                    else pd.array([pd.NA] * len(company), dtype="Int64")
+                ),
+                "product_id": _as_series(product_ids).astype("Int64").to_numpy(),
+                "channel_id": _as_series(channel_ids).astype("Int64").to_numpy(),
+            }
+        )
+        unique = frame.drop_duplicates(ignore_index=True).copy()
+        keys = [_combo_key(row) for row in unique.itertuples(index=False)]
+        with self._lock:
+            pending = self._pending(db)
+            missing = [key for key in keys if key not in self.combos and key not in pending]
+            if missing:
+                pending.update(self._create_combos(db, missing))
+            unique["combo_id"] = pd.array([self.combos.get(key, pending.get(key)) for key in keys], dtype="Int64")
+        return frame.merge(unique, how="left", on=list(COMBO_COLUMNS))["combo_id"]
+
+    def combo_members(self, combo_ids: Iterable[Any]) -> pd.DataFrame:
+        """Member ID columns (``COMBO_COLUMNS``) for a column of ``combo_id`` values."""
+
+        ids = _as_series(combo_ids).astype("Int64")
+        unique = ids.dropna().unique()
+        with self._lock:
+            members = {int(combo_id): self.members.get(int(combo_id), (None,) * len(COMBO_COLUMNS)) for combo_id in unique}
+        table = pd.DataFrame.from_dict(members, orient="index", columns=list(COMBO_COLUMNS)).astype("Int64")
+        return table.reindex(ids.to_numpy()).reset_index(drop=True)
+
+    def _create_combos(self, db: Session, keys: Sequence[ComboKey]) -> dict[ComboKey, int]:
+        """Insert ``keys`` in the caller's transaction; the shared maps only learn of them once it commits."""
+
+        # One statement; SQLAlchemy's insertmanyvalues batches it into
+        # multi-row INSERT ... RETURNING round trips.
+        table = DimCombo.__table__
+        stmt = (
+            dialect_insert(db, table)
+            .on_conflict_do_nothing()
+            .returning(table.c.combo_id, *(table.c[column] for column in COMBO_COLUMNS))
+        )
+        params = [dict(zip(COMBO_COLUMNS, key)) for key in keys]
+        found = {tuple(row[1:]): row[0] for row in db.connection().execute(stmt, params).all()}
+        created = bool(found)
+
+        # Keys another worker inserted first were skipped by ON CONFLICT.
+        raced = [key for key in keys if key not in found]
+        if raced:
+            conditions = [
+                and_(
+                    *(
+                        getattr(DimCombo, column).is_(None) if value is None else getattr(DimCombo, column) == value
+                        for column, value in zip(COMBO_COLUMNS, key)
+                    )
+                )
+                for key in raced
+            ]
+            stmt = select(DimCombo.combo_id, *(getattr(DimCombo, c) for c in COMBO_COLUMNS)).where(or_(*conditions))
+            found.update((tuple(row[1:]), row[0]) for row in db.execute(stmt).all())
+
+        if created:
+            bump_dimension_revision(db, DimCombo.__tablename__)
+        _staged_combos.stage(db, [(found, created)])
+        return found
+
+    def _pending(self, db: Session) -> dict[ComboKey, int]:
+        """Combos created in ``db``'s open transaction."""
+
+        return {key: combo_id for combos, _ in _staged_combos.staged(db) for key, combo_id in combos.items()}
+
+    def _commit_combos(self, batches: list[tuple[dict[ComboKey, int], bool]]) -> None:
+        with self._lock:
+            for combos, _ in batches:
+                self.combos.update(combos)
+                self.members.update((combo_id, key) for key, combo_id in combos.items())
+            # Each batch that inserted rows bumped the revision once. Counting them
+            # skips the reload our own inserts would trigger, while a change made
+            # by anyone else still leaves the revision behind the table's.
+            bumps = sum(created for _, created in batches)
+            if bumps and self.revisions is not None:
+                self.revisions[DimCombo.__tablename__] = self.revisions.get(DimCombo.__tablename__, 0) + bumps
+
+
+def _as_series(values: Iterable[Any]) -> pd.Series:
+    if isinstance(values, pd.Series):
+        return values.reset_index(drop=True)
+    if hasattr(values, "to_pandas"):  # pyarrow arrays
+        return values.to_pandas()
+    return pd.Series(values if isinstance(values, (Sequence, np.ndarray)) else list(values))
+
+
+def _combo_key(row: tuple) -> ComboKey:
+    return tuple(None if pd.isna(value) else int(value) for value in row)  # type: ignore[return-value]
+
+
+dimension_resolver = DimensionResolver()
+_staged_combos = CommitHook("dimension_resolver_pending", dimension_resolver._commit_combos)
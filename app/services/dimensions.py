@@ -1,55 +1,220 @@
 from __future__ import annotations
 
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from datetime import datetime
 
-from app.models.metric import DimChannel, DimCombo, DimCompany, DimProduct
+from sqlalchemy import delete, event, insert, inspect, literal, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from app.models.metric import DimChannel, DimCombo, DimCompany, DimCompanyClosure, DimProduct, DimensionRevision
+from app.services.search import (
+    CHANNEL_SEARCH,
+    COMPANY_SEARCH,
+    PRODUCT_SEARCH,
+    matching_ids,
+    normalize_keyword,
+    search_page,
+)
+from app.utils.pagination import keyset_page
+from app.utils.sql import dialect_insert
+
+DIMENSION_MODELS = (DimCompany, DimProduct, DimChannel, DimCombo)
+DIMENSION_TABLES = tuple(model.__tablename__ for model in DIMENSION_MODELS)
+# Revision moved only when companies are added, removed or re-parented, not on renames.
+COMPANY_HIERARCHY = DimCompanyClosure.__tablename__
+# Deeper parent chains are treated as cycles when the closure is rebuilt.
+MAX_COMPANY_DEPTH = 64
 
 
 class DimensionService:
     def __init__(self, db: Session):
         self.db = db
 
-    def list_companies(self, keyword: str | None = None) -> list[DimCompany]:
+    def list_companies(
+        self, keyword: str | None = None, limit: int = 200, cursor: str | None = None
+    ) -> tuple[list[DimCompany], str | None]:
         query = self.db.query(DimCompany)
         if keyword:
-            pattern = f"%{keyword}%"
-            query = query.filter(
-                or_(DimCompany.company_name.ilike(pattern), DimCompany.company_code.ilike(pattern))
-            )
-        return query.order_by(DimCompany.company_id.desc()).all()
+            return search_page(query, COMPANY_SEARCH, keyword, limit, cursor)
+        return keyset_page(query, (DimCompany.company_id,), limit, cursor, descending=True)
+
+    def company_subtree_ids(self, company_id: int, include_self: bool = True) -> list[int]:
+        """IDs of ``company_id`` and every company below it, from one primary-key range scan."""
 
-    def list_products(self, keyword: str | None = None) -> list[DimProduct]:
+        stmt = select(DimCompanyClosure.descendant_id).where(DimCompanyClosure.ancestor_id == company_id)
+        if not include_self:
+            stmt = stmt.where(DimCompanyClosure.depth > 0)
+        return list(self.db.scalars(stmt.order_by(DimCompanyClosure.descendant_id)))
+
+    def company_ancestor_ids(self, company_id: int) -> list[int]:
+        """IDs from ``company_id`` up to its root, nearest first."""
+
+        stmt = (
+            select(DimCompanyClosure.ancestor_id)
+            .where(DimCompanyClosure.descendant_id == company_id)
+            .order_by(DimCompanyClosure.depth)
+        )
+        return list(self.db.scalars(stmt))
+
+    def list_products(
+        self, keyword: str | None = None, limit: int = 200, cursor: str | None = None
+    ) -> tuple[list[DimProduct], str | None]:
         query = self.db.query(DimProduct)
         if keyword:
-            pattern = f"%{keyword}%"
-            query = query.filter(
-                or_(DimProduct.product_name.ilike(pattern), DimProduct.product_code.ilike(pattern))
-            )
-        return query.order_by(DimProduct.product_id.desc()).all()
+            return search_page(query, PRODUCT_SEARCH, keyword, limit, cursor)
+        return keyset_page(query, (DimProduct.product_id,), limit, cursor, descending=True)
 
-    def list_channels(self, keyword: str | None = None) -> list[DimChannel]:
+    def list_channels(
+        self, keyword: str | None = None, limit: int = 200, cursor: str | None = None
+    ) -> tuple[list[DimChannel], str | None]:
         query = self.db.query(DimChannel)
         if keyword:
-            pattern = f"%{keyword}%"
-            query = query.filter(
-                or_(DimChannel.channel_name.ilike(pattern), DimChannel.channel_code.ilike(pattern))
-            )
-        return query.order_by(DimChannel.channel_id.desc()).all()
+            return search_page(query, CHANNEL_SEARCH, keyword, limit, cursor)
+        return keyset_page(query, (DimChannel.channel_id,), limit, cursor, descending=True)
 
-    def list_combos(self, keyword: str | None = None) -> list[DimCombo]:
+    def list_combos(
+        self, keyword: str | None = None, limit: int = 200, cursor: str | None = None
+    ) -> tuple[list[DimCombo], str | None]:
         query = self.db.query(DimCombo)
         if keyword:
-            pattern = f"%{keyword}%"
-            query = query.join(DimCombo.company, isouter=True).join(DimCombo.product, isouter=True).join(
-                DimCombo.channel, isouter=True
-            )
-            query = query.filter(
-                or_(
-                    DimCombo.combo_id.cast(str).ilike(pattern),
-                    DimCompany.company_name.ilike(pattern),
-                    DimProduct.product_name.ilike(pattern),
-                    DimChannel.channel_name.ilike(pattern),
-                )
+            # Match the member tables through their own indexes rather than joining every combo first.
+            keyword = normalize_keyword(keyword)
+            matches = [
+                DimCombo.company_id.in_(matching_ids(COMPANY_SEARCH, keyword)),
+                DimCombo.product_id.in_(matching_ids(PRODUCT_SEARCH, keyword)),
+                DimCombo.channel_id.in_(matching_ids(CHANNEL_SEARCH, keyword)),
+            ]
+            if keyword.isdecimal():
+                matches.append(DimCombo.combo_id == int(keyword))
+            query = query.filter(or_(*matches))
+        return keyset_page(query, (DimCombo.combo_id,), limit, cursor, descending=True)
+
+
+def get_dimension_revisions(db: Session) -> dict[str, int]:
+    rows = db.execute(select(DimensionRevision.table_name, DimensionRevision.revision)).all()
+    return {table: 0 for table in DIMENSION_TABLES} | {table: revision for table, revision in rows}
+
+
+def bump_dimension_revision(db: Session, *tables: str) -> None:
+    """Record that ``tables`` changed so cached copies of them get reloaded.
+
+    ORM writes are picked up automatically; bulk loaders that write the
+    dimension tables with Core statements must call this themselves.
+    """
+
+    if not tables:
+        return
+    stmt = dialect_insert(db, DimensionRevision).values(
+        [{"table_name": table, "revision": 1, "updated_at": datetime.utcnow()} for table in sorted(set(tables))]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DimensionRevision.table_name],
+        set_={"revision": DimensionRevision.revision + 1, "updated_at": stmt.excluded.updated_at},
+    )
+    db.connection().execute(stmt)
+
+
+def rebuild_company_closure(db: Session) -> None:
+    """Recompute ``dim_company_closure`` from ``parent_company_id`` in the caller's transaction.
+
+    For initial loads and bulk loaders that write ``dim_company`` with Core
+    statements; ORM writes keep the closure up to date incrementally.
+    """
+
+    company = DimCompany.__table__
+    tree = select(
+        company.c.company_id.label("ancestor_id"),
+        company.c.company_id.label("descendant_id"),
+        literal(0).label("depth"),
+    ).cte("tree", recursive=True)
+    child = company.alias("child")
+    tree = tree.union_all(
+        select(tree.c.ancestor_id, child.c.company_id, tree.c.depth + 1)
+        .join(child, child.c.parent_company_id == tree.c.descendant_id)
+        .where(tree.c.depth < MAX_COMPANY_DEPTH)
+    )
+    conn = db.connection()
+    conn.execute(delete(DimCompanyClosure))
+    conn.execute(
+        insert(DimCompanyClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"], select(tree.c.ancestor_id, tree.c.descendant_id, tree.c.depth)
+        )
+    )
+    bump_dimension_revision(db, COMPANY_HIERARCHY)
+
+
+def _link_company(db: Session, company_id: int, parent_id: int | None) -> None:
+    """Add the closure rows of a new company: itself, plus the parent's ancestors one level further up."""
+
+    conn = db.connection()
+    conn.execute(insert(DimCompanyClosure).values(ancestor_id=company_id, descendant_id=company_id, depth=0))
+    if parent_id is not None:
+        _attach_subtree(db, company_id, parent_id)
+
+
+def _attach_subtree(db: Session, company_id: int, parent_id: int) -> None:
+    above = aliased(DimCompanyClosure)
+    below = aliased(DimCompanyClosure)
+    db.connection().execute(
+        insert(DimCompanyClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+            .where(above.descendant_id == parent_id, below.ancestor_id == company_id),
+        )
+    )
+
+
+def _move_company(db: Session, company_id: int, parent_id: int | None) -> None:
+    """Re-hang ``company_id``'s subtree under ``parent_id``: drop its old outside ancestors, add the new ones."""
+
+    subtree = select(DimCompanyClosure.descendant_id).where(DimCompanyClosure.ancestor_id == company_id)
+    db.connection().execute(
+        delete(DimCompanyClosure).where(
+            DimCompanyClosure.descendant_id.in_(subtree),
+            DimCompanyClosure.ancestor_id.not_in(subtree),
+        )
+    )
+    if parent_id is not None:
+        _attach_subtree(db, company_id, parent_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_company_closure(session: Session, flush_context) -> None:
+    created = {obj.company_id: obj.parent_company_id for obj in session.new if isinstance(obj, DimCompany)}
+    deleted = [obj.company_id for obj in session.deleted if isinstance(obj, DimCompany)]
+    moved = {
+        obj.company_id: obj.parent_company_id
+        for obj in session.dirty
+        if isinstance(obj, DimCompany) and inspect(obj).attrs.parent_company_id.history.has_changes()
+    }
+    # ``created`` is consumed below.
+    relinked = bool(created or deleted or moved)
+    if deleted:
+        # Explicit as well as ON DELETE CASCADE: SQLite leaves foreign keys unenforced by default.
+        session.connection().execute(
+            delete(DimCompanyClosure).where(
+                or_(DimCompanyClosure.ancestor_id.in_(deleted), DimCompanyClosure.descendant_id.in_(deleted))
             )
-        return query.order_by(DimCombo.combo_id.desc()).all()
+        )
+    # Parents before children, so a child created in the same flush finds its parent's rows.
+    while created:
+        ready = [company_id for company_id, parent_id in created.items() if parent_id not in created]
+        if not ready:
+            raise ValueError("Company parent links form a cycle")
+        for company_id in ready:
+            _link_company(session, company_id, created.pop(company_id))
+    for company_id, parent_id in moved.items():
+        if parent_id is not None and parent_id in DimensionService(session).company_subtree_ids(company_id):
+            raise ValueError(f"Company {parent_id} is below company {company_id} and cannot be its parent")
+        _move_company(session, company_id, parent_id)
+    if relinked:
+        bump_dimension_revision(session, COMPANY_HIERARCHY)
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_on_dimension_flush(session: Session, flush_context, instances) -> None:
+    changed = {
+        obj.__tablename__
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, DIMENSION_MODELS)
+    }
+    bump_dimension_revision(session, *changed)
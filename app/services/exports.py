@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Float, cast, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.metric import MetricValue
+
+EXPORT_SCHEMA = pa.schema(
+    [
+        ("metric_version_caliber_id", pa.int64()),
+        ("period_date", pa.date32()),
+        ("company_code", pa.string()),
+        ("dimensions_key", pa.string()),
+        ("combo_id", pa.int64()),
+        ("value", pa.float64()),
+        ("value_status", pa.string()),
+    ]
+)
+EXPORT_COLUMNS = (
+    MetricValue.metric_version_caliber_id,
+    MetricValue.period_date,
+    MetricValue.company_code,
+    MetricValue.dimensions_key,
+    MetricValue.combo_id,
+    # Numeric comes back as Decimal; let the database hand over doubles instead.
+    cast(MetricValue.value, Float),
+    MetricValue.value_status,
+)
+# Media type and file extension per export format.
+FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+@dataclass(frozen=True)
+class MetricValueExport:
+    binding_ids: tuple[int, ...]
+    date_from: date | None = None
+    date_to: date | None = None
+    # Company codes to include (a subtree); None exports every company.
+    companies: tuple[str, ...] | None = None
+
+
+class MetricValueExporter:
+    """Stream ``metric_value`` slices as Arrow IPC or Parquet.
+
+    Rows come off a server-side cursor ``chunk_rows`` at a time in primary
+    key order; each chunk becomes one record batch (one Parquet row group)
+    and is encoded and handed out before the next is fetched, so memory is
+    bounded by a chunk whatever the size of the export.
+    """
+
+    def __init__(self, db: Session, chunk_rows: int | None = None):
+        self.db = db
+        self.chunk_rows = chunk_rows or settings.export_chunk_rows
+
+    def batches(self, export: MetricValueExport) -> Iterator[pa.RecordBatch]:
+        stmt = select(*EXPORT_COLUMNS).where(MetricValue.metric_version_caliber_id.in_(export.binding_ids))
+        if export.date_from:
+            stmt = stmt.where(MetricValue.period_date >= export.date_from)
+        if export.date_to:
+            stmt = stmt.where(MetricValue.period_date <= export.date_to)
+        if export.companies is not None:
+            stmt = stmt.where(MetricValue.company_code.in_(export.companies))
+        stmt = stmt.order_by(
+            MetricValue.metric_version_caliber_id,
+            MetricValue.period_date,
+            MetricValue.company_code,
+            MetricValue.dimensions_key,
+        )
+        result = self.db.execute(stmt.execution_options(stream_results=True, yield_per=self.chunk_rows))
+        for rows in result.partitions():
+            yield _record_batch(rows)
+
+    def stream(self, export: MetricValueExport, fmt: str) -> Iterator[bytes]:
+        """Encoded export in ``fmt`` (a ``FORMATS`` key), one chunk of bytes per record batch."""
+
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        sink = _ChunkSink()
+        out = pa.PythonFile(sink, mode="w")
+        if fmt == "arrow":
+            writer = pa.ipc.new_stream(out, EXPORT_SCHEMA)
+        else:
+            writer = pq.ParquetWriter(out, EXPORT_SCHEMA, compression="zstd")
+        for batch in self.batches(export):
+            writer.write_batch(batch)
+            yield from sink.drain()
+        writer.close()
+        yield from sink.drain()
+
+
+class _ChunkSink:
+    """Write-only file object that keeps what was written until it is drained."""
+
+    closed = False
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        return len(chunk)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self._chunks = self._chunks, []
+        if chunks:
+            yield b"".join(chunks)
+
+
+def _record_batch(rows: Sequence[Sequence[Any]]) -> pa.RecordBatch:
+    columns = list(zip(*rows))
+    arrays = [pa.array(values, type=field.type) for values, field in zip(columns, EXPORT_SCHEMA)]
+    return pa.RecordBatch.from_arrays(arrays, schema=EXPORT_SCHEMA)
@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Mapping
+from datetime import date, datetime
+from itertools import islice
+from typing import Any
+
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.metric import Metric, MetricValue, MetricValueRollup, MetricVersion, MetricVersionCaliber
+from app.schemas.metric_value import MetricValuePage, MetricValueQuery, MetricValueRead
+from app.services.access import UNRESTRICTED, Permissions, Principal, policy_engine
+from app.services.partitions import MetricValuePartitions
+from app.services.value_cache import value_cache
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.sql import dialect_insert
+
+KEY_COLUMNS = ("metric_version_caliber_id", "period_date", "company_code", "dimensions_key")
+VALUE_COLUMNS = ("value", "value_status", "quality_score", "evidence_id", "combo_id")
+COLUMNS = KEY_COLUMNS + VALUE_COLUMNS
+
+# Keyset orderings, each matching the key columns of one metric_value index.
+SORT_KEYS = {
+    "caliber": (
+        MetricValue.metric_version_caliber_id,
+        MetricValue.period_date,
+        MetricValue.company_code,
+        MetricValue.dimensions_key,
+    ),
+    "company": (
+        MetricValue.company_code,
+        MetricValue.period_date,
+        MetricValue.metric_version_caliber_id,
+        MetricValue.dimensions_key,
+    ),
+    "combo": (
+        MetricValue.combo_id,
+        MetricValue.period_date,
+        MetricValue.metric_version_caliber_id,
+        MetricValue.company_code,
+        MetricValue.dimensions_key,
+    ),
+}
+# Keyset orderings over metric_value_rollup, matching its primary key and company index.
+ROLLUP_SORT_KEYS = {
+    "rollup_caliber": (
+        MetricValueRollup.metric_version_caliber_id,
+        MetricValueRollup.period_date,
+        MetricValueRollup.company_code,
+    ),
+    "rollup_company": (
+        MetricValueRollup.company_code,
+        MetricValueRollup.period_date,
+        MetricValueRollup.metric_version_caliber_id,
+    ),
+}
+READ_COLUMNS = (
+    MetricValue.metric_version_caliber_id,
+    MetricValue.period_date,
+    MetricValue.company_code,
+    MetricValue.dimensions_key,
+    MetricValue.combo_id,
+    MetricValue.value,
+    MetricValue.value_status,
+)
+
+# value_status reported for rollup rows, which aggregate many stored values.
+ROLLUP_STATUS = "rollup"
+
+_STAGE_TABLE = "metric_value_stage"
+_STAGE_DDL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {_STAGE_TABLE} (
+    seq bigserial,
+    metric_version_caliber_id integer NOT NULL,
+    period_date date NOT NULL,
+    company_code varchar(64) NOT NULL,
+    dimensions_key varchar(100) NOT NULL,
+    value numeric(18, 4),
+    value_status varchar(16),
+    quality_score numeric(10, 0),
+    evidence_id integer,
+    combo_id integer
+) ON COMMIT DROP
+"""
+_MERGE_SQL = f"""
+INSERT INTO metric_value ({", ".join(COLUMNS)}, updated_at)
+SELECT DISTINCT ON ({", ".join(KEY_COLUMNS)})
+    {", ".join(COLUMNS)}, now() AT TIME ZONE 'utc'
+FROM {_STAGE_TABLE}
+ORDER BY {", ".join(KEY_COLUMNS)}, seq DESC
+ON CONFLICT ({", ".join(KEY_COLUMNS)}) DO UPDATE SET
+    {", ".join(f"{column} = EXCLUDED.{column}" for column in VALUE_COLUMNS)},
+    updated_at = EXCLUDED.updated_at
+"""
+
+
+class MetricValueService:
+    def __init__(self, db: Session, batch_size: int = 10_000):
+        self.db = db
+        self.batch_size = batch_size
+
+    def query_values(
+        self, query: MetricValueQuery, limit: int, cursor: str | None = None, principal: Principal | None = None
+    ) -> MetricValuePage:
+        """Return one keyset-paginated page of values matching ``query``.
+
+        The ordering follows whichever index the filters select (combo, then
+        company, then caliber), so each page is a bounded range scan no matter
+        how deep the client pages. Rollup queries (``rollup`` or ``level``) are
+        answered from ``metric_value_rollup`` instead. Pages are served through
+        the Redis read-through cache, keyed by the bindings the query reads.
+        ``principal``'s metric and company permissions are added to the
+        ``WHERE`` clause, and to the cache key.
+        """
+
+        if query.wants_rollup:
+            if query.combo_id is not None:
+                raise ValueError("Rollups are per company; combo_id cannot be combined with rollup or level")
+            if not (query.code or query.company_code):
+                raise ValueError("One of code or company_code is required")
+        elif not (query.code or query.company_code or query.combo_id is not None):
+            raise ValueError("One of code, company_code or combo_id is required")
+
+        permissions = policy_engine.permissions(self.db, principal)
+        binding_ids = None
+        if query.code:
+            binding_ids = self.resolve_binding_ids(query.code, query.version, permissions)
+            if not binding_ids:
+                return MetricValuePage(items=[])
+        load = self._query_rollups if query.wants_rollup else self._query_values
+        return value_cache.get_or_load(
+            query,
+            binding_ids,
+            limit,
+            cursor,
+            lambda: load(query, binding_ids, limit, cursor, permissions),
+            scope=permissions.scope_key,
+        )
+
+    def _query_values(
+        self,
+        query: MetricValueQuery,
+        binding_ids: list[int] | None,
+        limit: int,
+        cursor: str | None,
+        permissions: Permissions = UNRESTRICTED,
+    ) -> MetricValuePage:
+        stmt = select(*READ_COLUMNS)
+        if binding_ids is not None:
+            stmt = stmt.where(MetricValue.metric_version_caliber_id.in_(binding_ids))
+        else:
+            stmt = _where(stmt, permissions.binding_filter(MetricValue.metric_version_caliber_id))
+        stmt = _where(stmt, permissions.company_filter(MetricValue.company_code))
+        if query.company_code:
+            stmt = stmt.where(MetricValue.company_code == query.company_code)
+        if query.combo_id is not None:
+            stmt = stmt.where(MetricValue.combo_id == query.combo_id)
+        if query.period_date:
+            stmt = stmt.where(MetricValue.period_date == query.period_date)
+        if query.date_from:
+            stmt = stmt.where(MetricValue.period_date >= query.date_from)
+        if query.date_to:
+            stmt = stmt.where(MetricValue.period_date <= query.date_to)
+
+        if query.combo_id is not None:
+            sort_name = "combo"
+        elif query.company_code and not query.code:
+            sort_name = "company"
+        else:
+            sort_name = "caliber"
+        sort_key = SORT_KEYS[sort_name]
+        if cursor:
+            after = _cursor_values(cursor, sort_name, sort_key)
+            stmt = stmt.where(tuple_(*sort_key) > tuple_(*after))
+            # The row comparison alone does not let PostgreSQL prune monthly
+            # partitions. When the filters pin the leading sort column, later
+            # rows cannot have an earlier period, so state that bound directly.
+            if sort_name != "caliber" or (binding_ids is not None and len(binding_ids) == 1):
+                stmt = stmt.where(MetricValue.period_date >= after[1])
+        rows = self.db.execute(stmt.order_by(*sort_key).limit(limit + 1)).mappings().all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor([sort_name, *(last[column.key] for column in sort_key)])
+        return MetricValuePage(items=[MetricValueRead.model_validate(row) for row in rows], next_cursor=next_cursor)
+
+    def _query_rollups(
+        self,
+        query: MetricValueQuery,
+        binding_ids: list[int] | None,
+        limit: int,
+        cursor: str | None,
+        permissions: Permissions = UNRESTRICTED,
+    ) -> MetricValuePage:
+        table = MetricValueRollup
+        stmt = select(table.metric_version_caliber_id, table.period_date, table.company_code, table.value)
+        if binding_ids is not None:
+            stmt = stmt.where(table.metric_version_caliber_id.in_(binding_ids))
+        else:
+            stmt = _where(stmt, permissions.binding_filter(table.metric_version_caliber_id))
+        # A company's rollup includes its whole subtree, so only companies inside the scope qualify.
+        stmt = _where(stmt, permissions.company_filter(table.company_code))
+        if query.company_code:
+            stmt = stmt.where(table.company_code == query.company_code)
+        if query.level is not None:
+            stmt = stmt.where(table.level == query.level)
+        if query.period_date:
+            stmt = stmt.where(table.period_date == query.period_date)
+        if query.date_from:
+            stmt = stmt.where(table.period_date >= query.date_from)
+        if query.date_to:
+            stmt = stmt.where(table.period_date <= query.date_to)
+
+        sort_name = "rollup_company" if query.company_code and not query.code else "rollup_caliber"
+        sort_key = ROLLUP_SORT_KEYS[sort_name]
+        if cursor:
+            stmt = stmt.where(tuple_(*sort_key) > tuple_(*_cursor_values(cursor, sort_name, sort_key)))
+        rows = self.db.execute(stmt.order_by(*sort_key).limit(limit + 1)).mappings().all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor([sort_name, *(last[column.key] for column in sort_key)])
+        items = [MetricValueRead(**row, dimensions_key="", value_status=ROLLUP_STATUS) for row in rows]
+        return MetricValuePage(items=items, next_cursor=next_cursor)
+
+    def resolve_binding_ids(
+        self, code: str, version: str | None = None, permissions: Permissions = UNRESTRICTED
+    ) -> list[int]:
+        """Map a metric code to the caliber bindings whose values should be read.
+
+        An explicit ``version`` selects that version; otherwise the active
+        versions are used, falling back to every version of the metric.
+        Bindings come back in ``order_index`` order; a metric ``permissions``
+        does not cover resolves to none.
+        """
+
+        stmt = (
+            select(MetricVersionCaliber.id, MetricVersion.status)
+            .join(MetricVersion, MetricVersionCaliber.metric_version_id == MetricVersion.id)
+            .join(Metric, MetricVersion.metric_id == Metric.id)
+            .where(Metric.code == code)
+            .order_by(MetricVersionCaliber.order_index, MetricVersionCaliber.id)
+        )
+        if version:
+            stmt = stmt.where(MetricVersion.version == version)
+        stmt = _where(stmt, permissions.metric_filter())
+        rows = self.db.execute(stmt).all()
+        active = [binding_id for binding_id, status in rows if status == "active"]
+        if version or not active:
+            return [binding_id for binding_id, _ in rows]
+        return active
+
+    def bulk_upsert(self, rows: Iterable[Mapping[str, Any]]) -> int:
+        """Upsert ``metric_value`` rows in one transaction and return the number of rows written.
+
+        PostgreSQL streams rows through ``COPY`` into a transaction-scoped
+        staging table and merges them with a single ``INSERT ... ON CONFLICT``;
+        SQLite (development) falls back to batched ``executemany`` upserts.
+        Rows are mappings keyed by ``COLUMNS``; when the same key appears more
+        than once the last row wins. The count is of distinct keys, except
+        that SQLite counts a key once per batch it appears in, so memory
+        stays bounded by the batch size.
+        """
+
+        binding_ids: set[int] = set()
+        rows = _tracking_bindings(rows, binding_ids)
+        try:
+            if self.db.get_bind().dialect.name == "postgresql":
+                written = self._copy_merge(rows)
+            else:
+                written = self._executemany(rows)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        if binding_ids:
+            value_cache.invalidate(binding_ids)
+        return written
+
+    def _copy_merge(self, rows: Iterable[Mapping[str, Any]]) -> int:
+        self.db.execute(text(_STAGE_DDL))
+        cursor = self.db.connection().connection.driver_connection.cursor()
+        copied = 0
+        try:
+            with cursor.copy(f"COPY {_STAGE_TABLE} ({', '.join(COLUMNS)}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(_as_tuple(row))
+                    copied += 1
+        finally:
+            cursor.close()
+        if not copied:
+            return 0
+        months = self.db.scalars(
+            text(f"SELECT DISTINCT date_trunc('month', period_date)::date FROM {_STAGE_TABLE}")
+        ).all()
+        # Committed separately: the load's transaction must not hold partition DDL locks while it merges.
+        MetricValuePartitions(self.db).ensure_committed(months)
+        # DISTINCT ON keeps one row per key, so the merge's row count is the distinct key count.
+        return self.db.execute(text(_MERGE_SQL)).rowcount
+
+    def _executemany(self, rows: Iterable[Mapping[str, Any]]) -> int:
+        stmt = dialect_insert(self.db, MetricValue.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(KEY_COLUMNS),
+            set_={column: stmt.excluded[column] for column in (*VALUE_COLUMNS, "updated_at")},
+        )
+        written = 0
+        for batch in _batches(rows, self.batch_size):
+            now = datetime.utcnow()
+            # Later duplicates overwrite earlier ones, matching the COPY path.
+            params = {tuple(row[column] for column in KEY_COLUMNS): _as_params(row, now) for row in batch}
+            self.db.execute(stmt, list(params.values()))
+            written += len(params)
+        return written
+
+
+def _where(stmt, clause):
+    return stmt if clause is None else stmt.where(clause)
+
+
+def _cursor_values(cursor: str, sort_name: str, sort_key: tuple) -> list[Any]:
+    values = decode_cursor(cursor)
+    if len(values) != len(sort_key) + 1 or values[0] != sort_name:
+        raise ValueError("Cursor does not match the query")
+    values = values[1:]
+    for index, column in enumerate(sort_key):
+        if column.key == "period_date":
+            values[index] = date.fromisoformat(values[index])
+    return values
+
+
+def _tracking_bindings(rows: Iterable[Mapping[str, Any]], seen: set[int]) -> Iterator[Mapping[str, Any]]:
+    for row in rows:
+        seen.add(row["metric_version_caliber_id"])
+        yield row
+
+
+def _as_tuple(row: Mapping[str, Any]) -> tuple:
+    return (
+        row["metric_version_caliber_id"],
+        row["period_date"],
+        row["company_code"],
+        row["dimensions_key"],
+        row.get("value"),
+        row.get("value_status") or "actual",
+        row.get("quality_score"),
+        row.get("evidence_id"),
+        row.get("combo_id"),
+    )
+
+
+def _as_params(row: Mapping[str, Any], now: datetime) -> dict[str, Any]:
+    params = dict(zip(COLUMNS, _as_tuple(row)))
+    params["updated_at"] = now
+    return params
+
+
+def _batches(rows: Iterable[Mapping[str, Any]], size: int) -> Iterator[list[Mapping[str, Any]]]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -1,32 +1,46 @@
 from __future__ import annotations
 
-from sqlalchemy import func, or_
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, true
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from app.models.metric import Metric, MetricVersion
+from app.models.metric import Metric, MetricVersion, MetricVersionCaliber
 from app.schemas.metric import MetricCreate, MetricSummary, MetricUpdate, MetricVersionCreate, MetricVersionUpdate
+from app.services.access import Principal, policy_engine
+from app.services.dependencies import check_formula
+from app.services.search import METRIC_SEARCH, search_page
+from app.services.stats_cache import METRIC_SUMMARY, stats_cache
+from app.utils.pagination import keyset_page
+
+# Everything MetricVersionRead serialises, fetched with one SELECT ... IN per level.
+VERSION_DETAIL = selectinload(MetricVersion.calibers).selectinload(MetricVersionCaliber.caliber)
+METRIC_DETAIL = selectinload(Metric.versions).options(VERSION_DETAIL)
 
 
 class MetricService:
     def __init__(self, db: Session):
         self.db = db
 
-    def list_metrics(self, keyword: str | None = None, subject_area: str | None = None, sensitivity: str | None = None):
-        query = self.db.query(Metric)
-        if keyword:
-            pattern = f"%{keyword}%"
-            query = query.filter(
-                or_(
-                    Metric.code.ilike(pattern),
-                    Metric.name.ilike(pattern),
-                    Metric.owner.ilike(pattern),
-                )
-            )
+    def list_metrics(
+        self,
+        keyword: str | None = None,
+        subject_area: str | None = None,
+        sensitivity: str | None = None,
+        limit: int = 200,
+        cursor: str | None = None,
+        with_versions: bool = True,
+        principal: Principal | None = None,
+    ) -> tuple[list[Metric], str | None]:
+        query = self._readable(self.db.query(Metric), principal)
+        if with_versions:
+            query = query.options(METRIC_DETAIL)
         if subject_area:
             query = query.filter(Metric.subject_area == subject_area)
         if sensitivity:
             query = query.filter(Metric.sensitivity == sensitivity)
-        return query.order_by(Metric.code).all()
+        if keyword:
+            # Keyword searches come back best match first rather than by code.
+            return search_page(query, METRIC_SEARCH, keyword, limit, cursor)
+        return keyset_page(query, (Metric.code,), limit, cursor)
 
     def create_metric(self, payload: MetricCreate) -> Metric:
         metric = Metric(
@@ -44,31 +58,32 @@ class MetricService:
         version = self._build_version(metric, payload.initial_version)
         metric.versions.append(version)
         self.db.add(metric)
+        self._check_dependencies(metric.code, version)
         self.db.commit()
-        self.db.refresh(metric)
-        return metric
+        return self.get_metric(metric.id)
 
-    def get_metric(self, metric_id: int) -> Metric | None:
-        return self.db.query(Metric).filter(Metric.id == metric_id).first()
+    def get_metric(self, metric_id: int, principal: Principal | None = None) -> Metric | None:
+        query = self._readable(self.db.query(Metric), principal)
+        return query.options(METRIC_DETAIL).filter(Metric.id == metric_id).first()
 
     def request_publish(self, metric_id: int) -> Metric:
-        metric = self.db.query(Metric).filter(Metric.id == metric_id).first()
+        # Bindings are loaded for the value cache, which drops their pages once the status change commits.
+        versions = joinedload(Metric.versions).selectinload(MetricVersion.calibers)
+        metric = self.db.query(Metric).options(versions).filter(Metric.id == metric_id).first()
         if not metric:
             raise ValueError("Metric not found")
         for version in metric.versions:
             if version.status == "draft":
                 version.status = "pending_review"
         self.db.commit()
-        self.db.refresh(metric)
-        return metric
+        return self.get_metric(metric_id)
 
-    def list_versions(self, metric_id: int):
-        return (
-            self.db.query(MetricVersion)
-            .filter(MetricVersion.metric_id == metric_id)
-            .order_by(MetricVersion.created_at.desc())
-            .all()
-        )
+    def list_versions(self, metric_id: int, principal: Principal | None = None):
+        query = self.db.query(MetricVersion).options(VERSION_DETAIL).filter(MetricVersion.metric_id == metric_id)
+        clause = policy_engine.permissions(self.db, principal).metric_filter()
+        if clause is not None:
+            query = query.join(Metric, MetricVersion.metric_id == Metric.id).filter(clause)
+        return query.order_by(MetricVersion.created_at.desc()).all()
 
     def create_version(self, metric_id: int, payload: MetricVersionCreate) -> MetricVersion:
         metric = self.get_metric(metric_id)
@@ -78,9 +93,9 @@ class MetricService:
         next_version = payload.version or self._next_version_label(metric_id)
         version = self._build_version(metric, payload, next_version)
         self.db.add(version)
+        self._check_dependencies(metric.code, version)
         self.db.commit()
-        self.db.refresh(version)
-        return version
+        return self._get_version(version.id)
 
     def update_version(self, metric_id: int, version_id: int, payload: MetricVersionUpdate) -> MetricVersion:
         version = (
@@ -93,9 +108,9 @@ class MetricService:
         for field, value in payload.model_dump(exclude_unset=True).items():
             if hasattr(version, field):
                 setattr(version, field, value)
+        self._check_dependencies(version.metric.code, version)
         self.db.commit()
-        self.db.refresh(version)
-        return version
+        return self._get_version(version.id)
 
     def delete_version(self, metric_id: int, version_id: int) -> None:
         version = (
@@ -109,22 +124,41 @@ class MetricService:
         self.db.commit()
 
     def summary(self) -> MetricSummary:
-        total_metrics = self.db.query(func.count(Metric.id)).scalar() or 0
-        sensitive_metrics = (
-            self.db.query(func.count(Metric.id)).filter(Metric.sensitivity != "normal").scalar() or 0
-        )
-        active_versions = (
-            self.db.query(func.count(MetricVersion.id)).filter(MetricVersion.status == "active").scalar() or 0
-        )
-        draft_versions = (
-            self.db.query(func.count(MetricVersion.id)).filter(MetricVersion.status == "draft").scalar() or 0
-        )
-        return MetricSummary(
-            total_metrics=total_metrics,
-            sensitive_metrics=sensitive_metrics,
-            active_versions=active_versions,
-            draft_versions=draft_versions,
-        )
+        """Catalogue counters, cached briefly and dropped whenever a metric or version is written."""
+
+        return stats_cache.get(METRIC_SUMMARY, self._load_summary)
+
+    def _load_summary(self) -> MetricSummary:
+        metrics = select(
+            func.count(Metric.id).label("total_metrics"),
+            func.count(Metric.id).filter(Metric.sensitivity != "normal").label("sensitive_metrics"),
+        ).subquery()
+        versions = select(
+            func.count(MetricVersion.id).filter(MetricVersion.status == "active").label("active_versions"),
+            func.count(MetricVersion.id).filter(MetricVersion.status == "draft").label("draft_versions"),
+        ).subquery()
+        # Each side aggregates to a single row; the cross join just puts them side by side.
+        row = self.db.execute(select(metrics, versions).select_from(metrics.join(versions, true()))).one()
+        return MetricSummary.model_validate(row._mapping)
+
+    def _readable(self, query, principal: Principal | None):
+        """Limit a ``Metric`` query to the metrics ``principal`` may read."""
+
+        clause = policy_engine.permissions(self.db, principal).metric_filter()
+        return query if clause is None else query.filter(clause)
+
+    def _check_dependencies(self, code: str, version: MetricVersion) -> None:
+        """Reject a formula that would make the metric depend on itself, rolling back the edit."""
+
+        try:
+            with self.db.no_autoflush:
+                check_formula(self.db, code, version)
+        except ValueError:
+            self.db.rollback()
+            raise
+
+    def _get_version(self, version_id: int) -> MetricVersion:
+        return self.db.query(MetricVersion).options(VERSION_DETAIL).filter(MetricVersion.id == version_id).one()
 
     def _next_version_label(self, metric_id: int) -> str:
         latest = (
@@ -163,7 +197,7 @@ class MetricService:
         return version
 
     def update_metric(self, metric_id: int, payload: MetricUpdate) -> Metric:
-        metric = self.get_metric(metric_id)
+        metric = self.db.get(Metric, metric_id)
         if not metric:
             raise ValueError("Metric not found")
         for field in (
@@ -180,8 +214,7 @@ class MetricService:
             if value is not None:
                 setattr(metric, field, value)
         self.db.commit()
-        self.db.refresh(metric)
-        return metric
+        return self.get_metric(metric_id)
 
     def delete_metric(self, metric_id: int) -> None:
         metric = self.get_metric(metric_id)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import date
+
+from loguru import logger
+from sqlalchemy import Connection, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+PARENT_TABLE = "metric_value"
+# Written with ON CONFLICT updates, so leave room for HOT updates, and vacuum
+# well before the default 20% of a month's rows are dead.
+PARTITION_STORAGE = (
+    "fillfactor = 90, autovacuum_vacuum_scale_factor = 0.02, autovacuum_analyze_scale_factor = 0.01"
+)
+# Serialises partition DDL between workers that find the same month missing.
+_DDL_LOCK = "metric_value_partitions"
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def add_months(value: date, months: int) -> date:
+    month = value.month - 1 + months
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month:%Y%m}"
+
+
+class MetricValuePartitions:
+    """Monthly range partitions of ``metric_value`` on ``period_date``.
+
+    Partitions are created ahead of time by a nightly task and on demand by
+    the bulk writer, in a short transaction of its own before it merges, so
+    every row lands in its own month. Months older than
+    the retention window are detached, which only touches the catalog, and
+    moved to an archive schema where they can be dumped or dropped without
+    vacuuming the live table. Everything is a no-op on other dialects.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @property
+    def enabled(self) -> bool:
+        return self.db.get_bind().dialect.name == "postgresql"
+
+    def existing(self) -> dict[date, str]:
+        """Attached partitions by the month they hold."""
+
+        if not self.enabled:
+            return {}
+        return _attached(self.db)
+
+    def ensure(self, months: Iterable[date]) -> list[str]:
+        """Create the partitions missing for ``months`` in the caller's transaction; returns the new names."""
+
+        if not self.enabled:
+            return []
+        return _create_missing(self.db, months)
+
+    def ensure_committed(self, months: Iterable[date]) -> list[str]:
+        """Like ``ensure``, but in a short transaction of its own that commits before this returns.
+
+        For bulk writers: the DDL's locks are released straight away rather
+        than held until the load's own transaction commits.
+        """
+
+        if not self.enabled:
+            return []
+        with self.db.get_bind().connect() as conn, conn.begin():
+            return _create_missing(conn, months)
+
+    def ensure_ahead(self, today: date | None = None, months: int | None = None) -> list[str]:
+        """Create partitions for the current month and the next ``months`` (``METRIC_VALUE_PARTITIONS_AHEAD``)."""
+
+        start = month_start(today or date.today())
+        ahead = settings.metric_value_partitions_ahead if months is None else months
+        return self.ensure(add_months(start, offset) for offset in range(ahead + 1))
+
+    def archive_before(self, cutoff: date) -> list[str]:
+        """Detach the partitions holding only months before ``cutoff`` and move them to the archive schema.
+
+        ``DETACH ... CONCURRENTLY`` cannot run inside a transaction, so this
+        uses its own autocommit connection; readers and writers of other
+        months are not blocked.
+        """
+
+        if not self.enabled:
+            return []
+        old = sorted(name for month, name in self.existing().items() if month < month_start(cutoff))
+        if not old:
+            return []
+        schema = settings.metric_value_archive_schema
+        with self.db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+            for name in old:
+                conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name} CONCURRENTLY"))
+                conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {schema}"))
+        logger.info("Archived metric_value partitions {} to {}", ", ".join(old), schema)
+        return old
+
+    def apply_retention(self, today: date | None = None) -> list[str]:
+        """Archive months past ``METRIC_VALUE_RETENTION_MONTHS``; 0 keeps everything attached."""
+
+        keep = settings.metric_value_retention_months
+        if keep <= 0:
+            return []
+        return self.archive_before(add_months(month_start(today or date.today()), -keep))
+
+
+def _attached(conn: Connection | Session) -> dict[date, str]:
+    rows = conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits"
+            " JOIN pg_class parent ON parent.oid = pg_inherits.inhparent"
+            " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+            " WHERE parent.relname = :parent"
+        ),
+        {"parent": PARENT_TABLE},
+    ).scalars()
+    prefix = f"{PARENT_TABLE}_p"
+    months = {}
+    for name in rows:
+        suffix = name.removeprefix(prefix)
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            months[date(int(suffix[:4]), int(suffix[4:]), 1)] = name
+    return months
+
+
+def _create_missing(conn: Connection | Session, months: Iterable[date]) -> list[str]:
+    """Create and attach the partitions missing for ``months`` in ``conn``'s transaction.
+
+    Each month is created as a standalone table and then attached: ``ATTACH
+    PARTITION`` takes only a SHARE UPDATE EXCLUSIVE lock on ``metric_value``,
+    so reads and writes of the other months carry on, where ``CREATE TABLE
+    ... PARTITION OF`` would lock the whole table.
+    """
+
+    wanted = {month_start(month) for month in months}
+    if not wanted - set(_attached(conn)):
+        return []
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:lock))"), {"lock": _DDL_LOCK})
+    created = []
+    for month in sorted(wanted - set(_attached(conn))):
+        name = partition_name(month)
+        conn.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {name}"
+                f" (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) WITH ({PARTITION_STORAGE})"
+            )
+        )
+        conn.execute(
+            text(
+                f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name}"
+                f" FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            )
+        )
+        created.append(name)
+    if created:
+        logger.info("Created metric_value partitions {}", ", ".join(created))
+    return created
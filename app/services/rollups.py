@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any
+
+import pandas as pd
+from loguru import logger
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session, aliased
+
+from app.models.metric import (
+    DimCompany,
+    DimCompanyClosure,
+    Metric,
+    MetricValue,
+    MetricValueRollup,
+    MetricVersion,
+    MetricVersionCaliber,
+    RollupWatermark,
+)
+from app.services.company_tree import CompanyTree, company_tree
+from app.services.dimensions import COMPANY_HIERARCHY, get_dimension_revisions
+from app.services.partitions import add_months, month_start
+from app.services.value_cache import value_cache
+from app.services.watermarks import WatermarkService
+
+# Watermark row tracking the company hierarchy revision the rollups were built against.
+HIERARCHY_KEY = "__dim_company__"
+_LOCK = "metric_value_rollup"
+
+
+class RollupService:
+    """Maintain ``metric_value_rollup``: every binding's values summed up the company hierarchy.
+
+    Each rollup row totals a company and all its descendants for one period,
+    across dimension combos. Refreshes follow the data source change log:
+    only the (month, ancestor) cells above companies whose values changed
+    since the last refresh are recomputed. A change to the company hierarchy
+    (re-parenting, new or removed companies) rebuilds everything, one month
+    per transaction; renames do not. Sums are only
+    meaningful for additive metrics; ratios should be derived from rolled-up
+    inputs instead.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.watermarks = WatermarkService(db)
+
+    def refresh(self) -> dict[str, Any]:
+        """Apply the changes logged since the last refresh; all of it commits as one transaction, except rebuilds."""
+
+        if not self._lock():
+            logger.info("Company rollups are already being refreshed")
+            return {"skipped": True}
+        hierarchy = company_tree.get(self.db, force=True)
+        revision = get_dimension_revisions(self.db).get(COMPANY_HIERARCHY, 0)
+        state = dict(self.db.execute(select(RollupWatermark.source, RollupWatermark.watermark)).all())
+        # Read before any values so changes landing mid-refresh are picked up next time.
+        current = self.watermarks.current(self.db.scalars(select(Metric.code)))
+        if state.get(HIERARCHY_KEY) != revision:
+            rows = self.rebuild(hierarchy)
+            if rows is None:
+                return {"skipped": True}
+            self._save_state({**current, HIERARCHY_KEY: revision})
+            return {"rebuilt": True, "rows": rows}
+
+        rows, sources = 0, []
+        for code, watermark in current.items():
+            since = state.get(code, 0)
+            if watermark <= since:
+                continue
+            months: dict[date, set[str]] = {}
+            for month, company_code in self.watermarks.changed_since({code: since}, {code: watermark}):
+                months.setdefault(month, set()).add(company_code)
+            binding_ids = self._binding_ids(code)
+            for month, companies in sorted(months.items()):
+                rows += self._refresh_month(hierarchy, month, binding_ids, companies)
+            sources.append(code)
+        self._save_state({code: current[code] for code in sources})
+        logger.info("Refreshed company rollups for {} sources ({} rows)", len(sources), rows)
+        return {"rebuilt": False, "sources": sources, "rows": rows}
+
+    def consumed_watermarks(self) -> dict[str, int] | None:
+        """Change-log position the next refresh reads from, per metric code; ``None`` if it will rebuild."""
+
+        state = dict(self.db.execute(select(RollupWatermark.source, RollupWatermark.watermark)).all())
+        if HIERARCHY_KEY not in state:
+            return None
+        return {code: state.get(code, 0) for code in self.db.scalars(select(Metric.code))}
+
+    def rebuild(self, hierarchy: CompanyTree | None = None) -> int | None:
+        """Recompute every rollup row, committing one month at a time.
+
+        Returns the row count, or ``None`` when another refresher took the
+        lock between two months and carries on instead.
+        """
+
+        hierarchy = hierarchy or company_tree.get(self.db, force=True)
+        periods = [
+            *self.db.scalars(select(MetricValue.period_date).distinct()),
+            *self.db.scalars(select(MetricValueRollup.period_date).distinct()),
+        ]
+        rows = 0
+        for month in sorted({month_start(period) for period in periods}):
+            rows += self._refresh_month(hierarchy, month, None, None)
+            self.db.commit()
+            # The advisory lock ends with each transaction: take it again before the next one.
+            if not self._lock():
+                logger.info("Company rollup rebuild handed over to another refresher")
+                return None
+        logger.info("Rebuilt company rollups ({} rows)", rows)
+        return rows
+
+    def _refresh_month(
+        self,
+        hierarchy: CompanyTree,
+        month: date,
+        binding_ids: list[int] | None,
+        companies: set[str] | None,
+    ) -> int:
+        """Recompute the month's rollups for ``binding_ids`` x the ancestors of ``companies`` (None = all).
+
+        Values are summed up the tree in SQL through ``dim_company_closure``,
+        and only the ancestor cells being refreshed are read and rewritten.
+        Runs in the caller's transaction.
+        """
+
+        if binding_ids == [] or companies == set():
+            return 0
+        end = add_months(month, 1) - timedelta(days=1)
+        leaf, ancestor = aliased(DimCompany), aliased(DimCompany)
+        stmt = (
+            select(
+                MetricValue.metric_version_caliber_id,
+                MetricValue.period_date,
+                ancestor.company_code,
+                func.sum(MetricValue.value),
+                func.count(),
+            )
+            .join(leaf, leaf.company_code == MetricValue.company_code)
+            .join(DimCompanyClosure, DimCompanyClosure.descendant_id == leaf.company_id)
+            .join(ancestor, ancestor.company_id == DimCompanyClosure.ancestor_id)
+            .where(MetricValue.period_date >= month, MetricValue.period_date <= end)
+            .group_by(MetricValue.metric_version_caliber_id, MetricValue.period_date, ancestor.company_code)
+        )
+        cleared = delete(MetricValueRollup).where(
+            MetricValueRollup.period_date >= month, MetricValueRollup.period_date <= end
+        )
+        if binding_ids is not None:
+            stmt = stmt.where(MetricValue.metric_version_caliber_id.in_(binding_ids))
+            cleared = cleared.where(MetricValueRollup.metric_version_caliber_id.in_(binding_ids))
+        if companies is not None:
+            ancestors = _ancestor_codes(companies)
+            stmt = stmt.where(ancestor.company_code.in_(ancestors))
+            cleared = cleared.where(MetricValueRollup.company_code.in_(ancestors))
+        self.db.execute(cleared)
+
+        columns = ["metric_version_caliber_id", "period_date", "company_code", "value", "leaf_rows"]
+        rollups = pd.DataFrame(self.db.execute(stmt).all(), columns=columns)
+        if rollups.empty:
+            return 0
+        rollups["value"] = pd.to_numeric(rollups["value"], errors="coerce").astype("float64")
+        rollups["level"] = rollups["company_code"].map(hierarchy.level)
+        rollups["value"] = rollups["value"].astype(object).where(rollups["value"].notna(), None)
+        self.db.execute(insert(MetricValueRollup), rollups.to_dict("records"))
+        return len(rollups)
+
+    def _lock(self) -> bool:
+        # One refresher at a time: two would delete and re-insert the same cells.
+        if self.db.get_bind().dialect.name != "postgresql":
+            return True
+        return bool(self.db.scalar(text("SELECT pg_try_advisory_xact_lock(hashtext(:lock))"), {"lock": _LOCK}))
+
+    def _binding_ids(self, code: str) -> list[int]:
+        return list(
+            self.db.scalars(
+                select(MetricVersionCaliber.id)
+                .join(MetricVersion, MetricVersionCaliber.metric_version_id == MetricVersion.id)
+                .join(Metric, MetricVersion.metric_id == Metric.id)
+                .where(Metric.code == code)
+            )
+        )
+
+    def _save_state(self, watermarks: dict[str, int]) -> None:
+        for source, watermark in watermarks.items():
+            self.db.merge(RollupWatermark(source=source, watermark=watermark))
+        self.db.commit()
+        if watermarks:
+            value_cache.invalidate(rollups=True)
+
+
+def _ancestor_codes(companies: set[str]):
+    """Subquery of the codes of ``companies`` and every company above them."""
+
+    changed, ancestor = aliased(DimCompany), aliased(DimCompany)
+    return (
+        select(ancestor.company_code)
+        .join(DimCompanyClosure, DimCompanyClosure.ancestor_id == ancestor.company_id)
+        .join(changed, changed.company_id == DimCompanyClosure.descendant_id)
+        .where(changed.company_code.in_(sorted(companies)))
+    )
@@ -0,0 +1,177 @@
+"""Keyword search over the metric catalogue and the dimension tables.
+
+Keywords match any searchable column as a case-insensitive substring. On
+PostgreSQL the ``ILIKE`` filters are answered by the ``pg_trgm`` GIN indexes
+declared on the models, and results are ranked in the query: an exact code
+match first, then code prefixes, then name prefixes, with trigram similarity
+breaking ties. Other dialects (SQLite in development) filter with the same
+``LIKE`` and rank the matches in process with the same scoring.
+
+Keywords are NFKC-normalised, so full-width input such as ``ＡＢＣ`` or ``１２``
+finds ``abc`` / ``12``. Chinese names are indexed like any other text as long
+as the database uses a UTF-8 locale (``pg_trgm`` only keeps characters the
+locale calls alphanumeric); keywords of one or two characters have no
+complete trigram and scan the whole index, which is still far cheaper than
+the table.
+"""
+
+from __future__ import annotations
+
+import unicodedata
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import Numeric, and_, case, cast, func, literal, or_, select
+from sqlalchemy.orm import InstrumentedAttribute, Query
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.metric import DimChannel, DimCompany, DimProduct, Metric
+from app.utils.cursor import decode_cursor, encode_cursor
+
+_ESCAPE = "\\"
+# Relevance boosts on top of trigram similarity (0..1).
+_EXACT_CODE, _CODE_PREFIX, _TEXT_PREFIX = 3.0, 2.0, 1.0
+
+
+@dataclass(frozen=True)
+class SearchFields:
+    """Columns a keyword is matched against: ``code`` first, then free text; ``key`` breaks ranking ties."""
+
+    key: InstrumentedAttribute
+    code: InstrumentedAttribute
+    texts: tuple[InstrumentedAttribute, ...] = ()
+
+    @property
+    def columns(self) -> tuple[InstrumentedAttribute, ...]:
+        return (self.code, *self.texts)
+
+
+METRIC_SEARCH = SearchFields(Metric.id, Metric.code, (Metric.name, Metric.owner))
+COMPANY_SEARCH = SearchFields(DimCompany.company_id, DimCompany.company_code, (DimCompany.company_name,))
+PRODUCT_SEARCH = SearchFields(DimProduct.product_id, DimProduct.product_code, (DimProduct.product_name,))
+CHANNEL_SEARCH = SearchFields(DimChannel.channel_id, DimChannel.channel_code, (DimChannel.channel_name,))
+
+
+def normalize_keyword(keyword: str | None) -> str:
+    return unicodedata.normalize("NFKC", keyword or "").strip().casefold()
+
+
+def keyword_filter(fields: SearchFields, keyword: str) -> ColumnElement[bool]:
+    """Substring match of an already normalised ``keyword`` on any of ``fields``' columns."""
+
+    pattern = f"%{_escape_like(keyword)}%"
+    return or_(*(column.ilike(pattern, escape=_ESCAPE) for column in fields.columns))
+
+
+def matching_ids(fields: SearchFields, keyword: str):
+    """Subquery of the keys whose columns match ``keyword``, for filtering tables that reference them."""
+
+    return select(fields.key).where(keyword_filter(fields, keyword))
+
+
+def search_page(
+    query: Query,
+    fields: SearchFields,
+    keyword: str,
+    limit: int,
+    cursor: str | None = None,
+) -> tuple[list[Any], str | None]:
+    """One page of ``query``'s rows matching ``keyword``, best match first.
+
+    The cursor holds the last row's (score, key), so paging stays stable
+    while rows elsewhere in the ranking change. It only fits the keyword it
+    was issued for.
+    """
+
+    keyword = normalize_keyword(keyword)
+    query = query.filter(keyword_filter(fields, keyword))
+    after = _decode_search_cursor(cursor) if cursor else None
+    if query.session.get_bind().dialect.name == "postgresql":
+        scored = _ranked_in_database(query, fields, keyword, limit, after)
+    else:
+        scored = _ranked_in_process(query, fields, keyword, limit, after)
+    if len(scored) <= limit:
+        return [row for _, row in scored], None
+    scored = scored[:limit]
+    score, last = scored[-1]
+    return [row for _, row in scored], encode_cursor([score, getattr(last, fields.key.key)])
+
+
+def score_row(fields: SearchFields, row: Any, keyword: str) -> float:
+    """Relevance of a loaded row, scored the way ``_relevance_sql`` scores it in PostgreSQL."""
+
+    code = (getattr(row, fields.code.key) or "").casefold()
+    texts = [(getattr(row, column.key) or "").casefold() for column in fields.texts]
+    prefix = _EXACT_CODE if code == keyword else _CODE_PREFIX if code.startswith(keyword) else 0.0
+    if not prefix and any(text.startswith(keyword) for text in texts):
+        prefix = _TEXT_PREFIX
+    similarity = max((trigram_similarity(value, keyword) for value in (code, *texts) if value), default=0.0)
+    return round(prefix + similarity, 4)
+
+
+def trigram_similarity(left: str, right: str) -> float:
+    """``pg_trgm``'s ``similarity()``: shared trigrams over all trigrams of the two strings."""
+
+    a, b = _trigrams(left), _trigrams(right)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _ranked_in_database(
+    query: Query, fields: SearchFields, keyword: str, limit: int, after: tuple[float, Any] | None
+) -> list[tuple[float, Any]]:
+    score = _relevance_sql(fields, keyword)
+    if after is not None:
+        query = query.filter(or_(score < after[0], and_(score == after[0], fields.key < after[1])))
+    rows = query.add_columns(score).order_by(score.desc(), fields.key.desc()).limit(limit + 1).all()
+    return [(float(row_score), row) for row, row_score in rows]
+
+
+def _ranked_in_process(
+    query: Query, fields: SearchFields, keyword: str, limit: int, after: tuple[float, Any] | None
+) -> list[tuple[float, Any]]:
+    scored = [(score_row(fields, row, keyword), row) for row in query.all()]
+    scored.sort(key=lambda item: (item[0], getattr(item[1], fields.key.key)), reverse=True)
+    if after is not None:
+        scored = [item for item in scored if (item[0], getattr(item[1], fields.key.key)) < after]
+    return scored[: limit + 1]
+
+
+def _relevance_sql(fields: SearchFields, keyword: str) -> ColumnElement:
+    prefix = f"{_escape_like(keyword)}%"
+    code = func.lower(fields.code)
+    boost = case(
+        (code == keyword, literal(_EXACT_CODE)),
+        (code.like(prefix, escape=_ESCAPE), literal(_CODE_PREFIX)),
+        *((func.lower(column).like(prefix, escape=_ESCAPE), literal(_TEXT_PREFIX)) for column in fields.texts),
+        else_=literal(0.0),
+    )
+    similarity = func.greatest(*(func.coalesce(func.similarity(column, keyword), 0) for column in fields.columns))
+    # Rounded so the value round-trips through the cursor exactly.
+    return func.round(cast(boost + similarity, Numeric(12, 6)), 4)
+
+
+def _decode_search_cursor(cursor: str) -> tuple[float, Any]:
+    values = decode_cursor(cursor)
+    if len(values) != 2 or not isinstance(values[0], (int, float)) or values[1] is None:
+        raise ValueError("Cursor does not match the query")
+    return float(values[0]), values[1]
+
+
+def _escape_like(value: str) -> str:
+    return value.replace(_ESCAPE, _ESCAPE * 2).replace("%", _ESCAPE + "%").replace("_", _ESCAPE + "_")
+
+
+def _trigrams(value: str) -> set[str]:
+    grams: set[str] = set()
+    word: list[str] = []
+    for char in f"{value.casefold()} ":
+        if char.isalnum():
+            word.append(char)
+            continue
+        if word:
+            padded = "  " + "".join(word) + " "
+            grams.update(padded[index : index + 3] for index in range(len(padded) - 2))
+            word = []
+    return grams
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.dataset import FileArtifact
+from app.models.metric import Metric, MetricVersion
+from app.models.task import TaskRun
+from app.utils.invalidation import CommitHook, flushed
+
+T = TypeVar("T")
+
+METRIC_SUMMARY = "metric_summary"
+DASHBOARD_ACTIVITY = "dashboard_activity"
+
+# Which cached aggregates go stale when rows of a model are written.
+_INVALIDATES: dict[type, tuple[str, ...]] = {
+    Metric: (METRIC_SUMMARY,),
+    MetricVersion: (METRIC_SUMMARY, DASHBOARD_ACTIVITY),
+    TaskRun: (DASHBOARD_ACTIVITY,),
+    FileArtifact: (DASHBOARD_ACTIVITY,),
+}
+
+
+class TTLCache:
+    """Process-local memo of aggregate query results.
+
+    Entries expire after ``ttl`` seconds, which bounds staleness for writes
+    made by other processes; writes through this process's sessions drop the
+    affected entries as soon as they commit. Loaders run outside the lock; a
+    value whose key was invalidated while it loaded is returned but not kept.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[str, tuple[float, Any]] = {}
+        # Bumped by ``invalidate``: per key, and for everything when no keys are given.
+        self._generations: dict[str, int] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, loader: Callable[[], T]) -> T:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+            generation = (self._generation, self._generations.get(key, 0))
+        value = loader()
+        with self._lock:
+            if generation == (self._generation, self._generations.get(key, 0)):
+                self._entries[key] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self, *keys: str) -> None:
+        with self._lock:
+            if not keys:
+                self._generation += 1
+                self._entries.clear()
+            for key in keys:
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self._entries.pop(key, None)
+
+
+stats_cache = TTLCache(settings.stats_cache_ttl_seconds)
+
+
+def _stale_stats(session: Session) -> set[str]:
+    return {
+        key
+        for obj in flushed(session, *_INVALIDATES)
+        for model, keys in _INVALIDATES.items()
+        if isinstance(obj, model)
+        for key in keys
+    }
+
+
+_commits = CommitHook("stats_cache_pending", lambda stale: stats_cache.invalidate(*set(stale)), _stale_stats)
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 
 from app.models.task import TaskRun
 from app.schemas.task import TaskRunCreate
+from app.utils.pagination import keyset_page
 
 
 class TaskService:
@@ -29,5 +30,29 @@ class TaskService:
         self.db.refresh(task)
         return task
 
-    def list(self) -> list[TaskRun]:
-        return self.db.query(TaskRun).order_by(TaskRun.created_at.desc()).all()
+    def record_result(self, task_id: int, result: dict) -> TaskRun:
+        task = self.db.query(TaskRun).filter(TaskRun.id == task_id).first()
+        if not task:
+            raise ValueError("Task not found")
+        task.result = {**(task.result or {}), **result}
+        self.db.commit()
+        self.db.refresh(task)
+        return task
+
+    def mark_finished(
+        self, task_id: int, status: str, result: dict | None = None, error: str | None = None
+    ) -> TaskRun:
+        task = self.db.query(TaskRun).filter(TaskRun.id == task_id).first()
+        if not task:
+            raise ValueError("Task not found")
+        task.status = status
+        task.result = {**(task.result or {}), **(result or {})}
+        task.error = error
+        task.finished_at = datetime.utcnow()
+        self.db.commit()
+        self.db.refresh(task)
+        return task
+
+    def list(self, limit: int = 200, cursor: str | None = None) -> tuple[list[TaskRun], str | None]:
+        # Newest first; ids follow creation order and, unlike created_at, are indexed and unique.
+        return keyset_page(self.db.query(TaskRun), (TaskRun.id,), limit, cursor, descending=True)
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import PurePosixPath
+from typing import Any
+from uuid import uuid4
+
+import pandas as pd
+import pyarrow as pa
+from minio import Minio
+from pyarrow import csv as pa_csv
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.dataset import FileArtifact
+from app.services.dimension_resolver import dimension_resolver
+from app.services.metric_values import MetricValueService
+from app.services.watermarks import WatermarkService
+from app.utils.minio import get_minio_client
+from app.utils.multipart import MultipartFileReader
+
+CSV_CONTENT_TYPES = {"text/csv", "application/csv", "application/vnd.ms-excel", "text/plain"}
+# Dimension code columns recognised in uploads, keyed by resolver kind.
+CODE_COLUMNS = {"company": "company_code", "product": "product_code", "channel": "channel_code"}
+VALUE_COLUMNS = ("metric_code", "period_date", "value")
+
+
+class UploadService:
+    def __init__(self, db: Session, storage: Minio | None = None):
+        self.db = db
+        self.storage = storage or get_minio_client()
+        self.values = MetricValueService(db)
+        self.watermarks = WatermarkService(db)
+
+    def store_stream(
+        self, reader: MultipartFileReader, source: str = "manual", data_source: str | None = None
+    ) -> FileArtifact:
+        """Stream an upload into object storage and record its ``FileArtifact``.
+
+        Blocking: call it from a worker thread. MinIO reads ``upload_part_size``
+        bytes at a time and sends each as one part of a multipart upload, so
+        memory is bounded by a single part regardless of file size.
+        """
+
+        reader.wait_for_field()
+        filename = PurePosixPath((reader.filename or "").replace("\\", "/")).name or "upload.bin"
+        content_type = reader.content_type or "application/octet-stream"
+        bucket = settings.minio_upload_bucket
+        object_name = f"{datetime.utcnow():%Y/%m/%d}/{uuid4().hex}/{filename}"
+        if not self.storage.bucket_exists(bucket):
+            self.storage.make_bucket(bucket)
+        self.storage.put_object(
+            bucket,
+            object_name,
+            reader,
+            length=-1,
+            part_size=settings.upload_part_size,
+            content_type=content_type,
+        )
+        artifact = FileArtifact(
+            path=object_name,
+            bucket=bucket,
+            content_type=content_type,
+            size=reader.bytes_read,
+            tags={"filename": filename, "source": source, "data_source": data_source, "parse_status": "pending"},
+        )
+        self.db.add(artifact)
+        self.db.commit()
+        self.db.refresh(artifact)
+        return artifact
+
+    def iter_csv_batches(self, artifact: FileArtifact) -> Iterator[pa.RecordBatch]:
+        """Yield the artifact's rows as record batches of roughly ``upload_csv_block_size`` bytes."""
+
+        response = self.storage.get_object(artifact.bucket, artifact.path)
+        try:
+            reader = pa_csv.open_csv(
+                response,
+                read_options=pa_csv.ReadOptions(block_size=settings.upload_csv_block_size),
+                convert_options=pa_csv.ConvertOptions(
+                    strings_can_be_null=True,
+                    column_types={column: pa.string() for column in (*CODE_COLUMNS.values(), "metric_code")}
+                ),
+            )
+            yield from reader
+        finally:
+            response.close()
+            response.release_conn()
+
+    def parse_artifact(self, artifact_id: int) -> FileArtifact:
+        artifact = self.db.query(FileArtifact).filter(FileArtifact.id == artifact_id).first()
+        if not artifact:
+            raise ValueError("File artifact not found")
+        if not is_csv(artifact):
+            # Excel workbooks cannot be read incrementally; they are kept as-is.
+            self._set_tags(artifact, parse_status="skipped", parse_error="only CSV files are parsed")
+            return artifact
+
+        self._set_tags(artifact, parse_status="processing")
+        stats = {"rows": 0, "batches": 0, "written": 0, "rejected": 0, "unresolved": {}}
+        columns: list[str] = []
+        dimension_resolver.ensure_fresh(self.db)
+        try:
+            for batch in self.iter_csv_batches(artifact):
+                stats["rows"] += batch.num_rows
+                stats["batches"] += 1
+                columns = batch.schema.names
+                self._clean_batch(batch, stats, (artifact.tags or {}).get("data_source"))
+        except (pa.ArrowException, ValueError, OSError, SQLAlchemyError) as exc:
+            self.db.rollback()
+            self._set_tags(artifact, parse_status="failed", parse_error=str(exc), **stats)
+            return artifact
+        self._set_tags(artifact, parse_status="done", columns=columns, **stats)
+        return artifact
+
+    def _clean_batch(self, batch: pa.RecordBatch, stats: dict[str, Any], data_source: str | None = None) -> None:
+        """Map dimension codes to IDs/combos and load metric rows when the file carries them.
+
+        Loaded rows are logged as changes of each metric code and, when the
+        upload names one, of its ``data_source``.
+        """
+
+        frame = batch.to_pandas()
+        present = {kind: column for kind, column in CODE_COLUMNS.items() if column in frame}
+        if "company" not in present:
+            return
+        ids = {}
+        for kind, column in present.items():
+            ids[kind] = dimension_resolver.resolve_codes(kind, frame[column])
+            unresolved = int((ids[kind].isna() & frame[column].notna()).sum())
+            stats["unresolved"][kind] = stats["unresolved"].get(kind, 0) + unresolved
+        # Rows without a known company cannot be stored, so they get no combo either.
+        known = ids["company"].notna().to_numpy()
+        missing = pd.array([pd.NA] * len(frame), dtype="Int64")
+        combos = pd.array([pd.NA] * len(frame), dtype="Int64")
+        if known.any():
+            combos[known] = dimension_resolver.resolve_combos(
+                self.db,
+                ids["company"][known],
+                ids.get("product", missing)[known],
+                ids.get("channel", missing)[known],
+            ).to_numpy()
+        if not all(column in frame for column in VALUE_COLUMNS):
+            self.db.commit()
+            return
+
+        bindings = {
+            code: (binding_ids[0] if (binding_ids := self.values.resolve_binding_ids(code)) else None)
+            for code in frame["metric_code"].dropna().unique()
+        }
+        frame["binding_id"] = frame["metric_code"].map(bindings)
+        frame["combo_id"] = combos
+        # Arrow types the column as date32 only when every value is a plain date;
+        # timestamps and other spellings are normalised here, unparseable ones rejected.
+        frame["period_date"] = pd.to_datetime(frame["period_date"], errors="coerce", format="mixed").dt.date
+        accepted = frame[frame["binding_id"].notna() & known & frame["period_date"].notna()]
+        stats["rejected"] += len(frame) - len(accepted)
+        changes = accepted[["metric_code", "period_date", "company_code"]].rename(columns={"metric_code": "source"})
+        if data_source:
+            changes = pd.concat([changes, changes.assign(source=data_source)])
+        self.watermarks.record(changes)
+        rows = (
+            {
+                "metric_version_caliber_id": int(row.binding_id),
+                "period_date": row.period_date,
+                "company_code": row.company_code,
+                "dimensions_key": str(row.combo_id),
+                "combo_id": int(row.combo_id),
+                "value": None if pd.isna(row.value) else float(row.value),
+            }
+            for row in accepted.itertuples(index=False)
+        )
+        stats["written"] += self.values.bulk_upsert(rows)
+
+    def _set_tags(self, artifact: FileArtifact, **values: Any) -> None:
+        artifact.tags = {**(artifact.tags or {}), **values}
+        self.db.commit()
+        self.db.refresh(artifact)
+
+
+def is_csv(artifact: FileArtifact) -> bool:
+    filename = str((artifact.tags or {}).get("filename") or artifact.path)
+    if filename.lower().endswith((".xlsx", ".xls")):
+        return False
+    return filename.lower().endswith(".csv") or artifact.content_type.split(";")[0] in CSV_CONTENT_TYPES
@@ -0,0 +1,217 @@
+"""Redis read-through cache for metric value query pages.
+
+Keys hash the query, page position and the generation counter of every
+binding the query reads. Writing values bumps the generations of the
+bindings written, so exactly the pages that could have changed stop
+matching and simply age out; nothing has to be scanned or deleted.
+Queries not scoped to a metric read any binding and use the global
+generation, which every write bumps as well. Publishing a version changes
+which bindings a code resolves to, and therefore the key, and also bumps
+that version's bindings.
+
+A miss takes a short Redis lock so that only one worker runs the query
+while concurrent requests for the same page wait for its result. Redis is
+best effort: any error falls back to querying the database.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from loguru import logger
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.metric import MetricVersion, MetricVersionCaliber
+from app.schemas.metric_value import MetricValuePage, MetricValueQuery
+from app.utils.invalidation import CommitHook
+from app.utils.redis import get_redis_client
+
+REDIS_KEY_PREFIX = "metricone:values:"
+GLOBAL_GENERATION = "all"
+ROLLUP_GENERATION = "rollup"
+_WAIT_STEP = 0.05
+
+
+@dataclass
+class ValueCacheStats:
+    hits: int = 0
+    misses: int = 0
+    # Misses served by another worker's load after waiting on its lock.
+    waits: int = 0
+    errors: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.waits + self.misses
+        return (self.hits + self.waits) / lookups if lookups else 0.0
+
+
+class MetricValueCache:
+    def __init__(
+        self,
+        redis_client: Any | None,
+        ttl: int,
+        lock_ttl: float,
+        wait_seconds: float,
+    ):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.wait_seconds = wait_seconds
+        self._stats = ValueCacheStats()
+        self._lock = threading.Lock()
+
+    def get_or_load(
+        self,
+        query: MetricValueQuery,
+        binding_ids: list[int] | None,
+        limit: int,
+        cursor: str | None,
+        loader: Callable[[], MetricValuePage],
+        scope: str | None = None,
+    ) -> MetricValuePage:
+        """``scope`` identifies the caller's access permissions; pages are only shared within one."""
+
+        if self.redis_client is None:
+            return loader()
+        try:
+            key = self._key(query, binding_ids, limit, cursor, scope)
+            raw = self.redis_client.get(key)
+        except Exception as exc:  # noqa: BLE001 - the cache is best effort
+            self._count("errors")
+            logger.warning("Metric value cache: redis read failed: {}", exc)
+            return loader()
+        if raw:
+            self._count("hits")
+            return MetricValuePage.model_validate_json(raw)
+
+        lock = key + ":lock"
+        owner = self._try(lambda: self.redis_client.set(lock, b"1", nx=True, px=int(self.lock_ttl * 1000)))
+        if not owner:
+            page = self._wait_for(key)
+            if page is not None:
+                self._count("waits")
+                return page
+        self._count("misses")
+        try:
+            page = loader()
+            # Jitter spreads the expiry of pages cached together by a dashboard load.
+            ttl = self.ttl + random.randint(0, max(1, self.ttl // 10))
+            self._try(lambda: self.redis_client.set(key, page.model_dump_json(), ex=ttl))
+        finally:
+            if owner:
+                self._try(lambda: self.redis_client.delete(lock))
+        return page
+
+    def invalidate(self, binding_ids: Iterable[int] = (), rollups: bool = False) -> None:
+        """Bump the generations of ``binding_ids`` (and of the rollups) plus the global one."""
+
+        if self.redis_client is None:
+            return
+        names = [GLOBAL_GENERATION, *(str(binding_id) for binding_id in sorted(set(binding_ids)))]
+        if rollups:
+            names.append(ROLLUP_GENERATION)
+
+        def bump() -> None:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for name in names:
+                pipeline.incr(_generation_key(name))
+            pipeline.execute()
+
+        self._try(bump)
+
+    def stats(self) -> ValueCacheStats:
+        with self._lock:
+            return ValueCacheStats(**vars(self._stats))
+
+    def _key(
+        self,
+        query: MetricValueQuery,
+        binding_ids: list[int] | None,
+        limit: int,
+        cursor: str | None,
+        scope: str | None = None,
+    ) -> str:
+        names = [GLOBAL_GENERATION] if binding_ids is None else [str(binding_id) for binding_id in binding_ids]
+        if query.wants_rollup:
+            names.append(ROLLUP_GENERATION)
+        generations = self.redis_client.mget([_generation_key(name) for name in names])
+        material = json.dumps(
+            {
+                "query": query.model_dump(mode="json"),
+                "bindings": binding_ids,
+                "generations": [int(value or 0) for value in generations],
+                "limit": limit,
+                "cursor": cursor,
+                "scope": scope,
+            },
+            sort_keys=True,
+        )
+        return REDIS_KEY_PREFIX + "page:" + hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _wait_for(self, key: str) -> MetricValuePage | None:
+        deadline = time.monotonic() + self.wait_seconds
+        while time.monotonic() < deadline:
+            time.sleep(_WAIT_STEP)
+            raw = self._try(lambda: self.redis_client.get(key))
+            if raw:
+                return MetricValuePage.model_validate_json(raw)
+        return None
+
+    def _try(self, call: Callable[[], Any]) -> Any:
+        try:
+            return call()
+        except Exception as exc:  # noqa: BLE001 - the cache is best effort
+            self._count("errors")
+            logger.warning("Metric value cache: redis call failed: {}", exc)
+            return None
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self._stats, name, getattr(self._stats, name) + 1)
+
+
+def _generation_key(name: str) -> str:
+    return f"{REDIS_KEY_PREFIX}gen:{name}"
+
+
+def _build_cache() -> MetricValueCache:
+    return MetricValueCache(
+        get_redis_client() if settings.metric_value_cache else None,
+        ttl=settings.metric_value_cache_ttl_seconds,
+        lock_ttl=settings.metric_value_cache_lock_seconds,
+        wait_seconds=settings.metric_value_cache_wait_seconds,
+    )
+
+
+value_cache = _build_cache()
+
+
+def _published_bindings(session: Session) -> list[int]:
+    """Bindings of versions whose status changed; loaded bindings are reused, the rest looked up."""
+
+    versions = [
+        obj
+        for obj in session.dirty
+        if isinstance(obj, MetricVersion) and inspect(obj).attrs.status.history.has_changes()
+    ]
+    loaded = [version for version in versions if "calibers" not in inspect(version).unloaded]
+    binding_ids = [binding.id for version in loaded for binding in version.calibers]
+    unloaded = [version.id for version in versions if version not in loaded]
+    if unloaded:
+        binding_ids.extend(
+            session.scalars(select(MetricVersionCaliber.id).where(MetricVersionCaliber.metric_version_id.in_(unloaded)))
+        )
+    return binding_ids
+
+
+_commits = CommitHook("value_cache_pending", value_cache.invalidate, _published_bindings)
@@ -1,9 +1,17 @@
 from __future__ import annotations
 
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from app.models.metric import MetricCaliber, MetricVersion, MetricVersionCaliber
-from app.schemas.caliber import VersionCaliberCreate, VersionCaliberRead, VersionCaliberUpdate
+from app.models.metric import Metric, MetricCaliber, MetricValue, MetricValueRollup, MetricVersion, MetricVersionCaliber
+from app.schemas.caliber import VersionCaliberCreate, VersionCaliberRead, VersionCaliberReplace, VersionCaliberUpdate
+from app.services.access import Principal, policy_engine
+from app.services.dependencies import check_formula
+from app.services.value_cache import value_cache
+
+
+class InvalidBindingsError(ValueError):
+    pass
 
 
 class VersionCaliberService:
@@ -13,11 +21,45 @@ class VersionCaliberService:
     def list_bindings(self, version_id: int) -> list[MetricVersionCaliber]:
         return (
             self.db.query(MetricVersionCaliber)
+            .options(joinedload(MetricVersionCaliber.caliber))
             .filter(MetricVersionCaliber.metric_version_id == version_id)
             .order_by(MetricVersionCaliber.order_index.asc())
             .all()
         )
 
+    def list_readable_bindings(
+        self, metric_id: int, version_id: int, principal: Principal | None = None
+    ) -> list[MetricVersionCaliber]:
+        """``list_bindings`` of a version of ``metric_id``, if ``principal`` may read that metric.
+
+        The version and policy checks are part of the bindings query; only
+        an empty result costs a second statement, to tell a version without
+        bindings from one that is missing or unreadable.
+        """
+
+        clause = policy_engine.permissions(self.db, principal).metric_filter()
+        query = (
+            self.db.query(MetricVersionCaliber)
+            .join(MetricVersion, MetricVersionCaliber.metric_version_id == MetricVersion.id)
+            .options(joinedload(MetricVersionCaliber.caliber))
+            .filter(MetricVersion.id == version_id, MetricVersion.metric_id == metric_id)
+        )
+        if clause is not None:
+            query = query.join(Metric, MetricVersion.metric_id == Metric.id).filter(clause)
+        bindings = query.order_by(MetricVersionCaliber.order_index.asc()).all()
+        if bindings:
+            return bindings
+        version = (
+            select(MetricVersion.id)
+            .join(Metric, MetricVersion.metric_id == Metric.id)
+            .where(MetricVersion.id == version_id, MetricVersion.metric_id == metric_id)
+        )
+        if clause is not None:
+            version = version.where(clause)
+        if self.db.scalar(version) is None:
+            raise ValueError("Metric version not found")
+        return []
+
     def create_binding(self, version_id: int, payload: VersionCaliberCreate) -> MetricVersionCaliber:
         version = self.db.query(MetricVersion).filter(MetricVersion.id == version_id).first()
         if not version:
@@ -36,9 +78,9 @@ class VersionCaliberService:
             notes=payload.notes,
         )
         self.db.add(binding)
+        self._check_dependencies(version)
         self.db.commit()
-        self.db.refresh(binding)
-        return binding
+        return self._get_binding(binding.id)
 
     def update_binding(self, binding_id: int, payload: VersionCaliberUpdate) -> MetricVersionCaliber:
         binding = self.db.query(MetricVersionCaliber).filter(MetricVersionCaliber.id == binding_id).first()
@@ -46,9 +88,100 @@ class VersionCaliberService:
             raise ValueError("Binding not found")
         for field, value in payload.model_dump(exclude_unset=True).items():
             setattr(binding, field, value)
+        self._check_dependencies(binding.metric_version)
         self.db.commit()
-        self.db.refresh(binding)
-        return binding
+        return self._get_binding(binding.id)
+
+    def replace_bindings(
+        self, metric_id: int, version_id: int, items: list[VersionCaliberReplace]
+    ) -> list[MetricVersionCaliber]:
+        """Make the version's bindings exactly ``items``, in that order, in one transaction.
+
+        The version row is locked first, so concurrent edits apply one after
+        the other instead of interleaving into a torn order. Only bindings
+        that actually change are written; dropped bindings are deleted with
+        their stored values and rollups.
+        """
+
+        version = (
+            self.db.query(MetricVersion)
+            .options(selectinload(MetricVersion.calibers).selectinload(MetricVersionCaliber.caliber))
+            .filter(MetricVersion.metric_id == metric_id, MetricVersion.id == version_id)
+            .with_for_update()
+            .populate_existing()
+            .first()
+        )
+        if not version:
+            raise ValueError("Metric version not found")
+        caliber_ids = [item.caliber_id for item in items]
+        if len(set(caliber_ids)) != len(caliber_ids):
+            raise InvalidBindingsError("Caliber bound more than once")
+        calibers = {
+            caliber.id: caliber
+            for caliber in self.db.scalars(select(MetricCaliber).where(MetricCaliber.id.in_(caliber_ids)))
+        }
+        if missing := sorted(set(caliber_ids) - calibers.keys()):
+            raise InvalidBindingsError(f"Caliber not found: {', '.join(map(str, missing))}")
+
+        current = {binding.id: binding for binding in version.calibers}
+        by_caliber = {binding.caliber_id: binding for binding in version.calibers}
+        unknown = sorted(item.id for item in items if item.id is not None and item.id not in current)
+        if unknown:
+            raise InvalidBindingsError(f"Bindings not on this version: {', '.join(map(str, unknown))}")
+        claimed = {item.id for item in items if item.id is not None}
+        for position, item in enumerate(items):
+            binding = current.get(item.id) if item.id is not None else by_caliber.get(item.caliber_id)
+            if binding is None or (item.id is None and binding.id in claimed):
+                binding = MetricVersionCaliber()
+                version.calibers.append(binding)
+            elif item.id is None:
+                claimed.add(binding.id)
+            if binding.caliber_id != item.caliber_id:
+                # Through the relationship, so the dependency check sees the caliber's code.
+                binding.caliber = calibers[item.caliber_id]
+            fields = item.model_dump(exclude={"id", "caliber_id"}) | {"order_index": position}
+            for field, value in fields.items():
+                # Unchanged attributes stay clean, so untouched rows are not rewritten.
+                if getattr(binding, field) != value:
+                    setattr(binding, field, value)
+
+        removed_ids = [binding_id for binding_id in current if binding_id not in claimed]
+        kept = [binding for binding in version.calibers if binding.id not in removed_ids]
+        self._check_dependencies(version, kept)
+        if removed_ids:
+            # Set-based deletes instead of the ORM cascade, which would load every stored value first.
+            # The collection keeps the dropped rows until the rest of the edit has flushed after the
+            # deletes, then is expired, so the ORM never tries to delete them itself.
+            with self.db.no_autoflush:
+                self.db.execute(delete(MetricValue).where(MetricValue.metric_version_caliber_id.in_(removed_ids)))
+                self.db.execute(
+                    delete(MetricValueRollup).where(MetricValueRollup.metric_version_caliber_id.in_(removed_ids))
+                )
+                self.db.execute(delete(MetricVersionCaliber).where(MetricVersionCaliber.id.in_(removed_ids)))
+            self.db.flush()
+            self.db.expire(version, ["calibers"])
+        self.db.commit()
+        if removed_ids:
+            value_cache.invalidate(removed_ids, rollups=True)
+        return self.list_bindings(version.id)
+
+    def _check_dependencies(
+        self, version: MetricVersion, bindings: list[MetricVersionCaliber] | None = None
+    ) -> None:
+        try:
+            with self.db.no_autoflush:
+                check_formula(self.db, version.metric.code, version, bindings)
+        except ValueError:
+            self.db.rollback()
+            raise
+
+    def _get_binding(self, binding_id: int) -> MetricVersionCaliber:
+        return (
+            self.db.query(MetricVersionCaliber)
+            .options(joinedload(MetricVersionCaliber.caliber))
+            .filter(MetricVersionCaliber.id == binding_id)
+            .one()
+        )
 
     def delete_binding(self, binding_id: int) -> None:
         binding = self.db.query(MetricVersionCaliber).filter(MetricVersionCaliber.id == binding_id).first()
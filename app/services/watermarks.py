@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.dataset import DataSourceChange
+from app.models.task import TaskRun
+
+CHANGE_COLUMNS = ["source", "period_date", "company_code"]
+# Successful runs scanned when looking for the last consumed watermarks.
+_RECENT_RUNS = 20
+# Sources pruned per DELETE statement.
+_PRUNE_CHUNK = 500
+
+
+class WatermarkService:
+    """Log which (month, company) slices each data source wrote and read them back by watermark."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, changes: pd.DataFrame) -> int:
+        """Log ``changes`` (``CHANGE_COLUMNS``) in the caller's transaction; periods collapse to months."""
+
+        if changes.empty:
+            return 0
+        frame = changes[CHANGE_COLUMNS].dropna()
+        months = pd.to_datetime(frame["period_date"]).dt.to_period("M").dt.start_time.dt.date
+        frame = frame.assign(period_date=months).drop_duplicates()
+        if frame.empty:
+            return 0
+        self.db.execute(insert(DataSourceChange), frame.to_dict("records"))
+        return len(frame)
+
+    def current(self, sources: Iterable[str]) -> dict[str, int]:
+        """Latest watermark per source; sources that never logged a change are at 0."""
+
+        sources = sorted(set(sources))
+        watermarks = dict.fromkeys(sources, 0)
+        if sources:
+            rows = self.db.execute(
+                select(DataSourceChange.source, func.max(DataSourceChange.id))
+                .where(DataSourceChange.source.in_(sources))
+                .group_by(DataSourceChange.source)
+            )
+            watermarks.update({source: watermark for source, watermark in rows})
+        return watermarks
+
+    def changed_since(self, since: Mapping[str, int], upto: Mapping[str, int]) -> set[tuple[date, str]]:
+        """(month, company) slices logged after ``since`` and up to ``upto`` for the sources in ``upto``."""
+
+        ranges = [
+            and_(
+                DataSourceChange.source == source,
+                DataSourceChange.id > since.get(source, 0),
+                DataSourceChange.id <= watermark,
+            )
+            for source, watermark in upto.items()
+            if watermark > since.get(source, 0)
+        ]
+        if not ranges:
+            return set()
+        stmt = select(DataSourceChange.period_date, DataSourceChange.company_code).where(or_(*ranges)).distinct()
+        return {(period_date, company_code) for period_date, company_code in self.db.execute(stmt)}
+
+    def last_consumed(self, version_id: int) -> dict[str, int] | None:
+        """Watermarks recorded by the version's latest successful run, or None before its first one."""
+
+        results = self.db.scalars(
+            select(TaskRun.result)
+            .where(TaskRun.metric_version_id == version_id, TaskRun.status == "success")
+            .order_by(TaskRun.id.desc())
+            .limit(_RECENT_RUNS)
+        )
+        for result in results:
+            if result and "watermarks" in result:
+                return {source: int(watermark) for source, watermark in result["watermarks"].items()}
+        return None
+
+    def prune(self, in_use: Iterable[Mapping[str, int]]) -> int:
+        """Delete log rows no consumer will read again, in the caller's transaction; returns how many.
+
+        ``in_use`` holds every consumer's watermarks (the last run of each
+        active version, the rollups): ``changed_since`` only reads rows above
+        a consumer's watermark, so rows below the lowest one recorded for
+        their source are dropped. Each source keeps its newest row, which
+        ``current`` reports as its watermark.
+        """
+
+        floors = dict(
+            self.db.execute(
+                select(DataSourceChange.source, func.max(DataSourceChange.id)).group_by(DataSourceChange.source)
+            ).all()
+        )
+        for watermarks in in_use:
+            for source, watermark in watermarks.items():
+                if source in floors:
+                    floors[source] = min(floors[source], watermark)
+        ranges = [(source, floor) for source, floor in sorted(floors.items()) if floor > 0]
+        deleted = 0
+        for start in range(0, len(ranges), _PRUNE_CHUNK):
+            chunk = ranges[start : start + _PRUNE_CHUNK]
+            stmt = delete(DataSourceChange).where(
+                or_(*(and_(DataSourceChange.source == source, DataSourceChange.id < floor) for source, floor in chunk))
+            )
+            deleted += self.db.execute(stmt).rowcount
+        return deleted
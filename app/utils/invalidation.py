@@ -0,0 +1,93 @@
+"""Building blocks for keeping process-wide caches in step with the database."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+T = TypeVar("T")
+
+
+def flushed(session: Session, *models: type) -> list[Any]:
+    """Instances of ``models`` the session is inserting, updating or deleting."""
+
+    return [obj for obj in (*session.new, *session.dirty, *session.deleted) if isinstance(obj, models)]
+
+
+class CommitHook(Generic[T]):
+    """Items noted while a session's transaction is open, handed to ``apply`` once it commits.
+
+    ``collect`` runs after every flush and returns what to remember about
+    it; ``stage`` adds items directly, for Core statements that never flush.
+    A rollback drops everything staged, so caches only ever see committed
+    writes. Staged items live in ``session.info`` under ``key``.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        apply: Callable[[list[T]], None],
+        collect: Callable[[Session], Iterable[T]] | None = None,
+    ):
+        self.key = key
+        self.apply = apply
+        self.collect = collect
+        if collect is not None:
+            event.listen(Session, "after_flush", self._after_flush)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+
+    def stage(self, session: Session, items: Iterable[T]) -> None:
+        items = list(items)
+        if items:
+            session.info.setdefault(self.key, []).extend(items)
+
+    def staged(self, session: Session) -> list[T]:
+        """Items staged in ``session``'s open transaction, not yet applied."""
+
+        return session.info.get(self.key, [])
+
+    def _after_flush(self, session: Session, flush_context) -> None:
+        self.stage(session, self.collect(session))
+
+    def _after_commit(self, session: Session) -> None:
+        items = session.info.pop(self.key, None)
+        if items:
+            self.apply(items)
+
+    def _after_rollback(self, session: Session) -> None:
+        session.info.pop(self.key, None)
+
+
+class RevisionPoll:
+    """Throttled reads of the change counters a cache is keyed on.
+
+    ``check`` returns the counters from ``load`` at most once every
+    ``interval`` seconds and ``None`` in between, so a cache asks the
+    database whether it is stale only that often. The read itself happens
+    outside the lock: concurrent callers keep using what they have rather
+    than queue behind it.
+    """
+
+    def __init__(self, load: Callable[[Session], dict[str, int]], interval: float = 5.0):
+        self.load = load
+        self.interval = interval
+        self._checked_at: float | None = None
+        self._lock = threading.Lock()
+
+    def check(self, db: Session, force: bool = False) -> dict[str, int] | None:
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._checked_at is not None and now - self._checked_at < self.interval:
+                return None
+            self._checked_at = now
+        return self.load(db)
+
+    def expire(self) -> None:
+        with self._lock:
+            self._checked_at = None
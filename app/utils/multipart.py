@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+
+from anyio import from_thread
+from multipart.multipart import MultipartParser, parse_options_header
+
+
+class MultipartFileReader:
+    """Blocking file-like view of one file field in a streamed multipart body.
+
+    Meant to be consumed from a worker thread started by AnyIO (for example
+    via ``run_in_threadpool``): each ``read`` pulls the next request chunk from
+    the event loop, pushes it through the multipart parser and hands back only
+    the bytes of the requested field. Nothing beyond the current network chunk
+    is buffered, so memory does not grow with the upload size.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], content_type: str, field_name: str = "file"):
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise ValueError("Missing multipart boundary")
+        self.field_name = field_name
+        self.filename: str | None = None
+        self.content_type: str | None = None
+        self.bytes_read = 0
+        self._chunks = chunks
+        self._buffer = bytearray()
+        self._body_done = False
+        self._field_done = False
+        self._in_field = False
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: dict[bytes, bytes] = {}
+        self._parser = MultipartParser(
+            boundary,
+            callbacks={
+                "on_part_begin": self._on_part_begin,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+            },
+        )
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._field_done and (size < 0 or len(self._buffer) < size):
+            if not self._pull():
+                break
+        if size < 0 or size >= len(self._buffer):
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        self.bytes_read += len(data)
+        return data
+
+    def wait_for_field(self) -> None:
+        """Consume the body up to the start of the file field so its metadata is known."""
+
+        while self.filename is None and not self._field_done:
+            if not self._pull():
+                break
+        if self.filename is None:
+            raise ValueError(f"Multipart body has no file field named {self.field_name!r}")
+
+    def _pull(self) -> bool:
+        if self._body_done:
+            return False
+        try:
+            chunk = from_thread.run(self._next_chunk)
+        except StopAsyncIteration:
+            self._body_done = True
+            self._parser.finalize()
+            self._field_done = True
+            return False
+        self._parser.write(chunk)
+        return True
+
+    async def _next_chunk(self) -> bytes:
+        return await self._chunks.__anext__()
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, disposition = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = disposition.get(b"name", b"").decode("utf-8", "replace")
+        if name != self.field_name or self.filename is not None or b"filename" not in disposition:
+            return
+        self._in_field = True
+        self.filename = disposition[b"filename"].decode("utf-8", "replace")
+        self.content_type = self._headers.get(b"content-type", b"application/octet-stream").decode("latin-1")
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self._buffer += data[start:end]
+
+    def _on_part_end(self) -> None:
+        if self._in_field:
+            self._in_field = False
+            self._field_done = True
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from datetime import date, datetime
+from typing import Any
+
+from fastapi import Response
+from sqlalchemy import Date, DateTime, tuple_
+from sqlalchemy.orm import InstrumentedAttribute, Query
+
+from app.core.config import settings
+from app.utils.cursor import decode_cursor, encode_cursor
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def page_limit(limit: int | None) -> int:
+    """Apply the default list page size and clamp requests to the server maximum."""
+
+    return max(1, min(limit or settings.list_page_size, settings.list_max_page_size))
+
+
+def set_next_cursor(response: Response, next_cursor: str | None) -> None:
+    """Expose the next-page cursor as a header so list bodies stay plain arrays."""
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+def keyset_page(
+    query: Query,
+    keys: Sequence[InstrumentedAttribute],
+    limit: int,
+    cursor: str | None = None,
+    descending: bool = False,
+) -> tuple[list[Any], str | None]:
+    """Fetch one page of ``query`` ordered by ``keys`` and the cursor for the next one.
+
+    ``keys`` must identify rows uniquely (end them with the primary key). All
+    keys sort in the same direction so the page boundary is a single row
+    value comparison that the matching index can seek to.
+    """
+
+    if cursor:
+        values = _cursor_values(cursor, keys)
+        boundary = tuple_(*keys)
+        query = query.filter(boundary < tuple_(*values) if descending else boundary > tuple_(*values))
+    order = [key.desc() for key in keys] if descending else list(keys)
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, key.key) for key in keys])
+
+
+def _cursor_values(cursor: str, keys: Sequence[InstrumentedAttribute]) -> list[Any]:
+    values = decode_cursor(cursor)
+    if len(values) != len(keys):
+        raise ValueError("Cursor does not match the query")
+    for index, key in enumerate(keys):
+        column_type = key.property.columns[0].type
+        if values[index] is None:
+            raise ValueError("Invalid cursor")
+        try:
+            if isinstance(column_type, DateTime):
+                values[index] = datetime.fromisoformat(values[index])
+            elif isinstance(column_type, Date):
+                values[index] = date.fromisoformat(values[index])
+            elif not isinstance(values[index], column_type.python_type):
+                raise ValueError("Invalid cursor")
+        except TypeError as exc:
+            raise ValueError("Invalid cursor") from exc
+    return values
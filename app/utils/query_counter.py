@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from types import TracebackType
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    """Record the SQL statements engines execute while the block is active.
+
+    Pass the sync engine and ``async_engine.sync_engine`` to cover routes on
+    either path. ``executemany`` calls count once, matching the round trips
+    that matter.
+    Used by ``scripts.benchmarks.query_budget`` to keep routes from drifting
+    back into per-row lazy loads::
+
+        with QueryCounter(engine, budget=4, label="GET /api/metrics") as counter:
+            client.get("/api/metrics")
+    """
+
+    def __init__(self, engines: Engine | Sequence[Engine], budget: int | None = None, label: str = ""):
+        self.engines = [engines] if isinstance(engines, Engine) else list(engines)
+        self.budget = budget
+        self.label = label
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __enter__(self) -> QueryCounter:
+        self.statements.clear()
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._record)
+        if exc_type is None and self.budget is not None:
+            self.check(self.budget)
+
+    def check(self, budget: int) -> None:
+        if self.count > budget:
+            listing = "\n".join(f"  {index + 1}. {sql[:160]}" for index, sql in enumerate(self.statements))
+            raise QueryBudgetExceeded(
+                f"{self.label or 'block'} ran {self.count} SQL statements (budget {budget}):\n{listing}"
+            )
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements.append(" ".join(statement.split()))
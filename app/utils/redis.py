@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from redis import Redis
+
+from app.core.config import settings
+
+
+_client: Redis | None = None
+
+
+def get_redis_client() -> Redis:
+    global _client
+    if _client is None:
+        _client = Redis.from_url(settings.redis_url, socket_timeout=1, socket_connect_timeout=1)
+    return _client
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(db: Session, table: Any):
+    """``INSERT`` construct with ``on_conflict_*`` support for the session's dialect (PostgreSQL or SQLite)."""
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return pg_insert(table)
+    if dialect == "sqlite":
+        return sqlite_insert(table)
+    raise ValueError(f"Upserts are not supported on {dialect}")
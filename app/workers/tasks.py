@@ -1,23 +1,333 @@
 from __future__ import annotations
 
 import json
-import random
-import time
+from dataclasses import asdict
 
+from celery import chord
 from loguru import logger
+from sqlalchemy import select
 
 from app.core.celery_app import celery_app
+from app.core.database import SessionLocal
+from app.core.instrumentation import observe_compute_run
+from app.dsl.compiler import compile_dsl as compile_dsl_source, plan_cache
+from app.models.metric import Metric, MetricVersion
+from app.models.task import TaskRun
+from app.schemas.task import TaskRunCreate
+from app.services.compute import ComputeService, Partition, merge_partition_results, plan_summary
+from app.services.dependencies import DependencyCycleError, DependencyGraph
+from app.services.partitions import MetricValuePartitions
+from app.services.rollups import RollupService
+from app.services.tasks import TaskService
+from app.services.uploads import UploadService
+from app.services.watermarks import WatermarkService
+
+INCREMENTAL_TASK_TYPE = "incremental"
+
+
+@celery_app.task
+def trigger_task_run(task_id: int) -> dict:
+    """Plan a compute run and fan its partitions out as a chord on the metrics queue.
+
+    With ``{"incremental": true}`` in the payload only the slices whose sources
+    changed since the version's last successful run are recomputed. Either
+    way the run records the source watermarks it consumed.
+    """
+
+    prepared = _prepare_run(task_id)
+    if isinstance(prepared, dict):
+        return prepared
+    version_id, partitions = prepared
+    header = [compute_partition.s(task_id, version_id, partition.to_dict()) for partition in partitions]
+    chord(header)(finalize_task_run.s(task_id))
+    logger.info("Task {} dispatched {} partitions", task_id, len(partitions))
+    return {"task_id": task_id, "status": "running", "partitions": len(partitions)}
 
 
 @celery_app.task
-def trigger_task_run(task_id: int) -> None:
+def run_dependency_levels(levels: list[list[int]]) -> dict:
+    """Run task runs level by level, the partitions of a whole level as one chord.
+
+    ``levels`` comes from ``DependencyGraph.levels``: runs within a level are
+    independent and computed in parallel, and a level starts only once every
+    run it reads from has written its values. Each metric is computed once
+    per schedule and later levels read its stored values instead of
+    re-evaluating it.
+    """
+
+    if not levels:
+        return {"levels": 0}
+    header, counts = [], []
+    for task_id in levels[0]:
+        prepared = _prepare_run(task_id)
+        if isinstance(prepared, dict):
+            continue
+        version_id, partitions = prepared
+        header.extend(compute_partition.s(task_id, version_id, partition.to_dict()) for partition in partitions)
+        counts.append([task_id, len(partitions)])
+    rest = levels[1:]
+    if not header:
+        return run_dependency_levels(_skip_failed(levels[0], rest))
+    # The whole level goes along, so runs that failed to plan still block what reads them.
+    chord(header)(finalize_level.s(counts, rest, levels[0]))
+    logger.info("Dispatched {} runs ({} partitions), {} levels to go", len(counts), len(header), len(rest))
+    return {"levels": len(levels), "tasks": [task_id for task_id, _ in counts], "partitions": len(header)}
+
+
+@celery_app.task
+def finalize_level(
+    results: list[dict], counts: list[list[int]], rest: list[list[int]], level: list[int] | None = None
+) -> dict:
+    """Finalize every run of a level, then start the next one without the runs a failure feeds.
+
+    ``level`` lists every run of the level, including those that failed
+    before dispatching any partition and so have no entry in ``counts``.
+    """
+
+    offset = 0
+    for task_id, count in counts:
+        finalize_task_run(results[offset : offset + count], task_id)
+        offset += count
+    task_ids = [task_id for task_id, _ in counts]
+    if rest:
+        run_dependency_levels.delay(_skip_failed(level or task_ids, rest))
+    return {"tasks": task_ids, "levels_left": len(rest)}
+
+
+def _prepare_run(task_id: int) -> tuple[int, list[Partition]] | dict:
+    """Plan a task run; returns its partitions, or the finished task's summary when there is nothing to dispatch."""
+
     logger.info("Running metric task {}", task_id)
-    time.sleep(1)
-    logger.info("Task {} completed", task_id)
+    with SessionLocal() as db:
+        tasks = TaskService(db)
+        task = tasks.mark_started(task_id)
+        version_id = task.metric_version_id
+        payload = task.payload or {}
+        try:
+            compute = ComputeService(db)
+            plan = compute.plan(version_id)
+            # Read before any input so changes landing mid-run are picked up next time.
+            consumed = compute.watermarks.current(plan.sources)
+            since = compute.watermarks.last_consumed(version_id) if payload.get("incremental") else None
+            if since is None:
+                partitions = compute.partitions(plan, payload)
+            else:
+                partitions = compute.changed_partitions(plan, since, consumed, payload)
+            summary = {
+                "plan": plan_summary(plan, partitions),
+                "incremental": since is not None,
+                "watermarks": consumed,
+            }
+            if not partitions:
+                tasks.mark_finished(task_id, "success", result=summary | merge_partition_results([]))
+                logger.info("Task {} had nothing to compute", task_id)
+                return {"task_id": task_id, "status": "success", "partitions": 0}
+            tasks.record_result(task_id, summary)
+        except Exception as exc:  # noqa: BLE001 - a run that cannot be planned fails instead of staying "running"
+            db.rollback()
+            tasks.mark_finished(task_id, "failed", error=str(exc))
+            if isinstance(exc, ValueError):
+                logger.warning("Task {} failed to plan: {}", task_id, exc)
+            else:
+                logger.exception("Task {} failed to plan", task_id)
+            return {"task_id": task_id, "status": "failed"}
+    return version_id, partitions
+
+
+def _skip_failed(task_ids: list[int], rest: list[list[int]]) -> list[list[int]]:
+    """Drop (and fail) the remaining runs that read, directly or not, a metric whose run in ``task_ids`` failed."""
+
+    with SessionLocal() as db:
+        failed = db.scalars(
+            select(Metric.code)
+            .join(MetricVersion, MetricVersion.metric_id == Metric.id)
+            .join(TaskRun, TaskRun.metric_version_id == MetricVersion.id)
+            .where(TaskRun.id.in_(task_ids), TaskRun.status == "failed")
+        ).all()
+        if not failed:
+            return rest
+        blocked = DependencyGraph.load(db).downstream(failed)
+        codes = dict(
+            db.execute(
+                select(TaskRun.id, Metric.code)
+                .join(MetricVersion, TaskRun.metric_version_id == MetricVersion.id)
+                .join(Metric, MetricVersion.metric_id == Metric.id)
+                .where(TaskRun.id.in_([task_id for level in rest for task_id in level]))
+            ).all()
+        )
+        tasks = TaskService(db)
+        kept = []
+        for level in rest:
+            for task_id in level:
+                if codes.get(task_id) in blocked:
+                    tasks.mark_finished(task_id, "failed", error=f"Upstream run failed: {', '.join(sorted(failed))}")
+            kept.append([task_id for task_id in level if codes.get(task_id) not in blocked])
+    return [level for level in kept if level]
+
+
+@celery_app.task
+def compute_partition(task_id: int, version_id: int, partition: dict) -> dict:
+    """Compute one (period range x company chunk) slice; failures are reported, not raised."""
+
+    with SessionLocal() as db:
+        try:
+            compute = ComputeService(db)
+            return compute.run_partition(compute.plan(version_id), Partition.from_dict(partition))
+        except Exception as exc:  # noqa: BLE001 - the chord callback records partition failures
+            logger.exception("Task {} partition {} failed", task_id, partition)
+            return {"partition": partition, "error": str(exc)}
+
+
+@celery_app.task
+def finalize_task_run(results: list[dict], task_id: int) -> dict:
+    merged = merge_partition_results(results)
+    status = "failed" if merged["errors"] else "success"
+    error = f"{len(merged['errors'])} of {merged['partitions']} partitions failed" if merged["errors"] else None
+    with SessionLocal() as db:
+        TaskService(db).mark_finished(task_id, status, result=merged, error=error)
+    observe_compute_run(status, merged["rows_written"])
+    if merged["rows_written"]:
+        refresh_company_rollups.delay()
+    logger.info("Task {} {}: {} rows written", task_id, status, merged["rows_written"])
+    return {"task_id": task_id, "status": status, "rows_written": merged["rows_written"]}
+
+
+@celery_app.task
+def schedule_incremental_runs() -> dict:
+    """Nightly: queue an incremental run for each active version whose sources moved on.
+
+    Metrics reading a moved metric are queued too, since their input moves
+    once it is recomputed. The runs are dispatched in dependency order so
+    each derived metric reads its inputs' fresh values.
+    """
+
+    queued, skipped = {}, 0
+    with SessionLocal() as db:
+        compute, tasks = ComputeService(db), TaskService(db)
+        graph = DependencyGraph.load(db)
+        busy = set(db.scalars(select(TaskRun.metric_version_id).where(TaskRun.status.in_(("pending", "running")))))
+        moved, codes = set(), {}
+        for version_id, code in db.execute(
+            select(MetricVersion.id, Metric.code)
+            .join(Metric, MetricVersion.metric_id == Metric.id)
+            .where(MetricVersion.status == "active")
+        ).all():
+            if version_id in busy:
+                skipped += 1
+                continue
+            try:
+                plan = compute.plan(version_id)
+            except ValueError as exc:
+                logger.warning("Skipping version {}: {}", version_id, exc)
+                skipped += 1
+                continue
+            if not plan.steps or not plan.inputs:
+                continue
+            since = compute.watermarks.last_consumed(version_id)
+            current = compute.watermarks.current(plan.sources)
+            codes[version_id] = code
+            if since is None or any(current[source] > since.get(source, 0) for source in plan.sources):
+                moved.add(code)
+        stale = graph.downstream(moved)
+        try:
+            order = graph.levels(stale)
+        except DependencyCycleError as exc:
+            logger.error("Not scheduling incremental runs: {}", exc)
+            return {"queued": [], "levels": 0, "skipped": skipped}
+        for version_id, code in codes.items():
+            if code not in stale:
+                continue
+            task = tasks.enqueue(
+                TaskRunCreate(
+                    metric_version_id=version_id,
+                    task_type=INCREMENTAL_TASK_TYPE,
+                    payload={"incremental": True},
+                )
+            )
+            queued.setdefault(code, []).append(task.id)
+        levels = [[task_id for code in level for task_id in queued.get(code, ())] for level in order]
+        levels = [level for level in levels if level]
+    if levels:
+        run_dependency_levels.delay(levels)
+    task_ids = [task_id for level in levels for task_id in level]
+    logger.info("Queued {} incremental runs in {} levels ({} versions skipped)", len(task_ids), len(levels), skipped)
+    return {"queued": task_ids, "levels": len(levels), "skipped": skipped}
+
+
+@celery_app.task
+def refresh_company_rollups() -> dict:
+    """Bring the company hierarchy rollups up to date with the change log."""
+
+    with SessionLocal() as db:
+        return RollupService(db).refresh()
+
+
+@celery_app.task
+def maintain_metric_value_partitions() -> dict:
+    """Nightly: create upcoming monthly partitions of metric_value and archive those past retention.
+
+    The data source change log is pruned below the watermarks still in use.
+    """
+
+    with SessionLocal() as db:
+        partitions = MetricValuePartitions(db)
+        created = partitions.ensure_ahead()
+        db.commit()
+        archived = partitions.apply_retention()
+        watermarks = WatermarkService(db)
+        active = list(db.scalars(select(MetricVersion.id).where(MetricVersion.status == "active")))
+        in_use = [
+            consumed for version_id in active if (consumed := watermarks.last_consumed(version_id)) is not None
+        ]
+        if (rollups := RollupService(db).consumed_watermarks()) is not None:
+            in_use.append(rollups)
+        pruned = watermarks.prune(in_use)
+        db.commit()
+    logger.info("Pruned {} data source change log rows", pruned)
+    return {"created": created, "archived": archived, "pruned_changes": pruned}
 
 
 @celery_app.task
 def compile_dsl(metric_id: int, dsl_text: str) -> str:
-    logger.info("Compiling metric %s", metric_id)
-    pseudo_plan = {"metric_id": metric_id, "nodes": random.randint(1, 3), "dsl": dsl_text}
-    return json.dumps(pseudo_plan)
+    logger.info("Compiling metric {}", metric_id)
+    compiled = compile_dsl_source(dsl_text)
+    plan = {
+        "metric_id": metric_id,
+        "key": compiled.key if compiled else None,
+        "identifiers": list(compiled.identifiers) if compiled else [],
+        "instructions": [list(item) for item in compiled.plan.instructions] if compiled else [],
+        "cache": asdict(plan_cache.stats()),
+    }
+    return json.dumps(plan)
+
+
+@celery_app.task
+def compile_metric_version(version_id: int) -> dict:
+    """Compile a version's formula and caliber overrides, warming the shared plan cache."""
+
+    with SessionLocal() as db:
+        version = db.get(MetricVersion, version_id)
+        if version is None:
+            raise ValueError("Metric version not found")
+        compiled = compile_dsl_source(version.formula_dsl)
+        overrides = {
+            binding.id: compile_dsl_source(binding.override_expr_dsl)
+            for binding in version.calibers
+            if binding.override_expr_dsl
+        }
+    return {
+        "version_id": version_id,
+        "formula_key": compiled.key if compiled else None,
+        "override_keys": {str(binding_id): item.key for binding_id, item in overrides.items() if item},
+        "cache": asdict(plan_cache.stats()),
+    }
+
+
+@celery_app.task
+def parse_upload(artifact_id: int) -> dict:
+    with SessionLocal() as db:
+        artifact = UploadService(db).parse_artifact(artifact_id)
+        tags = dict(artifact.tags or {})
+    if tags.get("written"):
+        refresh_company_rollups.delay()
+    return tags
@@ -0,0 +1,154 @@
+"""Load-test the async read routes against the same handlers on the sync path.
+
+Usage: ``python -m scripts.benchmarks.api_load --concurrency 64 --seconds 10``
+(uses ``DATABASE_URL``; PostgreSQL gives the meaningful numbers).
+
+Starts uvicorn in a subprocess with the real app plus ``/bench/sync/...``
+copies of the read routes written the old way (``def`` handlers on
+``SessionLocal``, run in the threadpool), then drives each pair with the same
+concurrent client and reports requests/s and latency percentiles.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import time
+from datetime import date
+
+import httpx
+
+PAIRS = [
+    ("metric list", "/bench/sync/metrics?fields=summary&limit=50", "/api/metrics?fields=summary&limit=50"),
+    ("metric detail", "/bench/sync/metrics/{metric_id}", "/api/metrics/{metric_id}"),
+    ("companies", "/bench/sync/companies?limit=50", "/api/dimensions/companies?limit=50"),
+]
+
+
+def build_app():
+    from fastapi import Depends, HTTPException
+    from sqlalchemy.orm import Session
+
+    from app.api.deps import get_session
+    from app.main import app
+    from app.schemas.dimension import CompanyRead
+    from app.schemas.metric import MetricListItem, MetricRead
+    from app.services.dimensions import DimensionService
+    from app.services.metrics import MetricService
+
+    @app.get("/bench/sync/metrics", response_model=list[MetricListItem])
+    def sync_list_metrics(fields: str = "summary", limit: int = 50, db: Session = Depends(get_session)):
+        metrics, _ = MetricService(db).list_metrics(limit=limit, with_versions=fields == "full")
+        return metrics
+
+    @app.get("/bench/sync/metrics/{metric_id}", response_model=MetricRead)
+    def sync_metric_detail(metric_id: int, db: Session = Depends(get_session)):
+        metric = MetricService(db).get_metric(metric_id)
+        if not metric:
+            raise HTTPException(status_code=404)
+        return metric
+
+    @app.get("/bench/sync/companies", response_model=list[CompanyRead])
+    def sync_list_companies(limit: int = 50, db: Session = Depends(get_session)):
+        companies, _ = DimensionService(db).list_companies(limit=limit)
+        return companies
+
+    return app
+
+
+def seed(metrics: int) -> int:
+    from app.core.database import SessionLocal, engine
+    from app.models import base, metric, task, access, dataset  # noqa: F401
+    from app.models.metric import DimCompany, Metric, MetricCaliber, MetricVersion, MetricVersionCaliber
+
+    base.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        first = db.query(Metric).filter(Metric.code.like("LOAD%")).order_by(Metric.code).first()
+        if first is None:
+            caliber = MetricCaliber(code="LOAD_CAL", name="load caliber", category="std")
+            for index in range(metrics):
+                item = Metric(code=f"LOAD{index:06d}", name=f"load metric {index}", type="atomic")
+                version = MetricVersion(metric=item, version="v1", effective_from=date(2024, 1, 1), grain=["company"])
+                version.calibers.append(MetricVersionCaliber(caliber=caliber))
+                db.add(item)
+            db.add_all(DimCompany(company_code=f"LOAD{index:04d}", company_name=f"company {index}") for index in range(200))
+            db.commit()
+            first = db.query(Metric).filter(Metric.code.like("LOAD%")).order_by(Metric.code).first()
+        return first.id
+
+
+def serve(port: int) -> None:
+    import uvicorn
+
+    uvicorn.run(build_app(), host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+async def drive(base_url: str, path: str, concurrency: int, seconds: float) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                errors += response.status_code != 200
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    latencies.sort()
+    return {
+        "rps": len(latencies) / seconds,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def wait_until_up(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/healthz").status_code == 200:
+                return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise SystemExit("server did not start")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--metrics", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    metric_id = seed(args.metrics)
+    server = multiprocessing.Process(target=serve, args=(args.port,), daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_up(base_url)
+        print(f"{'route':<14} {'path':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for name, sync_path, async_path in PAIRS:
+            for label, path in (("sync", sync_path), ("async", async_path)):
+                path = path.format(metric_id=metric_id)
+                asyncio.run(drive(base_url, path, args.concurrency, 1))  # warm up pools
+                result = asyncio.run(drive(base_url, path, args.concurrency, args.seconds))
+                print(
+                    f"{name:<14} {label:<6} {result['rps']:>8.0f} {result['p50']:>8.1f} "
+                    f"{result['p95']:>8.1f} {result['errors']:>7}"
+                )
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark bulk ``metric_value`` upserts: rows/sec and peak memory.
+
+Usage: ``python -m scripts.benchmarks.metric_value_load --url sqlite:///bench.db --rows 5000000``
+(defaults to ``DATABASE_URL``). Rows are generated lazily, so peak RSS reflects
+the writer rather than the input.
+"""
+
+from __future__ import annotations
+
+import argparse
+import resource
+import sys
+import time
+from collections.abc import Iterator
+from datetime import date
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import Session
+
+from app.models import base, metric, task, access, dataset  # noqa: F401  # ensure models are registered
+from app.models.metric import Metric, MetricValue, MetricVersion, MetricVersionCaliber
+from app.services.metric_values import MetricValueService
+
+BENCH_METRIC_CODE = "BENCH_LOAD"
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def ensure_binding(db: Session) -> int:
+    existing = db.query(Metric).filter(Metric.code == BENCH_METRIC_CODE).first()
+    if existing is None:
+        existing = Metric(code=BENCH_METRIC_CODE, name="bulk load benchmark", type="atomic")
+        version = MetricVersion(metric=existing, version="v1", effective_from=date(2020, 1, 1), grain=["company"])
+        version.calibers.append(MetricVersionCaliber(order_index=0))
+        db.add(existing)
+        db.commit()
+    return existing.versions[0].calibers[0].id
+
+
+def generate_rows(binding_id: int, rows: int, companies: int = 3000) -> Iterator[dict]:
+    months = max(1, rows // companies)
+    for index in range(rows):
+        month = index // companies % months
+        yield {
+            "metric_version_caliber_id": binding_id,
+            "period_date": date(2000 + month // 12, month % 12 + 1, 1),
+            "company_code": f"C{index % companies:05d}",
+            "dimensions_key": str(index // (companies * months)),
+            "value": (index % 10_000) / 7,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="database URL (defaults to DATABASE_URL)")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    if args.url:
+        engine = create_engine(args.url)
+    else:
+        from app.core.database import engine
+
+    base.Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        binding_id = ensure_binding(db)
+        db.execute(delete(MetricValue).where(MetricValue.metric_version_caliber_id == binding_id))
+        db.commit()
+
+        service = MetricValueService(db, batch_size=args.batch_size)
+        rss_before = peak_rss_mb()
+        started = time.perf_counter()
+        written = service.bulk_upsert(generate_rows(binding_id, args.rows))
+        insert_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        service.bulk_upsert(generate_rows(binding_id, args.rows))
+        update_seconds = time.perf_counter() - started
+
+    print(f"dialect: {engine.dialect.name}")
+    print(f"insert: {written:,} rows in {insert_seconds:.1f}s ({written / insert_seconds:,.0f} rows/s)")
+    print(f"upsert: {written:,} rows in {update_seconds:.1f}s ({written / update_seconds:,.0f} rows/s)")
+    print(f"peak RSS: {peak_rss_mb():.0f} MB (was {rss_before:.0f} MB before loading)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Check that API routes stay within a fixed number of SQL statements per request.
+
+Usage: ``python -m scripts.benchmarks.query_budget --metrics 500``
+
+Seeds a throwaway SQLite database (or ``DATABASE_URL``) with metrics, versions and
+caliber bindings, calls each route in ``BUDGETS`` through the ASGI app and
+fails if any request issues more statements than its budget. Budgets do not
+depend on the number of rows, so an N+1 regression shows up immediately.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+from datetime import date
+from pathlib import Path
+
+WORKDIR = Path(tempfile.mkdtemp(prefix="metricone-queries-"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORKDIR / 'queries.db'}")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.database import SessionLocal, async_engine, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import base, metric, task, access, dataset  # noqa: E402,F401
+from app.models.metric import (  # noqa: E402
+    DimChannel,
+    DimCombo,
+    DimCompany,
+    DimProduct,
+    Metric,
+    MetricCaliber,
+    MetricVersion,
+    MetricVersionCaliber,
+)
+from app.utils.query_counter import QueryBudgetExceeded, QueryCounter  # noqa: E402
+
+# (method, path, body, budget). {metric_id}/{version_id} are filled from the seed.
+# A full metrics page is one SELECT per level; selectin loads batch 500 parent
+# ids per IN list, so the default page of 200 metrics (400 versions) fits one.
+BUDGETS = [
+    ("GET", "/api/metrics", None, 4),
+    ("GET", "/api/metrics?limit=1000&fields=summary", None, 1),
+    ("GET", "/api/metrics/{metric_id}", None, 4),
+    ("GET", "/api/metrics/{metric_id}/versions", None, 3),
+    ("GET", "/api/metrics/{metric_id}/versions/{version_id}/calibers", None, 1),
+    ("PATCH", "/api/metrics/{metric_id}", {"owner": "budget"}, 6),
+    ("POST", "/api/metrics/{metric_id}/publish", None, 7),
+    ("GET", "/api/calibers", None, 1),
+    ("GET", "/api/dimensions/combos", None, 1),
+    ("GET", "/api/tasks/", None, 1),
+    ("GET", "/api/metrics/summary", None, 1),
+    ("GET", "/api/dashboard/overview", None, 3),
+]
+
+
+def seed(metrics: int, calibers: int = 5, versions: int = 2) -> tuple[int, int]:
+    with SessionLocal() as db:
+        caliber_rows = [MetricCaliber(code=f"CAL{i:03d}", name=f"caliber {i}", category="std") for i in range(calibers)]
+        db.add_all(caliber_rows)
+        for index in range(metrics):
+            item = Metric(code=f"M{index:06d}", name=f"metric {index}", type="atomic")
+            for number in range(versions):
+                version = MetricVersion(
+                    metric=item, version=f"v{number + 1}", effective_from=date(2024, 1, 1), grain=["company"]
+                )
+                version.calibers.extend(
+                    MetricVersionCaliber(caliber=caliber, order_index=order) for order, caliber in enumerate(caliber_rows)
+                )
+            db.add(item)
+        companies = [DimCompany(company_code=f"C{i:03d}", company_name=f"company {i}") for i in range(20)]
+        product, channel = DimProduct(product_code="P1", product_name="p"), DimChannel(channel_code="CH1", channel_name="c")
+        db.add_all([*companies, product, channel])
+        db.add_all(DimCombo(company=company, product=product, channel=channel) for company in companies)
+        db.commit()
+        first = db.query(Metric).order_by(Metric.code).first()
+        return first.id, first.versions[0].id
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--metrics", type=int, default=500)
+    args = parser.parse_args()
+
+    base.Base.metadata.create_all(bind=engine)
+    metric_id, version_id = seed(args.metrics)
+    client = TestClient(app)
+    failures = []
+    for method, path, body, budget in BUDGETS:
+        url = path.format(metric_id=metric_id, version_id=version_id)
+        label = f"{method} {url}"
+        counter = QueryCounter([engine, async_engine.sync_engine], label=label)
+        with counter:
+            response = client.request(method, url, json=body)
+        response.raise_for_status()
+        try:
+            counter.check(budget)
+            print(f"ok    {counter.count:>3}/{budget:<3} {label}")
+        except QueryBudgetExceeded as exc:
+            print(f"FAIL  {counter.count:>3}/{budget:<3} {label}")
+            failures.append(str(exc))
+    if failures:
+        raise SystemExit("\n\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
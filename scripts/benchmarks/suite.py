@@ -0,0 +1,326 @@
+"""Run the benchmark suite on synthetic data and compare it with earlier runs.
+
+Usage: ``python -m scripts.benchmarks.suite --scale small`` (a throwaway SQLite
+database) or ``DATABASE_URL=postgresql+psycopg://... python -m scripts.benchmarks.suite
+--scale medium --fail-on-regression``.
+
+Loads ``scripts.seed_data`` at the chosen scale (``--reuse`` keeps a previous
+load), then times API list/detail routes and value queries through the ASGI
+app, company rollup rebuilds, ``metric_value`` ingestion and DSL evaluation.
+Each run is appended to ``--results`` as one JSON line tagged with the git
+commit, dialect and scale, and compared with the last run of the same
+dialect and scale: timings (``_ms``, ``_seconds``) that grew, or throughputs
+(``_per_sec``) that shrank, by more than ``--tolerance`` are reported as
+regressions. The value cache is off unless ``--cache`` is given, so the
+numbers measure the database rather than Redis.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCHMARKS = ("api", "values", "rollups", "ingest", "dsl")
+DEFAULT_RESULTS = Path(__file__).with_name("results.jsonl")
+
+# (name, path), formatted with the ids and codes ``seed_params`` picks from the synthetic data.
+API_ROUTES = [
+    ("metric_list", "/api/metrics?fields=summary&limit=200"),
+    ("metric_list_full", "/api/metrics?limit=200"),
+    ("metric_detail", "/api/metrics/{metric_id}"),
+    ("metric_versions", "/api/metrics/{metric_id}/versions"),
+    ("metric_summary", "/api/metrics/summary"),
+    ("companies", "/api/dimensions/companies?limit=200"),
+    ("company_descendants", "/api/dimensions/companies/{company_id}/descendants"),
+    ("combos", "/api/dimensions/combos?limit=200"),
+]
+VALUE_ROUTES = [
+    ("by_code", "/api/metric/value?code={code}&limit=500"),
+    ("by_code_range", "/api/metric/value?code={code}&date_from=2020-03-01&date_to=2020-06-30&limit=500"),
+    ("by_company", "/api/metric/value?code={code}&company_code={company_code}&limit=500"),
+    ("by_combo", "/api/metric/value?combo_id={combo_id}&limit=500"),
+]
+ROLLUP_ROUTES = [
+    ("rollup_root", "/api/metric/value?code={code}&company_code={root_code}&rollup=true&limit=500"),
+    ("rollup_level", "/api/metric/value?code={code}&level=2&limit=500"),
+]
+
+
+def git_revision() -> tuple[str | None, bool]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(["git", "status", "--porcelain"], capture_output=True, text=True, check=True).stdout.strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, dirty
+
+
+def timed(call: Callable[[], object], repeat: int, warmup: int = 3) -> dict[str, float]:
+    for _ in range(warmup):
+        call()
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[max(int(len(latencies) * 0.95) - 1, 0)],
+    }
+
+
+def get(client, path: str):
+    response = client.get(path)
+    response.raise_for_status()
+    return response
+
+
+def bench_routes(client, routes, params: dict, repeat: int) -> dict[str, float]:
+    results = {}
+    for name, path in routes:
+        url = path.format(**params)
+        for stat, value in timed(lambda url=url: get(client, url), repeat).items():
+            results[f"{name}.{stat}"] = value
+    return results
+
+
+def bench_values(client, params: dict, repeat: int, pages: int) -> dict[str, float]:
+    results = bench_routes(client, VALUE_ROUTES, params, repeat)
+    # Keyset pagination should cost the same on page N as on page 1.
+    url = VALUE_ROUTES[0][1].format(**params)
+    cursor = None
+    for _ in range(pages - 1):
+        cursor = get(client, url + (f"&cursor={cursor}" if cursor else "")).json()["next_cursor"]
+        if cursor is None:
+            break
+    if cursor is not None:
+        deep = f"{url}&cursor={cursor}"
+        for stat, value in timed(lambda: get(client, deep), repeat).items():
+            results[f"by_code_page_{pages}.{stat}"] = value
+    return results
+
+
+def bench_rollups(client, params: dict, repeat: int) -> dict[str, float]:
+    from app.core.database import SessionLocal
+    from app.services.rollups import RollupService
+
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        rows = RollupService(db).rebuild() or 0
+        db.commit()
+        seconds = time.perf_counter() - started
+    results = {"rebuild_seconds": seconds, "rebuild_rows_per_sec": rows / seconds if seconds else 0.0}
+    results.update(bench_routes(client, ROLLUP_ROUTES, params, repeat))
+    return results
+
+
+def bench_ingest(rows: int) -> dict[str, float]:
+    from sqlalchemy import delete
+
+    from app.core.database import SessionLocal
+    from app.models.metric import MetricValue
+    from app.services.metric_values import MetricValueService
+    from scripts.benchmarks.metric_value_load import ensure_binding, generate_rows
+
+    with SessionLocal() as db:
+        binding_id = ensure_binding(db)
+        db.execute(delete(MetricValue).where(MetricValue.metric_version_caliber_id == binding_id))
+        db.commit()
+        service = MetricValueService(db)
+        started = time.perf_counter()
+        written = service.bulk_upsert(generate_rows(binding_id, rows))
+        insert_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        service.bulk_upsert(generate_rows(binding_id, rows))
+        upsert_seconds = time.perf_counter() - started
+        db.execute(delete(MetricValue).where(MetricValue.metric_version_caliber_id == binding_id))
+        db.commit()
+    return {"insert_rows_per_sec": written / insert_seconds, "upsert_rows_per_sec": written / upsert_seconds}
+
+
+def bench_dsl(rows: int, reference_rows: int) -> dict[str, float]:
+    from scripts.benchmarks.dsl_eval import DEFAULT_FORMULA, run
+
+    result = run(DEFAULT_FORMULA, rows, reference_rows)
+    if not result["matches_reference"]:
+        raise SystemExit("DSL benchmark: columnar results differ from the row-at-a-time reference")
+    return {name: value for name, value in result.items() if name.endswith(("_ms", "_per_sec"))}
+
+
+def seed_params(db) -> dict:
+    from sqlalchemy import select
+
+    from app.models.metric import DimCombo, DimCompany, Metric
+    from scripts.seed_data import PREFIX
+
+    metric = db.scalars(select(Metric).where(Metric.code.like(f"{PREFIX}%")).order_by(Metric.code).limit(1)).first()
+    root = db.execute(
+        select(DimCompany.company_id, DimCompany.company_code)
+        .where(DimCompany.company_code.like(f"{PREFIX}%"), DimCompany.parent_company_id.is_(None))
+        .limit(1)
+    ).first()
+    combo = db.execute(
+        select(DimCombo.combo_id, DimCompany.company_code)
+        .join(DimCompany, DimCombo.company_id == DimCompany.company_id)
+        .where(DimCompany.company_code.like(f"{PREFIX}%"))
+        .order_by(DimCombo.combo_id.desc())
+        .limit(1)
+    ).first()
+    if metric is None or root is None or combo is None:
+        raise SystemExit("no synthetic data found; run without --reuse to load it")
+    return {
+        "metric_id": metric.id,
+        "code": metric.code,
+        "company_id": root.company_id,
+        "root_code": root.company_code,
+        "combo_id": combo.combo_id,
+        "company_code": combo.company_code,
+    }
+
+
+def regressions(previous: dict, current: dict, tolerance: float) -> list[tuple[str, float, float, float]]:
+    """(name, previous, current, relative change) for every result that got worse by more than ``tolerance``."""
+
+    worse = []
+    for name, value in current.items():
+        before = previous.get(name)
+        if not before:
+            continue
+        change = (value - before) / before
+        if name.endswith(("_ms", "_seconds")) and change > tolerance:
+            worse.append((name, before, value, change))
+        elif name.endswith("_per_sec") and change < -tolerance:
+            worse.append((name, before, value, change))
+    return worse
+
+
+def last_run(path: Path, dialect: str, scale: dict) -> dict | None:
+    if not path.exists():
+        return None
+    found = None
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            run = json.loads(line)
+            if run.get("dialect") == dialect and run.get("scale") == scale:
+                found = run
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", default="small", help="a scripts.seed_data scale name")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--reuse", action="store_true", help="keep synthetic data loaded by a previous run")
+    parser.add_argument("--requests", type=int, default=50, help="timed requests per route")
+    parser.add_argument("--pages", type=int, default=10, help="page depth for the deep pagination query")
+    parser.add_argument("--ingest-rows", type=int, default=200_000)
+    parser.add_argument("--dsl-rows", type=int, default=1_000_000)
+    parser.add_argument("--dsl-reference-rows", type=int, default=50_000)
+    parser.add_argument("--cache", action="store_true", help="leave the Redis value cache on")
+    parser.add_argument("--results", type=Path, default=DEFAULT_RESULTS)
+    parser.add_argument("--no-record", action="store_true", help="compare without appending this run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so the environment has to be ready before the app is imported.
+    if "DATABASE_URL" not in os.environ:
+        workdir = Path(tempfile.mkdtemp(prefix="metricone-bench-"))
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+    if not args.cache:
+        os.environ["METRIC_VALUE_CACHE"] = "false"
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import select
+
+    from app.core.database import SessionLocal, engine
+    from app.main import app
+    from app.models import base, metric, task, access, dataset  # noqa: F401
+    from app.models.metric import Metric
+    from scripts.seed_data import PREFIX, SCALES, reset, seed
+
+    if args.scale not in SCALES:
+        raise SystemExit(f"unknown scale {args.scale!r}; choose from {', '.join(sorted(SCALES))}")
+    scale = SCALES[args.scale]
+    base.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        loaded = db.scalar(select(Metric.id).where(Metric.code.like(f"{PREFIX}%")).limit(1)) is not None
+        if not (args.reuse and loaded):
+            if loaded:
+                reset(db)
+                db.commit()
+            print(f"seeding {args.scale} data set ...")
+            seeded = seed(db, scale)
+            print(f"seeded {seeded.values:,} values in {seeded.seconds:.1f}s")
+        params = seed_params(db)
+
+    client = TestClient(app)
+    results: dict[str, float] = {}
+    for name in args.only:
+        print(f"running {name} ...")
+        if name == "api":
+            found = bench_routes(client, API_ROUTES, params, args.requests)
+        elif name == "values":
+            found = bench_values(client, params, args.requests, args.pages)
+        elif name == "rollups":
+            found = bench_rollups(client, params, args.requests)
+        elif name == "ingest":
+            found = bench_ingest(args.ingest_rows)
+        else:
+            found = bench_dsl(args.dsl_rows, args.dsl_reference_rows)
+        results.update({f"{name}.{key}": value for key, value in found.items()})
+
+    commit, dirty = git_revision()
+    run = {
+        "commit": commit,
+        "dirty": dirty,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "dialect": engine.dialect.name,
+        "scale": {"name": args.scale, **asdict(scale)},
+        "python": platform.python_version(),
+        "host": platform.node(),
+        "results": results,
+    }
+    previous = last_run(args.results, run["dialect"], run["scale"])
+    before = previous["results"] if previous else {}
+
+    print(f"\n{'benchmark':<44} {'previous':>14} {'current':>14} {'change':>8}")
+    for name, value in results.items():
+        change = f"{(value - before[name]) / before[name]:+.0%}" if before.get(name) else ""
+        previous_value = f"{before[name]:,.2f}" if name in before else "-"
+        print(f"{name:<44} {previous_value:>14} {value:>14,.2f} {change:>8}")
+
+    if not args.no_record:
+        args.results.parent.mkdir(parents=True, exist_ok=True)
+        with args.results.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(run, sort_keys=True) + "\n")
+        print(f"\nrecorded in {args.results}")
+
+    worse = regressions(before, results, args.tolerance)
+    if previous:
+        print(f"compared with {(previous.get('commit') or 'unknown')[:12]} ({previous.get('recorded_at')})")
+    for name, old, new, change in worse:
+        print(f"REGRESSION {name}: {old:,.2f} -> {new:,.2f} ({change:+.0%})")
+    if worse and args.fail_on_regression:
+        raise SystemExit(f"{len(worse)} benchmark(s) regressed by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
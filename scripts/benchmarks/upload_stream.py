@@ -0,0 +1,145 @@
+"""Check that ``POST /api/upload`` streams large files with bounded memory.
+
+Usage: ``python -m scripts.benchmarks.upload_stream --size-mb 2048 --max-rss-mb 256``
+
+The upload goes through the real ASGI app into a filesystem stand-in for
+MinIO, and the CSV parse task runs eagerly against the stored object. The
+script fails if peak RSS grows by more than ``--max-rss-mb`` during the run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+WORKDIR = Path(tempfile.mkdtemp(prefix="metricone-upload-"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORKDIR / 'bench.db'}")
+
+import httpx  # noqa: E402
+
+from app.core.celery_app import celery_app  # noqa: E402
+from app.core.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import base, metric, task, access, dataset  # noqa: E402,F401
+from app.services import uploads as upload_services  # noqa: E402
+
+BOUNDARY = "metriconebenchboundary"
+
+
+class FilesystemStorage:
+    """Implements the MinIO calls ``UploadService`` makes, backed by a directory."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def bucket_exists(self, bucket_name: str) -> bool:
+        return (self.root / bucket_name).is_dir()
+
+    def make_bucket(self, bucket_name: str) -> None:
+        (self.root / bucket_name).mkdir(parents=True)
+
+    def put_object(self, bucket_name, object_name, data, length, part_size, **kwargs):
+        target = self.root / bucket_name / object_name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with target.open("wb") as handle:
+            while part := data.read(part_size):
+                handle.write(part)
+
+    def get_object(self, bucket_name, object_name):
+        return _FileResponse(self.root / bucket_name / object_name)
+
+
+class _FileResponse:
+    def __init__(self, path: Path):
+        self._handle = path.open("rb")
+
+    @property
+    def closed(self) -> bool:
+        return self._handle.closed
+
+    def read(self, size: int = -1) -> bytes:
+        return self._handle.read(size)
+
+    def close(self) -> None:
+        self._handle.close()
+
+    def release_conn(self) -> None:
+        pass
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def multipart_body(size_bytes: int) -> AsyncIterator[bytes]:
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="bench.csv"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+        "period_date,company_code,product_code,channel_code,metric_code,value\r\n"
+    ).encode()
+    line = b"2024-01-01,C00001,P001,CH01,GMV,12345.6789\r\n"
+    block = line * (64 * 1024 // len(line))
+    sent = 0
+    while sent < size_bytes:
+        yield block
+        sent += len(block)
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def run(size_mb: int) -> dict:
+    storage = FilesystemStorage(WORKDIR / "objects")
+    # Both the route and the eager parse task build UploadService with the default client.
+    upload_services.get_minio_client = lambda: storage
+    celery_app.conf.task_always_eager = True
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/upload",
+            content=multipart_body(size_mb * 1024 * 1024),
+            headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+            timeout=None,
+        )
+        elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    artifact = response.json()
+    with SessionLocal() as db:
+        tags = db.get(dataset.FileArtifact, artifact["id"]).tags
+    return {"artifact": artifact, "tags": tags, "seconds": elapsed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--max-rss-mb", type=float, default=256)
+    args = parser.parse_args()
+
+    base.Base.metadata.create_all(bind=engine)
+    baseline = peak_rss_mb()
+    try:
+        result = asyncio.run(run(args.size_mb))
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    growth = peak_rss_mb() - baseline
+
+    size = result["artifact"]["size"]
+    print(f"uploaded {size / 1024 / 1024:,.0f} MB in {result['seconds']:.1f}s ({size / 1024 / 1024 / result['seconds']:,.0f} MB/s)")
+    print(f"parse: {result['tags']}")
+    print(f"peak RSS grew by {growth:.0f} MB (limit {args.max_rss_mb:.0f} MB)")
+    if growth > args.max_rss_mb:
+        raise SystemExit("peak RSS limit exceeded")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,18 @@
 """Create database tables from SQLAlchemy models."""
 
-from app.core.database import engine
+from app.core.database import SessionLocal, engine
 from app.models import base, metric, dataset, task, access  # noqa: F401  # ensure models are registered
+from app.services.dimensions import rebuild_company_closure
+from app.services.partitions import MetricValuePartitions
 
 
 def main() -> None:
     base.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        MetricValuePartitions(db).ensure_ahead()
+        # Backfills the closure for dim_company rows loaded before it existed.
+        rebuild_company_closure(db)
+        db.commit()
     # base.Base.metadata.drop_all(bind=engine)
     print("Tables created successfully")
 
@@ -0,0 +1,67 @@
+"""Convert an existing heap ``metric_value`` table into monthly range partitions.
+
+Usage: ``python -m scripts.partition_metric_value [--keep-heap]``
+
+Runs in one transaction against ``DATABASE_URL`` (PostgreSQL only): the heap
+table and its indexes are renamed aside, the partitioned table is created from
+the model, a partition is created for every month with data plus the months
+ahead, and the rows are copied across. The old table is dropped unless
+``--keep-heap`` is given. Writes to metric_value are blocked while it runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from sqlalchemy import text
+
+from app.core.database import SessionLocal
+from app.models import base, metric, dataset, task, access  # noqa: F401  # ensure models are registered
+from app.models.metric import MetricValue
+from app.services.partitions import MetricValuePartitions, add_months, month_start
+
+HEAP_TABLE = "metric_value_heap"
+INDEXES = ("pk_metric_value", "ix_metric_value_company_period", "ix_metric_value_combo_period")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keep-heap", action="store_true", help=f"keep the old table as {HEAP_TABLE}")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if db.get_bind().dialect.name != "postgresql":
+            raise SystemExit("metric_value is only partitioned on PostgreSQL")
+        partitioned = db.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'metric_value'::regclass")
+        ).first()
+        if partitioned:
+            print("metric_value is already partitioned")
+            return
+
+        db.execute(text("LOCK TABLE metric_value IN ACCESS EXCLUSIVE MODE"))
+        db.execute(text(f"ALTER TABLE metric_value RENAME TO {HEAP_TABLE}"))
+        for name in INDEXES:
+            db.execute(text(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_heap"))
+        MetricValue.__table__.create(bind=db.connection())
+
+        first, last = db.execute(text(f"SELECT min(period_date), max(period_date) FROM {HEAP_TABLE}")).one()
+        partitions = MetricValuePartitions(db)
+        if first is not None:
+            months, month = [], month_start(first)
+            while month <= last:
+                months.append(month)
+                month = add_months(month, 1)
+            partitions.ensure(months)
+        partitions.ensure_ahead()
+
+        columns = ", ".join(column.name for column in MetricValue.__table__.columns)
+        copied = db.execute(text(f"INSERT INTO metric_value ({columns}) SELECT {columns} FROM {HEAP_TABLE}")).rowcount
+        if not args.keep_heap:
+            db.execute(text(f"DROP TABLE {HEAP_TABLE}"))
+        db.commit()
+    print(f"Copied {copied} rows into {len(partitions.existing())} partitions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""Fill the database with synthetic dimensions, metrics and values at a chosen scale.
+
+Usage: ``python -m scripts.seed_data --scale medium`` or individual sizes, e.g.
+``--scale large --companies 100000 --values 30000000`` (uses ``DATABASE_URL``).
+
+Everything created carries the ``SYN`` code prefix and ``--reset`` removes a
+previous synthetic load first, so the generator can be rerun on a database
+holding real data. Companies form a deep tree, a fifth of the metrics are
+derived from earlier ones, and every version gets the same caliber bindings.
+Dimensions go in with Core bulk inserts; values are generated lazily and
+streamed through ``MetricValueService.bulk_upsert`` (``COPY`` on PostgreSQL),
+so tens of millions of rows load in bounded memory. Output is deterministic
+for a given scale and ``--seed``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import random
+import time
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, fields, replace
+from datetime import date
+from itertools import groupby
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, engine
+from app.models import base, metric, task, access, dataset  # noqa: F401  # ensure models are registered
+from app.models.metric import (
+    DimChannel,
+    DimCombo,
+    DimCompany,
+    DimProduct,
+    Metric,
+    MetricCaliber,
+    MetricValue,
+    MetricValueRollup,
+    MetricVersion,
+    MetricVersionCaliber,
+)
+from app.services.dimensions import DIMENSION_TABLES, bump_dimension_revision, rebuild_company_closure
+from app.services.metric_values import MetricValueService
+from app.services.partitions import add_months
+
+PREFIX = "SYN"
+FIRST_MONTH = date(2020, 1, 1)
+
+
+@dataclass(frozen=True)
+class Scale:
+    companies: int = 500
+    # Levels of the company tree, the root being level 1.
+    depth: int = 5
+    products: int = 20
+    channels: int = 5
+    combos_per_company: int = 3
+    metrics: int = 100
+    derived_share: float = 0.2
+    versions: int = 2
+    calibers: int = 3
+    months: int = 24
+    # Upper bound on metric_value rows, which fill the earliest months first.
+    values: int = 100_000
+
+
+SCALES = {
+    "tiny": Scale(companies=40, depth=4, products=5, channels=3, metrics=20, months=6, values=5_000),
+    "small": Scale(),
+    "medium": Scale(
+        companies=5_000, depth=7, products=100, channels=10, metrics=1_000, months=36, values=5_000_000
+    ),
+    "large": Scale(
+        companies=50_000,
+        depth=9,
+        products=500,
+        channels=20,
+        combos_per_company=5,
+        metrics=5_000,
+        months=60,
+        values=50_000_000,
+    ),
+}
+
+
+@dataclass
+class SeedResult:
+    companies: int = 0
+    products: int = 0
+    channels: int = 0
+    combos: int = 0
+    metrics: int = 0
+    bindings: int = 0
+    values: int = 0
+    seconds: float = 0.0
+
+
+def company_parents(companies: int, depth: int) -> list[int | None]:
+    """Parent index of each company in breadth-first order: a complete tree at most ``depth`` levels deep."""
+
+    if companies <= 0:
+        return []
+    branching = 1
+    while sum(branching**level for level in range(max(depth, 2))) < companies:
+        branching += 1
+    return [None] + [(index - 1) // branching for index in range(1, companies)]
+
+
+def reset(db: Session) -> None:
+    """Delete everything a previous run created, in the caller's transaction."""
+
+    like = f"{PREFIX}%"
+    metric_ids = select(Metric.id).where(Metric.code.like(like))
+    version_ids = select(MetricVersion.id).where(MetricVersion.metric_id.in_(metric_ids))
+    binding_ids = select(MetricVersionCaliber.id).where(MetricVersionCaliber.metric_version_id.in_(version_ids))
+    company_ids = select(DimCompany.company_id).where(DimCompany.company_code.like(like))
+    conn = db.connection()
+    conn.execute(delete(MetricValue).where(MetricValue.metric_version_caliber_id.in_(binding_ids)))
+    conn.execute(delete(MetricValueRollup).where(MetricValueRollup.metric_version_caliber_id.in_(binding_ids)))
+    conn.execute(delete(MetricVersionCaliber).where(MetricVersionCaliber.metric_version_id.in_(version_ids)))
+    conn.execute(delete(MetricVersion).where(MetricVersion.metric_id.in_(metric_ids)))
+    conn.execute(delete(Metric).where(Metric.code.like(like)))
+    conn.execute(delete(MetricCaliber).where(MetricCaliber.code.like(like)))
+    conn.execute(delete(DimCombo).where(DimCombo.company_id.in_(company_ids)))
+    # Closure rows go with their companies (ON DELETE CASCADE) and are rebuilt below for SQLite.
+    conn.execute(delete(DimCompany).where(DimCompany.company_code.like(like)))
+    conn.execute(delete(DimProduct).where(DimProduct.product_code.like(like)))
+    conn.execute(delete(DimChannel).where(DimChannel.channel_code.like(like)))
+    rebuild_company_closure(db)
+    bump_dimension_revision(db, *DIMENSION_TABLES)
+
+
+def seed_dimensions(db: Session, scale: Scale) -> list[tuple[int, str]]:
+    """Insert companies, products, channels and combos; return (combo id, company code) pairs."""
+
+    parents = company_parents(scale.companies, scale.depth)
+    levels: list[int] = []
+    for parent in parents:
+        levels.append(1 if parent is None else levels[parent] + 1)
+    codes = [f"{PREFIX}_C{index:06d}" for index in range(len(parents))]
+    paths: list[str] = []
+    for index, parent in enumerate(parents):
+        paths.append(("/" if parent is None else paths[parent]) + codes[index] + "/")
+
+    # One statement per tree level, so every parent id is known before its children go in.
+    ids: list[int] = []
+    for _, group in groupby(range(len(parents)), key=levels.__getitem__):
+        rows = [
+            {
+                "company_code": codes[index],
+                "company_name": f"synthetic company {index}",
+                "level": levels[index],
+                "parent_company_id": None if parents[index] is None else ids[parents[index]],
+                "path": paths[index],
+                "is_active": True,
+            }
+            for index in group
+        ]
+        for batch in _chunks(rows, 10_000):
+            ids.extend(_insert_returning(db, DimCompany, DimCompany.company_id, batch))
+
+    product_ids = _insert_returning(
+        db,
+        DimProduct,
+        DimProduct.product_id,
+        [
+            {"product_code": f"{PREFIX}_P{index:05d}", "product_name": f"product {index}", "product_type": "synthetic"}
+            for index in range(scale.products)
+        ],
+    )
+    channel_ids = _insert_returning(
+        db,
+        DimChannel,
+        DimChannel.channel_id,
+        [
+            {"channel_code": f"{PREFIX}_CH{index:04d}", "channel_name": f"channel {index}", "channel_type": "synthetic"}
+            for index in range(scale.channels)
+        ],
+    )
+    rows, owners = [], []
+    # Distinct products per company keep (company, product, channel) unique.
+    per_company = min(scale.combos_per_company, len(product_ids))
+    for index, company_id in enumerate(ids):
+        for offset in range(per_company):
+            rows.append(
+                {
+                    "company_id": company_id,
+                    "product_id": product_ids[(index * 7 + offset) % len(product_ids)],
+                    "channel_id": channel_ids[(index + offset) % len(channel_ids)] if channel_ids else None,
+                }
+            )
+            owners.append(codes[index])
+    combo_ids: list[int] = []
+    for batch in _chunks(rows, 10_000):
+        combo_ids.extend(_insert_returning(db, DimCombo, DimCombo.combo_id, batch))
+    rebuild_company_closure(db)
+    bump_dimension_revision(db, *DIMENSION_TABLES)
+    return list(zip(combo_ids, owners))
+
+
+def seed_metrics(db: Session, scale: Scale, rng: random.Random) -> list[int]:
+    """Create metrics, versions and caliber bindings; return the binding ids, active versions first."""
+
+    calibers = [
+        MetricCaliber(code=f"{PREFIX}_CAL{index:02d}", name=f"synthetic caliber {index}", category="synthetic")
+        for index in range(scale.calibers)
+    ]
+    db.add_all(calibers)
+    atomic = max(1, round(scale.metrics * (1 - scale.derived_share)))
+    codes = [f"{PREFIX}_M{index:06d}" for index in range(scale.metrics)]
+    for index, code in enumerate(codes):
+        formula = None
+        if index >= atomic:
+            # Inputs are always earlier metrics, so the dependency graph stays acyclic.
+            left, right = rng.sample(codes[:index], 2) if index > 1 else (codes[0], codes[0])
+            formula = {"dsl": f"{code} = {left} * {rng.randint(1, 9)} + {right}"}
+        item = Metric(
+            code=code,
+            name=f"synthetic metric {index}",
+            type="atomic" if formula is None else "derived",
+            unit="CNY",
+            subject_area=f"area {index % 8}",
+            owner="seed",
+        )
+        for number in range(scale.versions):
+            version = MetricVersion(
+                metric=item,
+                version=f"v{number + 1}",
+                # The first version is published; later ones are drafts in progress.
+                status="active" if number == 0 else "draft",
+                effective_from=FIRST_MONTH,
+                grain=["company", "product", "channel"],
+                formula_dsl=formula,
+            )
+            version.calibers.extend(
+                MetricVersionCaliber(caliber=caliber, order_index=order) for order, caliber in enumerate(calibers)
+            )
+        db.add(item)
+    db.flush()
+    return list(
+        db.scalars(
+            select(MetricVersionCaliber.id)
+            .join(MetricVersion, MetricVersionCaliber.metric_version_id == MetricVersion.id)
+            .join(Metric, MetricVersion.metric_id == Metric.id)
+            .where(Metric.code.like(f"{PREFIX}%"))
+            .order_by(MetricVersion.status, MetricVersionCaliber.id)
+        )
+    )
+
+
+def generate_values(
+    bindings: list[int], combos: list[tuple[int, str]], scale: Scale, seed: int
+) -> Iterator[dict]:
+    """Month-major rows for ``bindings`` x ``combos``, stopping at ``scale.values`` rows."""
+
+    remaining = scale.values
+    for month in range(scale.months):
+        period = add_months(FIRST_MONTH, month)
+        for binding_id in bindings:
+            rng = random.Random(f"{seed}:{binding_id}:{month}")
+            for combo_id, company_code in combos:
+                if remaining <= 0:
+                    return
+                remaining -= 1
+                yield {
+                    "metric_version_caliber_id": binding_id,
+                    "period_date": period,
+                    "company_code": company_code,
+                    "dimensions_key": str(combo_id),
+                    "combo_id": combo_id,
+                    "value": round(rng.lognormvariate(8, 1.5), 4),
+                    "value_status": "actual",
+                }
+
+
+def seed(db: Session, scale: Scale, seed: int = 7, batch_size: int = 10_000) -> SeedResult:
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    combos = seed_dimensions(db, scale)
+    bindings = seed_metrics(db, scale, rng)
+    db.commit()
+    # Only as many months as the row budget can fill.
+    per_month = len(bindings) * len(combos)
+    months = min(scale.months, max(1, math.ceil(scale.values / per_month))) if per_month else 0
+    budget = replace(scale, months=months)
+    written = MetricValueService(db, batch_size=batch_size).bulk_upsert(
+        generate_values(bindings, combos, budget, seed)
+    )
+    return SeedResult(
+        companies=scale.companies,
+        products=scale.products,
+        channels=scale.channels,
+        combos=len(combos),
+        metrics=scale.metrics,
+        bindings=len(bindings),
+        values=written,
+        seconds=time.perf_counter() - started,
+    )
+
+
+def _insert_returning(db: Session, model, column, rows: list[dict]) -> list[int]:
+    if not rows:
+        return []
+    stmt = insert(model).returning(column, sort_by_parameter_order=True)
+    return list(db.execute(stmt, rows).scalars())
+
+
+def _chunks(rows: list[dict], size: int) -> Iterator[list[dict]]:
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    for field in fields(Scale):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(getattr(Scale(), field.name)))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--reset", action="store_true", help="remove a previous synthetic load first")
+    args = parser.parse_args()
+
+    overrides = {field.name: getattr(args, field.name) for field in fields(Scale) if getattr(args, field.name) is not None}
+    scale = replace(SCALES[args.scale], **overrides)
+
+    base.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if args.reset:
+            reset(db)
+            db.commit()
+        elif db.scalar(select(Metric.id).where(Metric.code.like(f"{PREFIX}%")).limit(1)) is not None:
+            raise SystemExit("synthetic data already loaded; rerun with --reset to replace it")
+        result = seed(db, scale, seed=args.seed, batch_size=args.batch_size)
+
+    print(f"dialect: {engine.dialect.name}")
+    print(f"scale: {asdict(scale)}")
+    for name, value in asdict(result).items():
+        if name != "seconds":
+            print(f"{name}: {value:,}")
+    print(f"loaded in {result.seconds:.1f}s ({result.values / max(result.seconds, 1e-9):,.0f} values/s overall)")
+
+
+if __name__ == "__main__":
+    main()